@@ -0,0 +1,77 @@
+"""
+Cached request.user.
+
+CachedAuthenticationMiddleware replaces Django's AuthenticationMiddleware. The
+loaded user is cached per user id together with the session auth hash it was
+verified against, so later requests skip the User query while the session
+still carries that hash and the cached user is active.
+
+Every User save or delete drops the entry (Services.signals), and so does
+invalidate_cached_user for changes made with queryset.update(); the next
+request reloads and re-verifies from the database. Writes that bypass both,
+such as raw SQL, show up once the entry expires (AUTH_USER_CACHE_SECONDS), so
+a deactivated user or another session's password change can take that long
+to take effect. The cache must be shared by all workers for invalidation to
+reach them: with a process-local cache (cache_is_shared() is False) the
+middleware behaves exactly like Django's and loads the user on every request.
+"""
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from HomeService.caches import cache_is_shared
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def get_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _load_user(request)
+    return request._cached_user
+
+
+async def aget_cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = await sync_to_async(_load_user)(request)
+    return request._cached_user
+
+
+def _load_user(request):
+    try:
+        user_id = request.session[SESSION_KEY]
+        session_hash = request.session[HASH_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+
+    key = user_cache_key(user_id)
+    cached = cache.get(key)
+    if cached is not None and cached[1].is_active and constant_time_compare(cached[0], session_hash):
+        return cached[1]
+
+    # Full load: backend lookup, is_active check and session hash verification.
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, (user.get_session_auth_hash(), user), getattr(settings, 'AUTH_USER_CACHE_SECONDS', 300))
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        if not cache_is_shared():
+            return
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = partial(aget_cached_user, request)
@@ -0,0 +1,58 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from Accounts.auth import invalidate_cached_user
+from Accounts.models import User
+from Accounts.thumbnails import render_thumbnails
+from Services.versions import bump
+
+
+def _render(user_id, name):
+    # Runs in a worker process: image work only, no database access.
+    try:
+        return user_id, name, render_thumbnails(name), None
+    except Exception as exc:
+        return user_id, name, None, f'{type(exc).__name__}: {exc}'
+
+
+class Command(BaseCommand):
+    help = 'Generate profile picture thumbnails for existing users across a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--force', action='store_true', help='Regenerate users that already have thumbnails')
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        if not options['force']:
+            users = users.filter(profile_thumbnails={})
+        jobs = list(users.values_list('id', 'profile_picture'))
+        if not jobs:
+            self.stdout.write('Nothing to do.')
+            return
+
+        # Forked workers must not inherit open database connections.
+        connections.close_all()
+        done = failed = 0
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(_render, user_id, name) for user_id, name in jobs]
+            for future in as_completed(futures):
+                user_id, name, thumbnails, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'user {user_id} ({name}): {error}')
+                    continue
+                if User.objects.filter(id=user_id, profile_picture=name).update(profile_thumbnails=thumbnails):
+                    invalidate_cached_user(user_id)
+                    bump(f'user:{user_id}', 'catalog')
+                done += 1
+
+        self.stdout.write(
+            f'{done} users processed, {failed} failed, {options["workers"]} workers, '
+            f'{time.perf_counter() - start:.1f} s'
+        )
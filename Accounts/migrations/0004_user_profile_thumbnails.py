@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Accounts', '0003_user_company_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_thumbnails',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized variants of profile_picture: {size: {format: name}} (see Accounts.thumbnails)'),
+        ),
+    ]
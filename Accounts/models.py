@@ -3,15 +3,19 @@ from django.db import models
 import os
 
 def user_profile_picture_path(instance, filename):
-    """Generate file path for user profile pictures"""
+    """Upload name for profile pictures; the storage keeps only the extension (content-addressed)."""
     ext = filename.split('.')[-1]
-    filename = f'profile_{instance.id}_{instance.username}.{ext}'
-    return os.path.join('profile_pictures', filename)
+    return os.path.join('profile_pictures', f'profile_{instance.username}.{ext}')
 
 class User(AbstractUser):
     is_customer = models.BooleanField(default=False)
     is_provider = models.BooleanField(default=False)
     profile_picture = models.ImageField(upload_to=user_profile_picture_path, blank=True, null=True, help_text="Profile picture")
+    profile_thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Resized variants of profile_picture: {size: {format: name}} (see Accounts.thumbnails)",
+    )
     phone_number = models.CharField(max_length=15, blank=True, null=True, help_text="Phone number")
     address = models.TextField(blank=True, null=True, help_text="Address")
     company_name = models.CharField(
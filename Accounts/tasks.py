@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from Services.versions import bump
+from taskqueue.queue import task
+
+from .auth import invalidate_cached_user
+from .models import User
+from .thumbnails import render_thumbnails
+
+
+@task(lane='low')
+def send_welcome_email(user_id):
+    user = User.objects.filter(id=user_id).only('username', 'email', 'is_provider').first()
+    if user is None or not user.email:
+        return
+    role = 'service provider' if user.is_provider else 'customer'
+    send_mail(
+        'Welcome to Ghar Sewa',
+        f'Hi {user.username},\n\nYour {role} account is ready. Thank you for joining Ghar Sewa!\n',
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+
+
+@task(lane='low')
+def make_profile_thumbnails(user_id):
+    user = User.objects.filter(id=user_id).only('profile_picture').first()
+    if user is None or not user.profile_picture:
+        return
+    name = user.profile_picture.name
+    thumbnails = render_thumbnails(name)
+    # Skip the write if another upload replaced the picture meanwhile; its own task will run.
+    if User.objects.filter(id=user_id, profile_picture=name).update(profile_thumbnails=thumbnails):
+        invalidate_cached_user(user_id)
+        bump(f'user:{user_id}', 'catalog')
@@ -0,0 +1,45 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from Accounts.thumbnails import pick_variant
+
+register = template.Library()
+
+
+def _srcset(thumbnails, size, fmt):
+    one_x = pick_variant(thumbnails, size, fmt)
+    two_x = pick_variant(thumbnails, size * 2, fmt)
+    if not one_x:
+        return '', ''
+    src = default_storage.url(one_x)
+    if two_x and two_x != one_x:
+        return src, f'{src} 1x, {default_storage.url(two_x)} 2x'
+    return src, src
+
+
+@register.inclusion_tag('partials/avatar.html')
+def avatar(user, size, alt='', css_class='', style='', img_id=''):
+    """
+    <picture> for user.profile_picture displayed at `size` CSS pixels: WebP with a JPEG
+    fallback, 1x/2x variants, or the original upload while thumbnails are pending.
+    """
+    thumbnails = getattr(user, 'profile_thumbnails', None) or {}
+    jpeg_src, jpeg_srcset = _srcset(thumbnails, size, 'jpeg')
+    _, webp_srcset = _srcset(thumbnails, size, 'webp')
+    return {
+        'src': jpeg_src or user.profile_picture.url,
+        'srcset': jpeg_srcset,
+        'webp_srcset': webp_srcset,
+        'size': size,
+        'alt': alt,
+        'css_class': css_class,
+        'style': style,
+        'img_id': img_id,
+    }
+
+
+@register.simple_tag
+def avatar_url(user, size, fmt='jpeg'):
+    """URL of the best stored variant for `size` px, or the original upload."""
+    name = pick_variant(getattr(user, 'profile_thumbnails', None), size, fmt)
+    return default_storage.url(name) if name else user.profile_picture.url
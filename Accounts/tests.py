@@ -1,3 +1,159 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from HomeService.caches import cache_is_shared
+from taskqueue.models import Task
+from .auth import user_cache_key
+from .models import User
+from .tasks import make_profile_thumbnails
+from .thumbnails import THUMBNAIL_FORMATS, THUMBNAIL_SIZES, pick_variant, render_thumbnails
+
+
+class SignedInUser:
+    """A logged-in customer and a helper that loads a login-only page."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='pw', is_customer=True)
+        self.client.force_login(self.user)
+
+    def profile_status(self):
+        return self.client.get(reverse('profile')).status_code
+
+
+class LocalCacheUserTests(SignedInUser, TestCase):
+    def test_user_is_loaded_every_request_not_cached(self):
+        self.assertFalse(cache_is_shared())
+        self.assertEqual(self.profile_status(), 200)
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+
+    def test_deactivation_applies_to_the_next_request(self):
+        self.assertEqual(self.profile_status(), 200)
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.profile_status(), 302)
+
+
+class SharedCacheUserTests(SignedInUser, TestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        shared = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+        super().setUp()
+
+    def test_user_is_cached_and_dropped_on_save(self):
+        self.assertTrue(cache_is_shared())
+        self.assertEqual(self.profile_status(), 200)
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.id)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+        self.assertEqual(self.profile_status(), 302)
+
+    def test_password_change_elsewhere_logs_this_session_out(self):
+        self.assertEqual(self.profile_status(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new password')
+            self.user.save()
+        self.assertEqual(self.profile_status(), 302)
+
+    def test_deleted_user_is_dropped(self):
+        self.assertEqual(self.profile_status(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.profile_status(), 302)
+
+    def test_inactive_cached_user_is_reloaded(self):
+        self.assertEqual(self.profile_status(), 200)
+        key = user_cache_key(self.user.id)
+        session_hash, user = cache.get(key)
+        user.is_active = False
+        cache.set(key, (session_hash, user))
+        self.assertEqual(self.profile_status(), 200)
+        self.assertTrue(cache.get(key)[1].is_active)
+
+
+def png(width=300, height=200):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class MediaRoot:
+    """Uploads go to a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=location)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+class ThumbnailTests(MediaRoot, TestCase):
+    def test_every_size_and_format_is_a_square_of_that_size(self):
+        name = default_storage.save('profile_pictures/alice.png', ContentFile(png()))
+        thumbnails = render_thumbnails(name)
+        self.assertEqual(sorted(thumbnails, key=int), [str(size) for size in THUMBNAIL_SIZES])
+        for size, variants in thumbnails.items():
+            self.assertEqual(set(variants), set(THUMBNAIL_FORMATS))
+            for fmt, stored in variants.items():
+                with default_storage.open(stored) as fh:
+                    image = Image.open(fh)
+                    self.assertEqual((image.format, image.size), (THUMBNAIL_FORMATS[fmt][0], (int(size),) * 2))
+        self.assertEqual(pick_variant(thumbnails, 40, 'webp'), thumbnails['64']['webp'])
+        self.assertEqual(pick_variant(thumbnails, 1000, 'jpeg'), thumbnails['256']['jpeg'])
+        self.assertIsNone(pick_variant({}, 40, 'webp'))
+
+    def test_new_picture_enqueues_one_thumbnail_task_after_commit(self):
+        user = User.objects.create_user('alice', password='pw', is_customer=True)
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_profile'), {
+                'first_name': 'Alice', 'profile_picture': SimpleUploadedFile('me.png', png(), 'image/png'),
+            })
+            self.assertFalse(Task.objects.exists())
+        task = Task.objects.get()
+        self.assertEqual(task.name, make_profile_thumbnails.name)
+        self.assertEqual(task.args, [user.id])
+        make_profile_thumbnails(*task.args)
+        user.refresh_from_db()
+        self.assertEqual(set(user.profile_thumbnails), {str(size) for size in THUMBNAIL_SIZES})
+
+    def test_profile_edit_without_a_picture_enqueues_nothing(self):
+        user = User.objects.create_user('alice', password='pw', is_customer=True)
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_profile'), {'first_name': 'Alice'})
+        self.assertFalse(Task.objects.exists())
+
+
+class BackfillThumbnailsTests(MediaRoot, TransactionTestCase):
+    # The command closes every connection before forking its workers.
+    def test_only_users_without_thumbnails_are_rendered(self):
+        done = {'20': {'webp': 'kept.webp'}}
+        for username, thumbnails in (('alice', {}), ('bob', done)):
+            name = default_storage.save(f'profile_pictures/{username}.png', ContentFile(png()))
+            User.objects.create_user(username, password='pw', profile_picture=name, profile_thumbnails=thumbnails)
+        User.objects.create_user('carol', password='pw')
+        out = io.StringIO()
+        call_command('backfill_profile_thumbnails', workers=1, stdout=out)
+        self.assertIn('1 users processed, 0 failed', out.getvalue())
+        self.assertEqual(set(User.objects.get(username='alice').profile_thumbnails), {'20', '64', '256'})
+        self.assertEqual(User.objects.get(username='bob').profile_thumbnails, done)
+        self.assertEqual(User.objects.get(username='carol').profile_thumbnails, {})
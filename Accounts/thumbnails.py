@@ -0,0 +1,70 @@
+"""
+Profile picture thumbnails : fixed square variants in WebP and JPEG.
+
+Each upload gets 20, 64 and 256 px variants saved through the default storage
+(content-addressed, so identical variants are stored once).
+User.profile_thumbnails maps size -> format -> stored name, and the `avatar`
+template tag reads it to pick the smallest variant that covers the displayed
+size (x2 for high-density screens), falling back to the original until the
+background task has run.
+"""
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+THUMBNAIL_SIZES = (20, 64, 256)
+
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(source_name, size, fmt):
+    folder, base = os.path.split(os.path.splitext(source_name)[0])
+    return os.path.join(folder, 'thumbs', f'{base}_{size}.{THUMBNAIL_FORMATS[fmt][1]}')
+
+
+def _load(source_name, largest):
+    with default_storage.open(source_name, 'rb') as fh:
+        image = Image.open(fh)
+        # JPEG decoder can scale by 1/2..1/8 while decoding: far less work for big photos.
+        image.draft('RGB', (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+
+def render_thumbnails(source_name, storage=default_storage):
+    """Write every size/format variant of a stored image. Returns {'20': {'webp': name, ...}, ...}."""
+    sizes = sorted(THUMBNAIL_SIZES, reverse=True)
+    image = _load(source_name, sizes[0])
+    variants = {}
+    # Derive each size from the next larger one rather than from the full upload.
+    for size in sizes:
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        variants[str(size)] = {}
+        for fmt, (pil_format, _, options) in THUMBNAIL_FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            name = variant_name(source_name, size, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[str(size)][fmt] = storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def pick_variant(thumbnails, pixels, fmt):
+    """Stored name of the smallest variant at least `pixels` wide (else the largest), or None."""
+    if not thumbnails:
+        return None
+    sizes = sorted(int(s) for s in thumbnails)
+    size = next((s for s in sizes if s >= pixels), sizes[-1])
+    return thumbnails[str(size)].get(fmt)
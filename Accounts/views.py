@@ -1,11 +1,18 @@
+from functools import partial
+
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.urls import reverse_lazy
+from .auth import invalidate_cached_user
 from .models import User
 from Services.models import Service
+from Services.pricing import record_prices
+from Services.versions import bump_services
+from .tasks import make_profile_thumbnails, send_welcome_email
 
 def register(request):
     if request.method == 'POST':
@@ -69,7 +76,7 @@ def register(request):
                 service_categories = request.POST.getlist('service_category')
                 service_prices = request.POST.getlist('service_price')
                 
-                services_created = 0
+                new_services = []
                 for i in range(len(service_names)):
                     service_name = service_names[i].strip()
                     service_category = service_categories[i]
@@ -79,21 +86,25 @@ def register(request):
                         try:
                             price = int(service_price)
                             if price > 0:
-                                Service.objects.create(
+                                new_services.append(Service(
                                     name=service_name,
                                     category=service_category,
                                     price=price,
                                     provider=user
-                                )
-                                services_created += 1
+                                ))
                         except ValueError:
                             pass  # Skip invalid price
+                Service.objects.bulk_create(new_services)
+                bump_services((user.id, s.category) for s in new_services)
+                record_prices('listed', [(s.category, s.price, 1) for s in new_services])
+                services_created = len(new_services)
 
                 if services_created > 0:
                     messages.success(request, f'Account created with {services_created} service(s)!')
                 else:
                     messages.info(request, 'Account created! You can add services later from your profile.')
 
+            transaction.on_commit(partial(send_welcome_email.enqueue, user.id))
             login(request, user)
             if role == 'customer':
                 messages.success(request, f'Account created successfully! Welcome, {username}!')
@@ -148,8 +159,10 @@ def edit_profile(request):
             user.company_name = cn
 
         # Handle profile picture upload
-        if 'profile_picture' in request.FILES:
+        new_picture = 'profile_picture' in request.FILES
+        if new_picture:
             user.profile_picture = request.FILES['profile_picture']
+            user.profile_thumbnails = {}
         
         # Validate email
         if user.email and User.objects.filter(email=user.email).exclude(id=user.id).exists():
@@ -158,6 +171,9 @@ def edit_profile(request):
         
         try:
             user.save()
+            invalidate_cached_user(user.id)
+            if new_picture:
+                transaction.on_commit(partial(make_profile_thumbnails.enqueue, user.id))
             messages.success(request, 'Profile updated successfully!')
             return redirect('profile')
         except Exception as e:
@@ -195,6 +211,7 @@ def change_password(request):
         # Set new password
         user.set_password(new_password)
         user.save()
+        invalidate_cached_user(user.id)
         
         # Update session to prevent logout
         update_session_auth_hash(request, user)
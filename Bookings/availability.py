@@ -0,0 +1,283 @@
+"""
+Provider availability : in-memory interval index over blocking bookings.
+
+Every provider gets a sorted array of slot start times (minutes since 0001-01-01)
+for their Accepted bookings, plus working hours from ProviderSchedule. Free-slot
+and conflict lookups are bisections on that array, so "free slots for the next
+14 days" never touches the database once a provider is loaded. The index is a
+per-process cache: entries expire after `ttl` seconds, views update it in place
+when they change a booking, and `find_conflict` (run under `lock_provider_bookings`)
+is the authoritative DB check used when a booking is created or accepted.
+
+The starts array is an immutable tuple replaced whole on every change (under the
+engine lock), so request threads can bisect it without a lock and never see a
+half-applied insert or delete.
+"""
+import datetime
+import threading
+import time as _time
+from bisect import bisect_right, insort
+from collections import defaultdict
+
+from django.utils import timezone
+
+from .models import Booking, ProviderSchedule
+
+BLOCKING_STATUSES = ('Accepted',)
+
+DEFAULT_SCHEDULE = {
+    'day_start': datetime.time(9, 0),
+    'day_end': datetime.time(18, 0),
+    'slot_minutes': 60,
+    'working_days': '0123456',
+}
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(date, time):
+    """Absolute minute number for a (date, time) pair."""
+    return date.toordinal() * MINUTES_PER_DAY + time.hour * 60 + time.minute
+
+
+def from_minutes(minutes):
+    day, rest = divmod(minutes, MINUTES_PER_DAY)
+    return datetime.date.fromordinal(day), datetime.time(rest // 60, rest % 60)
+
+
+class ProviderIndex:
+    """Sorted start minutes (a tuple) of one provider's blocking bookings plus their working hours."""
+
+    __slots__ = ('starts', 'slot', 'day_start', 'day_end', 'working_days', 'loaded_at')
+
+    def __init__(self, starts, slot_minutes, day_start, day_end, working_days, loaded_at=0.0):
+        self.starts = tuple(sorted(starts))
+        self.slot = slot_minutes
+        self.day_start = day_start.hour * 60 + day_start.minute
+        self.day_end = day_end.hour * 60 + day_end.minute
+        self.working_days = frozenset(int(d) for d in working_days if d.isdigit())
+        self.loaded_at = loaded_at
+
+    def works_at(self, start):
+        """True if the slot at start lies on a working day, inside working hours."""
+        day, minute = divmod(start, MINUTES_PER_DAY)
+        return (
+            datetime.date.fromordinal(day).weekday() in self.working_days
+            and self.day_start <= minute
+            and minute + self.slot <= self.day_end
+        )
+
+    def conflicts(self, start):
+        """True if [start, start + slot) overlaps a booked slot."""
+        starts = self.starts
+        i = bisect_right(starts, start - self.slot)
+        return i < len(starts) and starts[i] < start + self.slot
+
+    def add(self, start):
+        starts = list(self.starts)
+        insort(starts, start)
+        self.starts = tuple(starts)
+
+    def remove(self, start):
+        starts = self.starts
+        i = bisect_right(starts, start) - 1
+        if i >= 0 and starts[i] == start:
+            self.starts = starts[:i] + starts[i + 1:]
+
+    def free_slots(self, first_day, days, not_before=None):
+        """[(date, [time, ...]), ...] of open slots for `days` days starting at first_day."""
+        result = []
+        starts = self.starts
+        n = len(starts)
+        slot = self.slot
+        for offset in range(days):
+            day = first_day + datetime.timedelta(days=offset)
+            if day.weekday() not in self.working_days:
+                continue
+            base = day.toordinal() * MINUTES_PER_DAY
+            t = base + self.day_start
+            end = base + self.day_end
+            if not_before is not None and t < not_before:
+                # Round up to the next slot boundary after "now".
+                t += -(-(not_before - t) // slot) * slot
+            i = bisect_right(starts, t - slot)
+            open_times = []
+            while t + slot <= end:
+                # Skip booked intervals that finish before this slot starts.
+                while i < n and starts[i] + slot <= t:
+                    i += 1
+                if i < n and starts[i] < t + slot:
+                    t += slot
+                    continue
+                m = t - base
+                open_times.append(datetime.time(m // 60, m % 60))
+                t += slot
+            if open_times:
+                result.append((day, open_times))
+        return result
+
+
+class AvailabilityEngine:
+    """Process-wide cache of ProviderIndex objects, loaded lazily per provider."""
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _load(self, provider_id):
+        schedule = (
+            ProviderSchedule.objects.filter(provider_id=provider_id)
+            .values('day_start', 'day_end', 'slot_minutes', 'working_days')
+            .first()
+        ) or DEFAULT_SCHEDULE
+        rows = Booking.objects.filter(
+            service__provider_id=provider_id,
+            status__in=BLOCKING_STATUSES,
+            date__gte=timezone.localdate() - datetime.timedelta(days=1),
+        ).values_list('date', 'time')
+        return ProviderIndex(
+            (to_minutes(d, t) for d, t in rows),
+            schedule['slot_minutes'],
+            schedule['day_start'],
+            schedule['day_end'],
+            schedule['working_days'],
+            loaded_at=_time.monotonic(),
+        )
+
+    def index_for(self, provider_id):
+        index = self._indexes.get(provider_id)
+        if index is None or _time.monotonic() - index.loaded_at > self.ttl:
+            index = self._load(provider_id)
+            with self._lock:
+                self._indexes[provider_id] = index
+        return index
+
+    def put(self, provider_id, index):
+        """Install a prebuilt index (used by the benchmark and by bulk warm-ups)."""
+        with self._lock:
+            self._indexes[provider_id] = index
+
+    def invalidate(self, provider_id=None):
+        with self._lock:
+            if provider_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(provider_id, None)
+
+    def works_at(self, provider_id, date, time):
+        return self.index_for(provider_id).works_at(to_minutes(date, time))
+
+    def is_free(self, provider_id, date, time):
+        """True if (date, time) is inside the provider's working hours and not booked."""
+        index = self.index_for(provider_id)
+        start = to_minutes(date, time)
+        return index.works_at(start) and not index.conflicts(start)
+
+    def free_slots(self, provider_id, days=14, first_day=None):
+        now = timezone.localtime()
+        first_day = first_day or now.date()
+        return self.index_for(provider_id).free_slots(
+            first_day, days, not_before=to_minutes(now.date(), now.time())
+        )
+
+    def record(self, provider_id, date, time):
+        """A booking became blocking: add it to a loaded index."""
+        index = self._indexes.get(provider_id)
+        if index is not None:
+            with self._lock:
+                index.add(to_minutes(date, time))
+
+    def release(self, provider_id, date, time):
+        """A booking stopped blocking: drop it from a loaded index."""
+        index = self._indexes.get(provider_id)
+        if index is not None:
+            with self._lock:
+                index.remove(to_minutes(date, time))
+
+
+engine = AvailabilityEngine()
+
+
+def slot_minutes_for(provider_id):
+    return engine.index_for(provider_id).slot
+
+
+def _around(date):
+    # Slots are shorter than a day, so only the neighbouring days can overlap (late-night slots).
+    return (date - datetime.timedelta(days=1), date + datetime.timedelta(days=1))
+
+
+def lock_provider_bookings(provider_id, date):
+    """
+    Lock the provider's bookings from the day before to the day after date, so concurrent
+    accepts of overlapping bookings run one after the other. Call inside transaction.atomic().
+    """
+    list(
+        Booking.objects.select_for_update(of=('self',))
+        .filter(service__provider_id=provider_id, date__range=_around(date))
+        .values_list('id', flat=True)
+    )
+
+
+def find_conflict(provider_id, date, time, exclude_booking_id=None):
+    """Authoritative DB check: a blocking booking overlapping the slot at (date, time), or None."""
+    slot = slot_minutes_for(provider_id)
+    start = to_minutes(date, time)
+    qs = Booking.objects.filter(
+        service__provider_id=provider_id,
+        status__in=BLOCKING_STATUSES,
+        date__range=_around(date),
+    )
+    if exclude_booking_id is not None:
+        qs = qs.exclude(id=exclude_booking_id)
+    for booking in qs.order_by('date', 'time'):
+        if abs(to_minutes(booking.date, booking.time) - start) < slot:
+            return booking
+    return None
+
+
+def find_conflicts(requests, among_requests=True):
+    """
+    Combined DB check for several (provider_id, date, time) requests: one query for the
+    blocking bookings on the requested days, then an in-memory overlap test that also
+    catches requests overlapping each other unless among_requests is False. Returns
+    indexes of conflicting requests.
+    """
+    if not requests:
+        return []
+    provider_ids = {p for p, _, _ in requests}
+    slots = dict.fromkeys(provider_ids, DEFAULT_SCHEDULE['slot_minutes'])
+    slots.update(
+        ProviderSchedule.objects.filter(provider_id__in=provider_ids).values_list('provider_id', 'slot_minutes')
+    )
+    booked = defaultdict(list)
+    rows = Booking.objects.filter(
+        service__provider_id__in=provider_ids,
+        date__in={day for _, d, _ in requests for day in (*_around(d), d)},
+        status__in=BLOCKING_STATUSES,
+    ).values_list('service__provider_id', 'date', 'time')
+    for provider_id, date, time in rows:
+        booked[provider_id].append(to_minutes(date, time))
+
+    conflicts = []
+    for i, (provider_id, date, time) in enumerate(requests):
+        start = to_minutes(date, time)
+        if any(abs(b - start) < slots[provider_id] for b in booked[provider_id]):
+            conflicts.append(i)
+        elif among_requests:
+            booked[provider_id].append(start)
+    return conflicts
+
+
+def booking_status_changed(booking, old_status):
+    """Keep the loaded index in step after a booking's status was saved."""
+    was_blocking = old_status in BLOCKING_STATUSES
+    is_blocking = booking.status in BLOCKING_STATUSES
+    if was_blocking == is_blocking:
+        return
+    provider_id = booking.service.provider_id
+    if is_blocking:
+        engine.record(provider_id, booking.date, booking.time)
+    else:
+        engine.release(provider_id, booking.date, booking.time)
@@ -0,0 +1,84 @@
+"""
+Session cart : several services booked in one checkout.
+
+The cart only stores service ids in the session; checkout validates every item
+with one availability query and creates all bookings with a single bulk_create.
+"""
+from functools import partial
+
+from django.db import transaction
+
+from Services.models import Service
+from Services.tasks import record_booked_prices
+from Services.versions import bump_services
+from .availability import find_conflicts
+from .models import Booking, Checkout
+
+SESSION_KEY = 'cart'
+
+
+class Cart:
+    def __init__(self, request):
+        self.session = request.session
+        self.service_ids = [int(i) for i in self.session.get(SESSION_KEY, [])]
+
+    def __len__(self):
+        return len(self.service_ids)
+
+    def _save(self):
+        self.session[SESSION_KEY] = self.service_ids
+        self.session.modified = True
+
+    def add(self, service_id):
+        if service_id not in self.service_ids:
+            self.service_ids.append(service_id)
+            self._save()
+
+    def remove(self, service_id):
+        if service_id in self.service_ids:
+            self.service_ids.remove(service_id)
+            self._save()
+
+    def clear(self):
+        self.service_ids = []
+        self._save()
+
+    def services(self):
+        """Bookable services in cart order (unavailable or removed ones are dropped)."""
+        by_id = Service.objects.select_related('provider').exclude(provider__company_name='').in_bulk(
+            self.service_ids
+        )
+        return [by_id[i] for i in self.service_ids if i in by_id]
+
+
+def checkout_cart(customer, items, address, phone_number, payment_method):
+    """
+    Book every (service, date, time) in items inside one transaction.
+    Returns (checkout, conflicts); when conflicts is non-empty nothing was written.
+    """
+    with transaction.atomic():
+        conflicts = find_conflicts([(s.provider_id, d, t) for s, d, t in items])
+        if conflicts:
+            return None, conflicts
+        checkout = Checkout.objects.create(
+            customer=customer,
+            payment_method=payment_method,
+            total_amount=sum(s.price for s, _, _ in items),
+        )
+        Booking.objects.bulk_create([
+            Booking(
+                customer=customer,
+                service=service,
+                checkout=checkout,
+                date=date,
+                time=time,
+                address=address,
+                phone_number=phone_number,
+                payment_method=payment_method,
+                payment_status='Pending',
+            )
+            for service, date, time in items
+        ])
+    bump_services((s.provider_id, s.category) for s, _, _ in items)
+    transaction.on_commit(partial(record_booked_prices.enqueue, [s.id for s, _, _ in items]))
+    return checkout, []
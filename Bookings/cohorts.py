@@ -0,0 +1,167 @@
+"""
+Customer cohorts : monthly retention and repeat booking, computed columnar.
+
+`build_cohorts` streams (customer_id, year, month, category) for every booking in
+one query into three NumPy columns, then works on whole arrays:
+
+    sorted unique (customer, segment, month) keys    one row per active month
+    first month per (customer, segment)              cohort of that customer
+    np.bincount over (segment, cohort, offset)       customers active k months later
+
+Segments are each category (cohort = first booking in that category) plus all
+categories together. The result is a plain dict cached without expiry for the
+dashboard cohort page, which never builds it in the request: `request_build`
+enqueues the build_booking_cohorts task (or, with a process-local cache the
+worker could not fill, runs a background thread) and the page shows a computing
+state meanwhile. Months are by service date. numpy is only needed by the build.
+"""
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from HomeService.caches import cache_is_shared
+from Services.models import Service
+from .models import Booking
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the command needs it
+    np = None
+
+CACHE_KEY = 'analytics:booking-cohorts'
+BUILDING_KEY = 'analytics:booking-cohorts:building'
+BUILD_TIMEOUT = 15 * 60  # a build that died stops blocking new ones after this long
+MAX_OFFSET = 12
+MAX_COHORTS = 24
+BATCH_SIZE = 5000
+ALL = 'All categories'
+
+
+def booking_columns():
+    """(customer, month, category) arrays, one entry per booking; month = year * 12 + month - 1."""
+    codes = {category: i for i, (category, _) in enumerate(Service.CATEGORY_CHOICES)}
+    rows = (
+        Booking.objects.annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values_list('customer_id', 'year', 'month', 'service__category')
+        .order_by()
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    table = np.fromiter(
+        ((customer, year * 12 + month - 1, codes.get(category, -1)) for customer, year, month, category in rows),
+        dtype=np.dtype([('customer', np.int64), ('month', np.int32), ('category', np.int16)]),
+    )
+    table = table[table['category'] >= 0]
+    return table['customer'], table['month'], table['category']
+
+
+def cohort_matrix(customers, months, segments, n_segments, max_offset=MAX_OFFSET):
+    """
+    For each segment s: active[s, c, k] = customers of cohort month c (first booking in
+    the segment, relative to the earliest month) who booked in that segment k months later,
+    and repeat[s] = customers who booked in more than one month. Returns (first_month,
+    active, repeat, customers_per_segment).
+    """
+    first_month = int(months.min())
+    n_months = int(months.max()) - first_month + 1
+    month = months.astype(np.int64) - first_month
+
+    # One row per (customer, segment, month), sorted in that order: a single sort.
+    person = customers.astype(np.int64) * n_segments + segments
+    keys = np.sort(person * n_months + month)  # sort + dedupe: faster than np.unique's hashing here
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    person, month = keys // n_months, keys % n_months
+
+    starts = np.flatnonzero(np.r_[True, person[1:] != person[:-1]])
+    runs = np.diff(np.r_[starts, len(person)])
+    cohort = np.repeat(month[starts], runs)
+    offset = month - cohort
+    segment = person % n_segments
+
+    keep = offset <= max_offset
+    cells = (segment[keep] * n_months + cohort[keep]) * (max_offset + 1) + offset[keep]
+    active = np.bincount(cells, minlength=n_segments * n_months * (max_offset + 1))
+    active = active.reshape(n_segments, n_months, max_offset + 1)
+    repeat = np.bincount(segment[starts][runs > 1], minlength=n_segments)
+    return first_month, active, repeat, np.bincount(segment[starts], minlength=n_segments)
+
+
+def _month_label(month):
+    return f'{month // 12}-{month % 12 + 1:02d}'
+
+
+def build_cohorts(max_offset=MAX_OFFSET, max_cohorts=MAX_COHORTS):
+    """Compute retention per category and overall, cache it for the dashboard and return it."""
+    customers, months, categories = booking_columns()
+    names = [category for category, _ in Service.CATEGORY_CHOICES]
+    result = {'built_at': timezone.now(), 'bookings': len(customers), 'offsets': list(range(max_offset + 1)),
+              'segments': []}
+    if len(customers):
+        # Overall is one more segment: every booking again, under segment len(names).
+        first, active, repeat, people = cohort_matrix(
+            np.concatenate([customers, customers]),
+            np.concatenate([months, months]),
+            np.concatenate([categories, np.full(len(categories), len(names), dtype=categories.dtype)]),
+            len(names) + 1,
+            max_offset,
+        )
+        today = timezone.localdate()
+        last = today.year * 12 + today.month - 1 - first  # bookings further out have not happened yet
+        for s, name in [(len(names), ALL), *enumerate(names)]:
+            if not people[s]:
+                continue
+            rows = []
+            for c in range(max(active.shape[1] - max_cohorts, 0), active.shape[1]):
+                size = int(active[s, c, 0])
+                if not size:
+                    continue
+                observed = min(max(last - c, 0), max_offset) + 1
+                rows.append({
+                    'month': _month_label(first + c),
+                    'size': size,
+                    'retention': [round(100 * int(n) / size, 1) for n in active[s, c, :observed]]
+                                 + [None] * (max_offset + 1 - observed),
+                })
+            result['segments'].append({
+                'name': name,
+                'customers': int(people[s]),
+                'repeat_rate': round(100 * int(repeat[s]) / int(people[s]), 1),
+                'cohorts': rows,
+            })
+    cache.set(CACHE_KEY, result, None)
+    cache.delete(BUILDING_KEY)
+    return result
+
+
+def cached_cohorts():
+    """The last build_cohorts result, or None."""
+    return cache.get(CACHE_KEY)
+
+
+def is_building():
+    return bool(cache.get(BUILDING_KEY))
+
+
+def _build_in_background():
+    from django.db import close_old_connections
+
+    try:
+        build_cohorts()
+    finally:
+        cache.delete(BUILDING_KEY)
+        close_old_connections()
+
+
+def request_build():
+    """Start a build off the request unless one is already running. Returns False if one was."""
+    if not cache.add(BUILDING_KEY, True, BUILD_TIMEOUT):
+        return False
+    if cache_is_shared():
+        from .tasks import build_booking_cohorts
+
+        transaction.on_commit(build_booking_cohorts.enqueue)
+    else:
+        threading.Thread(target=_build_in_background, daemon=True).start()
+    return True
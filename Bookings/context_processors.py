@@ -0,0 +1,8 @@
+from .cart import SESSION_KEY
+
+
+def cart(request):
+    """Number of services in the session cart, for the navbar badge."""
+    if not request.user.is_authenticated:
+        return {}
+    return {'cart_count': len(request.session.get(SESSION_KEY, []))}
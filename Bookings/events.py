@@ -0,0 +1,78 @@
+"""
+Booking events : in-process pub/sub feeding the SSE endpoint.
+
+Views call `publish_booking` after they save a booking; every open
+`booking_events` stream of the customer or the provider gets the event
+immediately. The hub only reaches streams in the same process, so each stream
+also falls back to a periodic poll of `updated_at` to pick up changes made
+by other workers, the scheduler or bulk updates. Streams are only offered when
+the site runs under ASGI (`streams_supported`); under WSGI each open stream
+would hold a worker thread for as long as the page stays open.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.core.handlers.asgi import ASGIRequest
+
+
+def booking_event(booking):
+    return {
+        'id': booking.id,
+        'status': booking.status,
+        'payment_status': booking.payment_status,
+        'payment_received': booking.payment_received,
+        'service': booking.service.name,
+        'date': booking.date.isoformat() if hasattr(booking.date, 'isoformat') else str(booking.date),
+        'time': booking.time.strftime('%H:%M') if hasattr(booking.time, 'strftime') else str(booking.time),
+        'updated_at': booking.updated_at.isoformat() if booking.updated_at else None,
+    }
+
+
+class EventHub:
+    """Per-user fan-out to asyncio queues; safe to publish from any thread."""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[user_id].add(entry)
+        return entry
+
+    def unsubscribe(self, user_id, entry):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(entry)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            targets = [entry for uid in set(user_ids) for entry in self._subscribers.get(uid, ())]
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+
+    @staticmethod
+    def _offer(queue, event):
+        # A stalled client must not grow memory without bound; it will resync via polling.
+        if not queue.full():
+            queue.put_nowait(event)
+
+
+hub = EventHub()
+
+
+def streams_supported(request):
+    """True when the request is served over ASGI, where an idle stream costs no thread."""
+    return isinstance(request, ASGIRequest)
+
+
+def publish_booking(booking):
+    """Notify the booking's customer and provider streams."""
+    hub.publish((booking.customer_id, booking.service.provider_id), booking_event(booking))
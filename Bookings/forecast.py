@@ -0,0 +1,150 @@
+"""
+Demand forecast : expected bookings per category and service date.
+
+One grouped query returns daily booking counts per category, which become a
+categories x days matrix Y. Every category is then fitted at once with NumPy:
+
+    trend        weighted least-squares line through Y, weights halving every
+                 HALF_LIFE days back, so the slope follows recent months; flat
+                 (the weighted mean) with less than MIN_TREND_DAYS of history
+    seasonality  per weekday, weighted bookings / weighted trend on those days
+    forecast     trend(t) * seasonality[weekday(t)] for the next HORIZON days,
+                 with an 80% band from the weighted residual spread
+
+The fit is a handful of matrix products over at most HISTORY_DAYS columns, so a
+refit costs about as much as the query. Rows are replaced wholesale; pages read
+them through `demand_summary`. numpy is only needed by the job.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from Services.models import Service
+from .models import Booking, DemandForecast
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the refit needs it
+    np = None
+
+HORIZON = 30
+HISTORY_DAYS = 3 * 365
+HALF_LIFE = 90
+BAND_Z = 1.2816  # two-sided 80%
+MIN_TREND_DAYS = 7  # a slope through fewer days follows noise
+
+
+def daily_counts(start, end):
+    """(categories, counts) with counts[c, d] = bookings of categories[c] on start + d days, end excluded."""
+    categories = [category for category, _ in Service.CATEGORY_CHOICES]
+    rows = (
+        Booking.objects.filter(date__gte=start, date__lt=end)
+        .values_list('service__category', 'date')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    index = {category: i for i, category in enumerate(categories)}
+    cells = np.array(
+        [(index[category], (day - start).days, n) for category, day, n in rows if category in index],
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    counts = np.zeros((len(categories), (end - start).days))
+    counts[cells[:, 0], cells[:, 1]] = cells[:, 2]
+    return categories, counts
+
+
+def fit_forecast(counts, first_weekday, horizon=HORIZON, half_life=HALF_LIFE):
+    """
+    Forecast the horizon days after counts (categories x days, oldest first; day 0 is
+    weekday first_weekday, Monday = 0). Returns (expected, low, high), each categories x horizon.
+    """
+    days = counts.shape[1]
+    t = np.arange(days, dtype=np.float64)
+    w = 0.5 ** ((days - 1 - t) / half_life)
+    w_sum = w.sum()
+
+    t_mean = w @ t / w_sum
+    y_mean = counts @ w / w_sum
+    dt = t - t_mean
+    t_var = w @ dt ** 2
+    if days < MIN_TREND_DAYS or not t_var > 0:
+        slope = np.zeros(len(counts))
+    else:
+        slope = ((counts - y_mean[:, None]) * dt) @ w / t_var
+    trend = np.maximum(y_mean[:, None] + slope[:, None] * dt, 0)
+
+    # weekday one-hot (days x 7): per-weekday weighted sums are one product each
+    weekday = (first_weekday + np.arange(days)) % 7
+    onehot = np.zeros((days, 7))
+    onehot[np.arange(days), weekday] = w
+    booked, expected_by_trend = counts @ onehot, trend @ onehot
+    season = np.divide(booked, expected_by_trend, out=np.ones_like(booked), where=expected_by_trend > 0)
+
+    fitted = trend * season[:, weekday]
+    spread = np.sqrt(((counts - fitted) ** 2) @ w / w_sum)
+
+    future = np.arange(days, days + horizon) - t_mean
+    future_weekday = (first_weekday + np.arange(days, days + horizon)) % 7
+    expected = np.maximum(y_mean[:, None] + slope[:, None] * future, 0) * season[:, future_weekday]
+    band = BAND_Z * spread[:, None]
+    return expected, np.maximum(expected - band, 0), expected + band
+
+
+def refresh_demand_forecast(today=None, horizon=HORIZON):
+    """Refit every category on the history before today and store the next horizon days. Returns rows written."""
+    today = today or timezone.localdate()
+    start = today - datetime.timedelta(days=HISTORY_DAYS)
+    first = Booking.objects.filter(date__gte=start, date__lt=today).order_by('date').values_list('date', flat=True).first()
+    if first is None:
+        rows = []
+    else:
+        categories, counts = daily_counts(first, today)
+        expected, low, high = (
+            np.nan_to_num(values, nan=0.0, posinf=0.0) for values in fit_forecast(counts, first.weekday(), horizon)
+        )
+        rows = [
+            DemandForecast(
+                category=category, date=today + datetime.timedelta(days=d),
+                expected=round(float(expected[c, d]), 2), low=round(float(low[c, d]), 2),
+                high=round(float(high[c, d]), 2),
+            )
+            for c, category in enumerate(categories)
+            for d in range(horizon)
+        ]
+    with transaction.atomic():
+        DemandForecast.objects.all().delete()
+        DemandForecast.objects.bulk_create(rows)
+    return len(rows)
+
+
+def demand_summary(categories=None, days=HORIZON, today=None):
+    """
+    Stored forecast from today on, per category: [{'category', 'days', 'week', 'total',
+    'peak'}, ...] in category order. Each day row gets .height, its bar height in percent
+    of the busiest day shown.
+    """
+    today = today or timezone.localdate()
+    qs = DemandForecast.objects.filter(date__gte=today, date__lt=today + datetime.timedelta(days=days))
+    if categories is not None:
+        qs = qs.filter(category__in=categories)
+    by_category = {}
+    for row in qs.order_by('category', 'date'):
+        by_category.setdefault(row.category, []).append(row)
+    top = max((row.expected for rows in by_category.values() for row in rows), default=0)
+    summary = []
+    for category, _ in Service.CATEGORY_CHOICES:
+        rows = by_category.get(category)
+        if not rows:
+            continue
+        for row in rows:
+            row.height = round(100 * row.expected / top) if top else 0
+        summary.append({
+            'category': category,
+            'days': rows,
+            'week': sum(row.expected for row in rows[:7]),
+            'total': sum(row.expected for row in rows),
+            'peak': max(rows, key=lambda row: row.expected),
+        })
+    return summary
@@ -0,0 +1,60 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from Bookings.availability import AvailabilityEngine, ProviderIndex, to_minutes
+
+
+class Command(BaseCommand):
+    help = 'Benchmark free-slot and conflict lookups on synthetic in-memory provider indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--providers', type=int, default=100)
+        parser.add_argument('--bookings', type=int, default=5000, help='Accepted bookings per provider')
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=14)
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        today = datetime.date.today()
+        engine = AvailabilityEngine(ttl=float('inf'))
+
+        # Nine one-hour slots a day: spread bookings so roughly half the slots are taken.
+        horizon = max(options['bookings'] * 2 // 9, 30)
+
+        build_start = time.perf_counter()
+        for pid in range(options['providers']):
+            starts = set()
+            while len(starts) < options['bookings']:
+                day = today + datetime.timedelta(days=rng.randrange(-30, horizon))
+                starts.add(to_minutes(day, datetime.time(rng.randrange(9, 18), 0)))
+            engine.put(pid, ProviderIndex(starts, 60, datetime.time(9), datetime.time(18), '0123456'))
+        build_ms = (time.perf_counter() - build_start) * 1000
+
+        free_times, conflict_times = [], []
+        for _ in range(options['queries']):
+            pid = rng.randrange(options['providers'])
+            t0 = time.perf_counter()
+            engine.index_for(pid).free_slots(today, options['days'])
+            t1 = time.perf_counter()
+            engine.is_free(pid, today + datetime.timedelta(days=rng.randrange(14)), datetime.time(rng.randrange(9, 18)))
+            t2 = time.perf_counter()
+            free_times.append((t1 - t0) * 1e6)
+            conflict_times.append((t2 - t1) * 1e6)
+
+        def summary(label, samples):
+            samples.sort()
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            self.stdout.write(
+                f'{label:<22} p50 {statistics.median(samples):8.1f} us   p99 {p99:8.1f} us'
+            )
+
+        self.stdout.write(
+            f"{options['providers']} providers x {options['bookings']} bookings indexed in {build_ms:.0f} ms"
+        )
+        summary(f"free_slots({options['days']} days)", free_times)
+        summary('is_free', conflict_times)
@@ -0,0 +1,65 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Bookings import cohorts
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the cohort matrix (Bookings.cohorts) on synthetic booking columns against a '
+        'per-booking Python loop, and check that both give the same matrix.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=2_000_000)
+        parser.add_argument('--customers', type=int, default=300_000)
+        parser.add_argument('--months', type=int, default=36)
+        parser.add_argument('--categories', type=int, default=6)
+
+    def handle(self, *args, **options):
+        np = cohorts.np
+        if np is None:
+            raise CommandError('numpy is required.')
+        rng = np.random.default_rng(4)
+        n = options['bookings']
+        customers = rng.integers(1, options['customers'] + 1, n) * 7  # sparse ids, like real primary keys
+        # Each customer joins in some month and keeps booking with decaying odds.
+        joined = rng.integers(0, options['months'], options['customers'] + 1)[customers // 7]
+        months = np.minimum(joined + rng.geometric(0.35, n) - 1, options['months'] - 1).astype(np.int32) + 24300
+        categories = rng.integers(0, options['categories'], n).astype(np.int16)
+
+        t0 = time.perf_counter()
+        first, active, repeat, people = cohorts.cohort_matrix(customers, months, categories, options['categories'])
+        fast = time.perf_counter() - t0
+        self.stdout.write(f'{n} bookings: vectorised cohort matrix in {fast * 1000:.0f} ms')
+
+        sample = n // 10
+        t0 = time.perf_counter()
+        expected = self.loop(customers[:sample].tolist(), months[:sample].tolist(), categories[:sample].tolist())
+        slow = time.perf_counter() - t0
+        first, active, _, _ = cohorts.cohort_matrix(
+            customers[:sample], months[:sample], categories[:sample], options['categories'],
+        )
+        got = {
+            (int(s), int(first + c), int(k)): int(v)
+            for (s, c, k), v in np.ndenumerate(active) if v
+        }
+        self.stdout.write(
+            f'{sample} bookings: Python loop {slow * 1000:.0f} ms; '
+            f'{"same" if got == expected else "DIFFERENT"} matrix ({len(expected)} non-empty cells)'
+        )
+
+    @staticmethod
+    def loop(customers, months, categories, max_offset=cohorts.MAX_OFFSET):
+        active_months = defaultdict(set)
+        for customer, month, category in zip(customers, months, categories):
+            active_months[category, customer].add(month)
+        counts = defaultdict(int)
+        for (category, _), booked in active_months.items():
+            cohort = min(booked)
+            for month in booked:
+                if month - cohort <= max_offset:
+                    counts[category, cohort, month - cohort] += 1
+        return dict(counts)
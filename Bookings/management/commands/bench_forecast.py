@@ -0,0 +1,89 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from Accounts.models import User
+from Bookings import forecast
+from Bookings.models import Booking
+from Services.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the demand forecast (Bookings.forecast): the full refit on years of synthetic bookings, '
+        'the NumPy fit alone, and its error against the known demand the bookings were drawn from. '
+        'Seeds rows inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--per-day', type=int, default=150, help='Average bookings per day over all categories.')
+
+    def handle(self, *args, **options):
+        np = forecast.np
+        if np is None:
+            raise CommandError('numpy is required.')
+        rng = np.random.default_rng(9)
+        days = options['years'] * 365
+        categories = [c for c, _ in Service.CATEGORY_CHOICES]
+        today = timezone.localdate()
+        start = today - datetime.timedelta(days=days)
+
+        # Known demand: per-category level, slow growth and a weekend peak.
+        t = np.arange(days + forecast.HORIZON)
+        weekday = (start.weekday() + t) % 7
+        share = rng.dirichlet(np.ones(len(categories)) * 4)
+        growth = rng.uniform(-0.0003, 0.001, len(categories))
+        weekly = np.where(weekday >= 5, 1.5, 0.8)
+        demand = options['per_day'] * share[:, None] * (1 + growth[:, None] * t) * weekly
+        counts = rng.poisson(demand[:, :days])
+
+        t0 = time.perf_counter()
+        for _ in range(20):
+            expected, low, high = forecast.fit_forecast(counts.astype(np.float64), start.weekday())
+        fit_ms = (time.perf_counter() - t0) * 1000 / 20
+        truth = demand[:, days:]
+        error = np.abs(expected - truth).sum() / truth.sum()
+        actual = rng.poisson(truth)
+        covered = ((actual >= np.floor(low)) & (actual <= np.ceil(high))).mean()
+        self.stdout.write(
+            f'fit {len(categories)} categories x {days} days: {fit_ms:.2f} ms; '
+            f'error vs true demand {error:.1%}; {covered:.0%} of sampled days inside the 80% band'
+        )
+
+        with transaction.atomic():
+            self.seed(counts, categories, start)
+            t0 = time.perf_counter()
+            written = forecast.refresh_demand_forecast(today=today)
+            self.stdout.write(
+                f'refresh_demand_forecast over {int(counts.sum())} bookings: {written} rows in '
+                f'{(time.perf_counter() - t0) * 1000:.0f} ms'
+            )
+            transaction.set_rollback(True)
+
+    def seed(self, counts, categories, start):
+        password = User().password or '!'
+        provider, customer = User.objects.bulk_create([
+            User(username='bench-forecast-provider', password=password, is_provider=True, company_name='Bench Co'),
+            User(username='bench-forecast-customer', password=password, is_customer=True),
+        ])
+        services = Service.objects.bulk_create([
+            Service(name=f'Bench {category}', category=category, price=500, provider=provider)
+            for category in categories
+        ])
+        t0 = time.perf_counter()
+        batch = []
+        for c, d in zip(*counts.nonzero()):
+            day = start + datetime.timedelta(days=int(d))
+            batch.extend(
+                Booking(customer=customer, service=services[c], date=day, time=datetime.time(9))
+                for _ in range(counts[c, d])
+            )
+            if len(batch) >= 5000:
+                Booking.objects.bulk_create(batch)
+                batch = []
+        Booking.objects.bulk_create(batch)
+        self.stdout.write(f'seeded {int(counts.sum())} bookings in {time.perf_counter() - t0:.0f} s')
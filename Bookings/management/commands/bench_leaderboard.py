@@ -0,0 +1,114 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from Accounts.models import User
+from Bookings.models import Booking, ReviewRating
+from Bookings.ranking import (
+    DEFAULT_MEAN_RATING, FINISHED_STATUSES, category_leaders, provider_score, refresh_provider_scores,
+    smoothed_completion, smoothed_rating,
+)
+from HomeService.benchmarks import scratch_database, timed
+from Services.algorithm_utils import get_rating_summary_for_providers
+from Services.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the per-category provider leaderboards (Bookings.ranking): rebuild and incremental '
+        'refresh times, and reading a top 10 from the score index versus aggregating bookings and reviews '
+        'per request. Seeds synthetic rows into a scratch test database that is destroyed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--providers', type=int, default=5000)
+        parser.add_argument('--bookings', type=int, default=100_000)
+        parser.add_argument('--reads', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.seed(options['providers'], options['bookings'])
+            self.run(options['reads'])
+
+    def seed(self, n_providers, n_bookings):
+        rng = random.Random(5)
+        password = User().password or '!'
+        users = User.objects.bulk_create([
+            User(username=f'bench-provider-{i}', password=password, is_provider=True, company_name=f'Bench Co {i % 50}')
+            for i in range(n_providers)
+        ] + [User(username='bench-customer', password=password, is_customer=True)], batch_size=1000)
+        providers, customer = users[:-1], users[-1]
+        categories = [c for c, _ in Service.CATEGORY_CHOICES]
+        services = Service.objects.bulk_create([
+            Service(name=f'Service {i}', category=categories[i % len(categories)], price=500, provider=provider)
+            for i, provider in enumerate(providers)
+        ], batch_size=1000)
+        now = timezone.now()
+        statuses = ['Completed'] * 6 + ['Not Available', 'Expired', 'Pending', 'Accepted']
+        bookings = []
+        for i in range(n_bookings):
+            status = rng.choice(statuses)
+            bookings.append(Booking(
+                customer=customer, service=rng.choice(services), date=datetime.date.today(),
+                time=datetime.time(9 + i % 8), status=status,
+                completed_at=now - datetime.timedelta(days=rng.randint(0, 365)) if status == 'Completed' else None,
+            ))
+        bookings = Booking.objects.bulk_create(bookings, batch_size=1000)
+        ReviewRating.objects.bulk_create([
+            ReviewRating(provider_id=booking.service.provider_id, customer=customer, booking=booking,
+                         rating=rng.choice([3, 4, 4, 5, 5]))
+            for booking in bookings[:n_bookings // 4]
+        ], batch_size=1000)
+        self.bookings = bookings
+        self.stdout.write(f'seeded {n_providers} providers, {n_bookings} bookings, {n_bookings // 4} reviews')
+
+    def aggregate_top(self, category, now):
+        """What a page would do without the table: aggregate every provider in the category, then sort."""
+        mean = ReviewRating.objects.filter(status=True).aggregate(avg=Avg('rating'))['avg'] or DEFAULT_MEAN_RATING
+        provider_ids = Service.objects.filter(category=category).values_list('provider_id', flat=True).distinct()
+        ratings = get_rating_summary_for_providers(list(provider_ids))
+        rows = (
+            Booking.objects.filter(service__category=category)
+            .values_list('service__provider_id')
+            .annotate(
+                finished=Count('id', filter=Q(status__in=FINISHED_STATUSES)),
+                completed=Count('id', filter=Q(status='Completed')),
+                last=Max('completed_at', filter=Q(status='Completed')),
+            )
+            .order_by()
+        )
+        scored = [
+            (provider_score(self.rating(ratings.get(pid), mean), smoothed_completion(completed, finished), last, now), pid)
+            for pid, finished, completed, last in rows
+        ]
+        return sorted(scored, reverse=True)[:10]
+
+    @staticmethod
+    def rating(summary, mean):
+        if not summary:
+            return smoothed_rating(None, 0, mean)
+        return smoothed_rating(float(summary['avg']), summary['n'], mean)
+
+    def run(self, reads):
+        # Past the settle delay, so the seeded rows count as already scored.
+        now = timezone.now() + datetime.timedelta(minutes=1)
+        t0 = time.perf_counter()
+        written = refresh_provider_scores(rebuild=True, now=now)
+        self.stdout.write(f'rebuild: {written} scores in {(time.perf_counter() - t0) * 1000:.0f} ms')
+
+        touched = random.Random(6).sample(self.bookings, 50)
+        Booking.objects.filter(id__in=[b.id for b in touched]).update(
+            status='Completed', completed_at=now, updated_at=now + datetime.timedelta(seconds=1),
+        )
+        t0 = time.perf_counter()
+        written = refresh_provider_scores(now=now + datetime.timedelta(seconds=10))
+        self.stdout.write(f'incremental after 50 booking changes: {written} scores in '
+                          f'{(time.perf_counter() - t0) * 1000:.0f} ms')
+
+        timed(self.stdout, 'top 10 from score index', lambda: category_leaders('Plumbing'), reads)
+        timed(self.stdout, 'top 10 aggregated per request', lambda: self.aggregate_top('Plumbing', now),
+              max(reads // 20, 3))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Bookings import cohorts
+
+
+class Command(BaseCommand):
+    help = 'Compute monthly retention cohorts per category (needs numpy) and cache them for the dashboard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=cohorts.MAX_OFFSET, help='Months after the first booking.')
+        parser.add_argument('--cohorts', type=int, default=cohorts.MAX_COHORTS, help='Most recent cohorts kept.')
+
+    def handle(self, *args, **options):
+        if cohorts.np is None:
+            raise CommandError('numpy is required: pip install numpy')
+        result = cohorts.build_cohorts(max_offset=options['months'], max_cohorts=options['cohorts'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Cached cohorts for {len(result["segments"])} segment(s) from {result["bookings"]} booking(s).'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from Bookings.recurring import HORIZON_DAYS, materialize_occurrences
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming occurrences of recurring bookings inside the rolling horizon.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=HORIZON_DAYS,
+            help=f'Days ahead to materialize (default {HORIZON_DAYS}).',
+        )
+
+    def handle(self, *args, **options):
+        created = materialize_occurrences(horizon_days=options['horizon'])
+        self.stdout.write(self.style.SUCCESS(f'Materialized {created} occurrence(s).'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Bookings import forecast
+
+
+class Command(BaseCommand):
+    help = 'Refit per-category demand (weekday seasonality and trend) and store the next days (needs numpy).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=forecast.HORIZON, help='Days to forecast from today.')
+
+    def handle(self, *args, **options):
+        if forecast.np is None:
+            raise CommandError('numpy is required: pip install numpy')
+        written = forecast.refresh_demand_forecast(horizon=options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} forecast day(s).'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from Bookings.ranking import refresh_provider_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-category ranking scores for providers whose bookings or reviews changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Discard stored scores and recompute every bookable provider.',
+        )
+
+    def handle(self, *args, **options):
+        written = refresh_provider_scores(rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {written} provider category score(s).'))
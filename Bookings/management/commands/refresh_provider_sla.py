@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from Bookings.sla import refresh_provider_sla
+
+
+class Command(BaseCommand):
+    help = 'Fold new booking transitions into per-provider response/completion percentiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Discard stored sketches and recompute from every booking.',
+        )
+
+    def handle(self, *args, **options):
+        touched = refresh_provider_sla(rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f'Updated SLA stats for {touched} provider(s).'))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Bookings.scheduler import BookingScheduler
+
+
+class Command(BaseCommand):
+    help = 'Send booking reminders and expire overdue Pending bookings from a timing wheel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run one pass and exit (for cron).')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between ticks.')
+        parser.add_argument(
+            '--reload-every',
+            type=int,
+            default=10,
+            help='Ticks between reloads of the wheel, to pick up new or changed bookings.',
+        )
+
+    def handle(self, *args, **options):
+        scheduler = BookingScheduler()
+        ticks = 0
+        while True:
+            if ticks % max(options['reload_every'], 1) == 0:
+                swept, loaded = scheduler.reload()
+                self.stdout.write(f'Expired {swept} overdue Pending booking(s), loaded {loaded} timer(s).')
+            done = scheduler.tick()
+            if done['remind'] or done['expire']:
+                self.stdout.write(f"Sent {done['remind']} reminder(s), expired {done['expire']} booking(s).")
+            if options['once']:
+                return
+            ticks += 1
+            close_old_connections()
+            time.sleep(options['interval'])
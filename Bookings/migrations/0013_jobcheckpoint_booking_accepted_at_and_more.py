@@ -0,0 +1,66 @@
+# Generated by Django 6.0 on 2026-10-19 15:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0012_alter_reviewrating_options_reviewrating_booking_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='accepted_at',
+            field=models.DateTimeField(blank=True, help_text='When the provider accepted the booking', null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, help_text='When the provider completed the booking', null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, help_text='When the customer paid', null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='ProviderSLA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response_p50', models.FloatField(blank=True, help_text='Seconds from booking to acceptance', null=True)),
+                ('response_p90', models.FloatField(blank=True, null=True)),
+                ('response_count', models.PositiveIntegerField(default=0)),
+                ('completion_p50', models.FloatField(blank=True, help_text='Seconds from acceptance to completion', null=True)),
+                ('completion_p90', models.FloatField(blank=True, null=True)),
+                ('completion_count', models.PositiveIntegerField(default=0)),
+                ('response_sketch', models.JSONField(blank=True, default=dict)),
+                ('completion_sketch', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('provider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sla', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 15:53
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0013_jobcheckpoint_booking_accepted_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_start', models.TimeField(default=datetime.time(9, 0), help_text='First bookable slot of the day')),
+                ('day_end', models.TimeField(default=datetime.time(18, 0), help_text='Slots must finish by this time')),
+                ('slot_minutes', models.PositiveIntegerField(default=60, help_text='Length of one booking slot')),
+                ('working_days', models.CharField(default='0123456', help_text='Weekday numbers the provider works (0 = Monday ... 6 = Sunday)', max_length=7)),
+                ('provider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
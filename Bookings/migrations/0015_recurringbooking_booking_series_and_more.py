@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 16:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0014_providerschedule'),
+        ('Services', '0006_delete_reviewrating'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('Weekly', 'Weekly'), ('Biweekly', 'Every 2 weeks'), ('Monthly', 'Monthly')], default='Weekly', max_length=10)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, help_text='Last date an occurrence may fall on', null=True)),
+                ('time', models.TimeField()),
+                ('address', models.TextField(blank=True, help_text='Service address', null=True)),
+                ('phone_number', models.CharField(blank=True, help_text='Customer phone number', max_length=15, null=True)),
+                ('payment_method', models.CharField(default='Cash', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('materialized_until', models.DateField(blank=True, help_text='Occurrences exist up to and including this date', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_bookings', to=settings.AUTH_USER_MODEL)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Services.service')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='Bookings.recurringbooking'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('series', 'date'), name='unique_series_occurrence'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 16:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0016_checkout_booking_checkout'),
+        ('Services', '0006_delete_reviewrating'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, help_text='When the upcoming-visit reminder was sent', null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Accepted', 'Accepted'), ('Completed', 'Completed'), ('Not Available', 'Not Available'), ('Expired', 'Expired')], default='Pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'date', 'time'], name='booking_status_date_time'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-19 16:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0017_booking_reminded_at_alter_booking_status_and_more'),
+        ('Services', '0006_delete_reviewrating'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderCategoryScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('Plumbing', 'Plumbing'), ('Electrical', 'Electrical'), ('Cleaning', 'Cleaning'), ('Painting', 'Painting'), ('Appliance Repair', 'Appliance Repair'), ('Handyman', 'Handyman')], max_length=50)),
+                ('rating', models.FloatField(help_text='Bayesian-smoothed average rating (1-5)')),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('completion_rate', models.FloatField(help_text='Smoothed share of finished bookings that were completed')),
+                ('finished_count', models.PositiveIntegerField(default=0, help_text='Completed, Not Available or Expired bookings')),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='booking_updated_at'),
+        ),
+        migrations.AddField(
+            model_name='providercategoryscore',
+            name='provider',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_scores', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='providercategoryscore',
+            index=models.Index(fields=['category', '-score', 'provider'], name='score_category_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='providercategoryscore',
+            constraint=models.UniqueConstraint(fields=('provider', 'category'), name='unique_provider_category_score'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0018_providercategoryscore_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('Plumbing', 'Plumbing'), ('Electrical', 'Electrical'), ('Cleaning', 'Cleaning'), ('Painting', 'Painting'), ('Appliance Repair', 'Appliance Repair'), ('Handyman', 'Handyman')], max_length=50)),
+                ('date', models.DateField()),
+                ('expected', models.FloatField(help_text='Forecast number of bookings for that date')),
+                ('low', models.FloatField(help_text='Lower end of the 80% band')),
+                ('high', models.FloatField(help_text='Upper end of the 80% band')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'date'), name='unique_demand_forecast_day')],
+            },
+        ),
+    ]
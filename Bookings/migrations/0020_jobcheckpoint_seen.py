@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0019_demandforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobcheckpoint',
+            name='seen',
+            field=models.JSONField(blank=True, default=dict, help_text='Ids already counted just before value, for jobs that re-read an overlap'),
+        ),
+    ]
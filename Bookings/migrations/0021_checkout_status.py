@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+def mark_paid_checkouts(apps, schema_editor):
+    Checkout = apps.get_model('Bookings', 'Checkout')
+    Booking = apps.get_model('Bookings', 'Booking')
+    unpaid = (
+        Booking.objects.filter(checkout__isnull=False)
+        .exclude(payment_status__in=('Paid', 'Received'))
+        .values('checkout_id')
+    )
+    Checkout.objects.filter(bookings__isnull=False).exclude(id__in=unpaid).update(status='Paid')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Bookings', '0020_jobcheckpoint_seen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkout',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Paid', 'Paid')], default='Pending', max_length=20),
+        ),
+        migrations.RunPython(mark_paid_checkouts, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,63 @@
+import datetime
+import uuid
+
 from django.db import models
+from django.utils import timezone
 from Accounts.models import User
 from Services.models import Service
 
+class RecurringBooking(models.Model):
+    """One row per repeating booking; occurrences are materialized by Bookings.recurring."""
+    FREQUENCY_CHOICES = [
+        ('Weekly', 'Weekly'),
+        ('Biweekly', 'Every 2 weeks'),
+        ('Monthly', 'Monthly'),
+    ]
+
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_bookings')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='Weekly')
+    start_date = models.DateField()
+    end_date = models.DateField(blank=True, null=True, help_text="Last date an occurrence may fall on")
+    time = models.TimeField()
+    address = models.TextField(help_text="Service address", blank=True, null=True)
+    phone_number = models.CharField(max_length=15, blank=True, null=True, help_text="Customer phone number")
+    payment_method = models.CharField(max_length=20, default='Cash')
+    is_active = models.BooleanField(default=True)
+    materialized_until = models.DateField(
+        blank=True, null=True, help_text="Occurrences exist up to and including this date",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.get_frequency_display()} {self.service} for {self.customer}'
+
+
+class Checkout(models.Model):
+    """One cart checkout: several bookings created together and paid with a single payment."""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Paid', 'Paid'),
+    ]
+
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='checkouts')
+    payment_method = models.CharField(max_length=20, default='Cash')
+    total_amount = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    transaction_uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Checkout #{self.pk}'
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
     ('Pending', 'Pending'),
     ('Accepted', 'Accepted'),
     ('Completed', 'Completed'),
     ('Not Available', 'Not Available'),
+    ('Expired', 'Expired'),
 ]
     
     PAYMENT_METHOD_CHOICES = [
@@ -35,6 +85,52 @@ class Booking(models.Model):
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='Pending')
     payment_cancel = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='Failed')
     payment_received = models.BooleanField(default=False, help_text="Mark as received by provider")
+    checkout = models.ForeignKey(
+        Checkout,
+        on_delete=models.SET_NULL,
+        related_name='bookings',
+        null=True,
+        blank=True,
+    )
+    series = models.ForeignKey(
+        RecurringBooking,
+        on_delete=models.SET_NULL,
+        related_name='occurrences',
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    accepted_at = models.DateTimeField(blank=True, null=True, help_text="When the provider accepted the booking")
+    completed_at = models.DateTimeField(blank=True, null=True, help_text="When the provider completed the booking")
+    paid_at = models.DateTimeField(blank=True, null=True, help_text="When the customer paid")
+    reminded_at = models.DateTimeField(blank=True, null=True, help_text="When the upcoming-visit reminder was sent")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'date'], name='unique_series_occurrence'),
+        ]
+        indexes = [
+            # Scheduler and dashboard scans: "Pending bookings due before X".
+            models.Index(fields=['status', 'date', 'time'], name='booking_status_date_time'),
+            # Incremental jobs and event polling: "bookings changed since X".
+            models.Index(fields=['updated_at'], name='booking_updated_at'),
+        ]
+
+    def set_status(self, new_status):
+        """Change status and stamp the transition time the first time a state is reached."""
+        now = timezone.now()
+        self.status = new_status
+        if new_status in ('Accepted', 'Completed') and self.accepted_at is None:
+            self.accepted_at = now
+        if new_status == 'Completed' and self.completed_at is None:
+            self.completed_at = now
+
+    def mark_paid(self):
+        """Customer-side payment: set status Paid and stamp paid_at."""
+        self.payment_status = 'Paid'
+        if self.paid_at is None:
+            self.paid_at = timezone.now()
 
 class ReviewRating(models.Model):
     provider = models.ForeignKey(
@@ -69,3 +165,93 @@ class ReviewRating(models.Model):
 
     def __str__(self):
         return self.subject or f'Review #{self.pk}'
+
+
+class ProviderSchedule(models.Model):
+    """Working hours and slot length used by the availability engine (Bookings.availability)."""
+    provider = models.OneToOneField(User, on_delete=models.CASCADE, related_name='schedule')
+    day_start = models.TimeField(default=datetime.time(9, 0), help_text="First bookable slot of the day")
+    day_end = models.TimeField(default=datetime.time(18, 0), help_text="Slots must finish by this time")
+    slot_minutes = models.PositiveIntegerField(default=60, help_text="Length of one booking slot")
+    working_days = models.CharField(
+        max_length=7,
+        default='0123456',
+        help_text="Weekday numbers the provider works (0 = Monday ... 6 = Sunday)",
+    )
+
+    def __str__(self):
+        return f'Schedule for {self.provider}'
+
+
+class ProviderSLA(models.Model):
+    """Per-provider response / completion percentiles, refreshed by `refresh_provider_sla`."""
+    provider = models.OneToOneField(User, on_delete=models.CASCADE, related_name='sla')
+    response_p50 = models.FloatField(blank=True, null=True, help_text="Seconds from booking to acceptance")
+    response_p90 = models.FloatField(blank=True, null=True)
+    response_count = models.PositiveIntegerField(default=0)
+    completion_p50 = models.FloatField(blank=True, null=True, help_text="Seconds from acceptance to completion")
+    completion_p90 = models.FloatField(blank=True, null=True)
+    completion_count = models.PositiveIntegerField(default=0)
+    response_sketch = models.JSONField(default=dict, blank=True)
+    completion_sketch = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'SLA for {self.provider}'
+
+
+class ProviderCategoryScore(models.Model):
+    """Ranking score per provider and category, maintained by `refresh_provider_scores`."""
+    provider = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_scores')
+    category = models.CharField(max_length=50, choices=Service.CATEGORY_CHOICES)
+    rating = models.FloatField(help_text="Bayesian-smoothed average rating (1-5)")
+    rating_count = models.PositiveIntegerField(default=0)
+    completion_rate = models.FloatField(help_text="Smoothed share of finished bookings that were completed")
+    finished_count = models.PositiveIntegerField(default=0, help_text="Completed, Not Available or Expired bookings")
+    last_completed_at = models.DateTimeField(blank=True, null=True)
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'category'], name='unique_provider_category_score'),
+        ]
+        indexes = [
+            # Leaderboards: "top N in a category" is one range read.
+            models.Index(fields=['category', '-score', 'provider'], name='score_category_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.provider} in {self.category}: {self.score:.3f}'
+
+
+class DemandForecast(models.Model):
+    """Expected bookings per category and service date, refitted by `refresh_demand_forecast`."""
+    category = models.CharField(max_length=50, choices=Service.CATEGORY_CHOICES)
+    date = models.DateField()
+    expected = models.FloatField(help_text="Forecast number of bookings for that date")
+    low = models.FloatField(help_text="Lower end of the 80% band")
+    high = models.FloatField(help_text="Upper end of the 80% band")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also the lookup index: a category's next days are one range read.
+            models.UniqueConstraint(fields=['category', 'date'], name='unique_demand_forecast_day'),
+        ]
+
+    def __str__(self):
+        return f'{self.category} on {self.date}: {self.expected:.1f}'
+
+
+class JobCheckpoint(models.Model):
+    """High-water mark for incremental background jobs (one row per job name)."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField(blank=True, null=True)
+    seen = models.JSONField(
+        default=dict, blank=True, help_text="Ids already counted just before value, for jobs that re-read an overlap",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} @ {self.value}'
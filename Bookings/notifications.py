@@ -0,0 +1,47 @@
+"""Outgoing booking notifications (email)."""
+from django.conf import settings
+from django.core.mail import send_mail, send_mass_mail
+
+
+def send_booking_reminders(bookings):
+    """One reminder to the customer and one to the provider per booking, over a single connection."""
+    messages = []
+    for b in bookings:
+        when = f'{b.date:%b %d, %Y} at {b.time:%I:%M %p}'
+        provider = b.service.provider
+        if b.customer.email:
+            messages.append((
+                f'Reminder: {b.service.name} on {when}',
+                f'Hi {b.customer.username},\n\n'
+                f'This is a reminder for Booking #{b.id} ({b.service.name}) with '
+                f'{provider.company_name or provider.username} on {when}.\n'
+                f'Status: {b.status}.\n',
+                settings.DEFAULT_FROM_EMAIL,
+                [b.customer.email],
+            ))
+        if provider.email:
+            messages.append((
+                f'Upcoming booking #{b.id} on {when}',
+                f'Hi {provider.username},\n\n'
+                f'Booking #{b.id} ({b.service.name}) for {b.customer.username} is on {when}.\n'
+                f'Address: {b.address or "-"}\nPhone: {b.phone_number or "-"}\nStatus: {b.status}.\n',
+                settings.DEFAULT_FROM_EMAIL,
+                [provider.email],
+            ))
+    if messages:
+        send_mass_mail(messages, fail_silently=True)
+    return len(messages)
+
+
+def send_status_update(booking):
+    """Tell the customer their booking changed status."""
+    if not booking.customer.email:
+        return 0
+    return send_mail(
+        f'Booking #{booking.id} is now {booking.status}',
+        f'Hi {booking.customer.username},\n\n'
+        f'Your booking #{booking.id} ({booking.service.name}) on {booking.date:%b %d, %Y} '
+        f'is now {booking.status}.\nPayment: {booking.payment_status}.\n',
+        settings.DEFAULT_FROM_EMAIL,
+        [booking.customer.email],
+    )
@@ -0,0 +1,189 @@
+"""
+Provider ranking : per-category quality score with incremental refresh.
+
+    score = 0.6 * rating / 5 + 0.3 * completion_rate + 0.1 * recency
+
+rating is the provider's average review pulled towards the marketplace mean by
+RATING_PRIOR_WEIGHT phantom reviews, so one 5-star review does not outrank fifty
+4.8s. completion_rate is completed / finished bookings in the category, smoothed
+the same way towards COMPLETION_PRIOR. recency halves every RECENCY_HALF_LIFE
+since the provider's last completed booking in the category.
+
+Each run recomputes only the providers whose bookings or reviews changed since the
+last checkpoint, plus bookable (provider, category) pairs that have no row yet and
+rows older than STALE_AFTER (so recency keeps decaying). Leaderboards then read
+the (category, -score) index.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, Max, OuterRef, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from Services.algorithm_utils import get_rating_summary_for_providers
+from Services.models import Service
+from Services.versions import bump
+from .models import Booking, JobCheckpoint, ProviderCategoryScore, ReviewRating
+
+CHECKPOINT_NAME = 'provider_scores'
+SETTLE_DELAY = timedelta(seconds=5)
+STALE_AFTER = timedelta(days=1)
+BATCH_SIZE = 500
+LEADERBOARD_SIZE = 10
+
+RATING_PRIOR_WEIGHT = 5
+DEFAULT_MEAN_RATING = 4.0
+COMPLETION_PRIOR = 0.8
+COMPLETION_PRIOR_WEIGHT = 5
+RECENCY_HALF_LIFE = timedelta(days=60)
+WEIGHTS = {'rating': 0.6, 'completion': 0.3, 'recency': 0.1}
+FINISHED_STATUSES = ('Completed', 'Not Available', 'Expired')
+
+
+def smoothed_rating(avg, count, mean):
+    """Bayesian average: count reviews averaging avg plus RATING_PRIOR_WEIGHT reviews at mean."""
+    return (mean * RATING_PRIOR_WEIGHT + (avg or 0) * count) / (RATING_PRIOR_WEIGHT + count)
+
+
+def smoothed_completion(completed, finished):
+    return (COMPLETION_PRIOR * COMPLETION_PRIOR_WEIGHT + completed) / (COMPLETION_PRIOR_WEIGHT + finished)
+
+
+def recency(last_completed_at, now):
+    if last_completed_at is None:
+        return 0.0
+    age = max((now - last_completed_at).total_seconds(), 0.0)
+    return 0.5 ** (age / RECENCY_HALF_LIFE.total_seconds())
+
+
+def provider_score(rating, completion_rate, last_completed_at, now):
+    return (
+        WEIGHTS['rating'] * rating / 5
+        + WEIGHTS['completion'] * completion_rate
+        + WEIGHTS['recency'] * recency(last_completed_at, now)
+    )
+
+
+def _bookable_categories(provider_ids=None):
+    """{provider_id: {category, ...}} for bookable providers (all of them when provider_ids is None)."""
+    qs = Service.objects.filter(provider__is_provider=True).exclude(provider__company_name='')
+    if provider_ids is not None:
+        qs = qs.filter(provider_id__in=provider_ids)
+    categories = defaultdict(set)
+    for provider_id, category in qs.values_list('provider_id', 'category').distinct().order_by():
+        categories[provider_id].add(category)
+    return categories
+
+
+def _changed_providers(lower, upper, now):
+    """Providers whose scores may have moved since lower."""
+    changed = set(
+        Booking.objects.filter(updated_at__gt=lower, updated_at__lte=upper)
+        .values_list('service__provider_id', flat=True).distinct().order_by()
+    )
+    changed |= set(
+        ReviewRating.objects.filter(updated_at__gt=lower, updated_at__lte=upper)
+        .values_list('provider_id', flat=True).distinct().order_by()
+    )
+    # Offered categories without a row yet: new services, newly bookable providers.
+    unscored = Service.objects.filter(provider__is_provider=True).exclude(provider__company_name='').filter(
+        ~Exists(ProviderCategoryScore.objects.filter(provider_id=OuterRef('provider_id'), category=OuterRef('category')))
+    )
+    changed |= set(unscored.values_list('provider_id', flat=True).distinct().order_by())
+    changed |= set(
+        ProviderCategoryScore.objects.filter(updated_at__lt=now - STALE_AFTER)
+        .values_list('provider_id', flat=True).distinct().order_by()
+    )
+    return changed
+
+
+def _score_batch(provider_ids, categories, mean, now):
+    """Recompute every row of provider_ids; rows for categories no longer offered are deleted."""
+    ratings = get_rating_summary_for_providers(provider_ids)
+    bookings = (
+        Booking.objects.filter(service__provider_id__in=provider_ids)
+        .values_list('service__provider_id', 'service__category')
+        .annotate(
+            finished=Count('id', filter=Q(status__in=FINISHED_STATUSES)),
+            completed=Count('id', filter=Q(status='Completed')),
+            # Bookings completed before completed_at existed fall back to their last update.
+            last_completed_at=Max(Coalesce('completed_at', 'updated_at'), filter=Q(status='Completed')),
+        )
+        .order_by()
+    )
+    stats = {(provider_id, category): rest for provider_id, category, *rest in bookings}
+    existing = {
+        (row.provider_id, row.category): row
+        for row in ProviderCategoryScore.objects.filter(provider_id__in=provider_ids)
+    }
+
+    to_create, to_update = [], []
+    for provider_id in provider_ids:
+        summary = ratings.get(provider_id)
+        rating_count = summary['n'] if summary else 0
+        rating = smoothed_rating(float(summary['avg']) if rating_count else None, rating_count, mean)
+        for category in categories.get(provider_id, ()):
+            finished, completed, last_completed_at = stats.get((provider_id, category), (0, 0, None))
+            row = existing.pop((provider_id, category), None)
+            if row is None:
+                row = ProviderCategoryScore(provider_id=provider_id, category=category)
+                to_create.append(row)
+            else:
+                to_update.append(row)
+            row.rating = rating
+            row.rating_count = rating_count
+            row.completion_rate = smoothed_completion(completed, finished)
+            row.finished_count = finished
+            row.last_completed_at = last_completed_at
+            row.score = provider_score(row.rating, row.completion_rate, last_completed_at, now)
+            row.updated_at = now
+
+    ProviderCategoryScore.objects.bulk_create(to_create)
+    ProviderCategoryScore.objects.bulk_update(
+        to_update,
+        ['rating', 'rating_count', 'completion_rate', 'finished_count', 'last_completed_at', 'score', 'updated_at'],
+    )
+    if existing:
+        ProviderCategoryScore.objects.filter(id__in=[row.id for row in existing.values()]).delete()
+    return len(to_create) + len(to_update)
+
+
+def refresh_provider_scores(rebuild=False, now=None):
+    """Recompute the scores of providers touched since the last run. Returns number of rows written."""
+    now = now or timezone.now()
+    upper = now - SETTLE_DELAY
+
+    with transaction.atomic():
+        checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+        categories = None
+        if rebuild or checkpoint.value is None:
+            ProviderCategoryScore.objects.all().delete()
+            categories = _bookable_categories()
+            provider_ids = sorted(categories)
+        else:
+            provider_ids = sorted(_changed_providers(checkpoint.value, upper, now))
+
+        mean = ReviewRating.objects.filter(status=True).aggregate(avg=Avg('rating'))['avg'] or DEFAULT_MEAN_RATING
+        written = 0
+        for start in range(0, len(provider_ids), BATCH_SIZE):
+            batch = provider_ids[start:start + BATCH_SIZE]
+            written += _score_batch(batch, categories or _bookable_categories(batch), mean, now)
+
+        checkpoint.value = upper
+        checkpoint.save(update_fields=['value', 'updated_at'])
+
+    if provider_ids:
+        bump('scores')
+    return written
+
+
+def category_leaders(category, limit=LEADERBOARD_SIZE):
+    """Top providers in category by score, best first: one range read of score_category_rank."""
+    return list(
+        ProviderCategoryScore.objects.filter(category=category, provider__is_provider=True)
+        .exclude(provider__company_name='')
+        .select_related('provider')
+        .order_by('-score', 'provider_id')[:limit]
+    )
@@ -0,0 +1,131 @@
+"""
+Recurring bookings : lazy occurrence materialization.
+
+A RecurringBooking row stores the rule; Booking rows for it only exist inside a
+rolling horizon. `materialize_occurrences` (run by the scheduled
+`materialize_recurring_bookings` command) extends every active series up to
+today + horizon with one bulk_create, so listings show upcoming visits without
+pre-generating years of rows. Occurrences that overlap a booking the provider
+has already accepted are skipped, like missed dates.
+"""
+import calendar
+import datetime
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from Services.models import Service
+from Services.tasks import record_booked_prices
+from Services.versions import bump_services
+from .availability import find_conflicts
+from .models import Booking, RecurringBooking
+
+HORIZON_DAYS = getattr(settings, 'RECURRING_BOOKING_HORIZON_DAYS', 28)
+
+
+def _add_months(date, months, anchor_day):
+    month_index = date.month - 1 + months
+    year, month = date.year + month_index // 12, month_index % 12 + 1
+    return datetime.date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_dates(series, after, until):
+    """Dates of `series` in (after, until]; `after=None` starts at series.start_date."""
+    last = until if series.end_date is None else min(until, series.end_date)
+    start = series.start_date
+    if series.frequency == 'Monthly':
+        n = 0
+        day = start
+        while day <= last:
+            if after is None or day > after:
+                yield day
+            n += 1
+            day = _add_months(start, n, start.day)
+        return
+
+    step = 14 if series.frequency == 'Biweekly' else 7
+    day = start
+    if after is not None and after >= start:
+        # Jump straight to the first occurrence after `after`.
+        day = start + datetime.timedelta(days=((after - start).days // step + 1) * step)
+    while day <= last:
+        yield day
+        day += datetime.timedelta(days=step)
+
+
+def materialize_series(series_list, horizon_days=HORIZON_DAYS, today=None):
+    """Create missing occurrences for the given series up to today + horizon; returns rows created."""
+    today = today or timezone.localdate()
+    until = today + datetime.timedelta(days=horizon_days)
+    new_bookings, touched = [], []
+
+    # Never materialize into the past; missed dates are skipped, not back-filled.
+    floor = today - datetime.timedelta(days=1)
+
+    services = {
+        service_id: rest for service_id, *rest in Service.objects.filter(
+            id__in={series.service_id for series in series_list},
+        ).values_list('id', 'provider_id', 'category')
+    }
+    with transaction.atomic():
+        # Lock the series and re-read how far they got, so overlapping runs never insert twice.
+        reached = dict(
+            RecurringBooking.objects.select_for_update()
+            .filter(id__in=[series.id for series in series_list])
+            .values_list('id', 'materialized_until')
+        )
+        for series in series_list:
+            if series.id not in reached or series.service_id not in services:
+                continue
+            series.materialized_until = reached[series.id]
+            after = max(series.materialized_until or floor, floor)
+            for day in occurrence_dates(series, after, until):
+                new_bookings.append(Booking(
+                    customer_id=series.customer_id,
+                    service_id=series.service_id,
+                    series=series,
+                    date=day,
+                    time=series.time,
+                    address=series.address,
+                    phone_number=series.phone_number,
+                    payment_method=series.payment_method,
+                    payment_status='Pending',
+                ))
+            series.materialized_until = until
+            if series.end_date is not None and series.end_date <= until:
+                series.is_active = False
+            touched.append(series)
+
+        # Pending occurrences may overlap each other, but not an accepted booking.
+        skipped = set(find_conflicts(
+            [(services[b.service_id][0], b.date, b.time) for b in new_bookings], among_requests=False,
+        ))
+        created = Booking.objects.bulk_create(
+            [b for i, b in enumerate(new_bookings) if i not in skipped], batch_size=500,
+        )
+        RecurringBooking.objects.bulk_update(touched, ['materialized_until', 'is_active'], batch_size=500)
+    if created:
+        bump_services(tuple(services[b.service_id]) for b in created)
+        transaction.on_commit(partial(record_booked_prices.enqueue, [b.service_id for b in created]))
+    return len(created)
+
+
+def materialize_occurrences(horizon_days=HORIZON_DAYS, today=None, batch_size=1000):
+    """Extend every active series whose occurrences stop short of the horizon."""
+    today = today or timezone.localdate()
+    until = today + datetime.timedelta(days=horizon_days)
+    pending = (
+        RecurringBooking.objects.filter(is_active=True)
+        .exclude(materialized_until__gte=until)
+        .order_by('id')
+    )
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        total += materialize_series(batch, horizon_days=horizon_days, today=today)
+        last_id = batch[-1].id
@@ -0,0 +1,185 @@
+"""
+Booking scheduler : hierarchical timing wheel for reminders and Pending expiry.
+
+`BookingScheduler.load` reads upcoming Pending/Accepted bookings through the
+(status, date, time) index and drops one timer per action into the wheel.
+`tick` advances the wheel to "now" and applies everything that fell due as
+set-based UPDATEs in batches, so no run ever scans the whole bookings table.
+`reload` also sweeps Pending bookings already overdue, which the wheel never sees.
+"""
+import datetime
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Booking
+from .notifications import send_booking_reminders
+
+REMINDER_LEAD = datetime.timedelta(minutes=getattr(settings, 'BOOKING_REMINDER_LEAD_MINUTES', 24 * 60))
+EXPIRY_GRACE = datetime.timedelta(minutes=getattr(settings, 'BOOKING_EXPIRY_GRACE_MINUTES', 60))
+BATCH_SIZE = 500
+
+REMIND = 'remind'
+EXPIRE = 'expire'
+
+
+class HierarchicalTimingWheel:
+    """
+    Timing wheel : minute ticks, with levels of 60 minutes, 24 hours and 32 days.
+    Timers land in the coarsest level that still covers them and cascade down
+    one level each time that level's cursor reaches their slot, so inserting and
+    firing are O(1) per timer regardless of how many are pending.
+    """
+
+    LEVELS = ((1, 60), (60, 24), (1440, 32))  # (ticks per slot, slots)
+
+    def __init__(self, now_tick):
+        self.now = now_tick
+        self.wheels = [[[] for _ in range(size)] for _, size in self.LEVELS]
+        self.ready = []
+        self.span = self.LEVELS[-1][0] * self.LEVELS[-1][1]
+
+    def __len__(self):
+        return len(self.ready) + sum(len(slot) for wheel in self.wheels for slot in wheel)
+
+    def add(self, due_tick, item):
+        """Schedule item for due_tick; returns False if it is beyond the wheel's span."""
+        if due_tick <= self.now:
+            self.ready.append(item)
+            return True
+        for level, (width, size) in enumerate(self.LEVELS):
+            if due_tick // width - self.now // width < size:
+                self.wheels[level][(due_tick // width) % size].append((due_tick, item))
+                return True
+        return False
+
+    def advance(self, to_tick):
+        """Move the cursor to to_tick and return every item that fell due."""
+        fired, self.ready = self.ready, []
+        while self.now < to_tick:
+            self.now += 1
+            # Cascade coarse slots whose window starts now, highest level first.
+            for level in range(len(self.LEVELS) - 1, 0, -1):
+                width, size = self.LEVELS[level]
+                if self.now % width == 0:
+                    slot = self.wheels[level][(self.now // width) % size]
+                    self.wheels[level][(self.now // width) % size] = []
+                    for due_tick, item in slot:
+                        self.add(due_tick, item)
+            bucket = self.wheels[0][self.now % self.LEVELS[0][1]]
+            self.wheels[0][self.now % self.LEVELS[0][1]] = []
+            fired.extend(item for _, item in bucket)
+            fired.extend(self.ready)
+            self.ready = []
+        return fired
+
+
+def to_tick(moment):
+    """Minute tick for an aware datetime, rounded up so timers never fire early."""
+    return math.ceil(moment.timestamp() / 60)
+
+
+def booking_start(date, time):
+    return timezone.make_aware(datetime.datetime.combine(date, time))
+
+
+def _batches(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), BATCH_SIZE):
+        yield ids[i:i + BATCH_SIZE]
+
+
+def expire_bookings(ids, now=None):
+    """Expire still-Pending bookings among ids. Returns rows updated."""
+    now = now or timezone.now()
+    expired = 0
+    for batch in _batches(ids):
+        expired += Booking.objects.filter(id__in=batch, status='Pending').update(
+            status='Expired',
+            payment_status='Cancelled',
+            updated_at=now,
+        )
+    return expired
+
+
+def remind_bookings(ids, now=None):
+    """Send reminders for not-yet-reminded active bookings among ids. Returns reminders sent."""
+    now = now or timezone.now()
+    sent = 0
+    for batch in _batches(ids):
+        bookings = list(
+            Booking.objects.filter(id__in=batch, reminded_at__isnull=True, status__in=('Pending', 'Accepted'))
+            .select_related('customer', 'service', 'service__provider')
+        )
+        if not bookings:
+            continue
+        send_booking_reminders(bookings)
+        sent += Booking.objects.filter(id__in=[b.id for b in bookings]).update(reminded_at=now)
+    return sent
+
+
+def expire_overdue(now=None):
+    """Set-based sweep for Pending bookings whose start plus grace has already passed."""
+    now = now or timezone.now()
+    cutoff = timezone.localtime(now - EXPIRY_GRACE)
+    ids = Booking.objects.filter(
+        Q(date__lt=cutoff.date()) | Q(date=cutoff.date(), time__lte=cutoff.time()),
+        status='Pending',
+    ).values_list('id', flat=True)
+    return expire_bookings(ids, now=now)
+
+
+class BookingScheduler:
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+        self.wheel = HierarchicalTimingWheel(to_tick(self.now))
+
+    def load(self):
+        """
+        Fill a fresh wheel from the indexed (status, date, time) range inside its span:
+        bookings starting after now - EXPIRY_GRACE, so started visits can still expire
+        but only those starting after now get a reminder.
+        """
+        self.wheel = HierarchicalTimingWheel(to_tick(self.now))
+        since = timezone.localtime(self.now - EXPIRY_GRACE)
+        last_day = since.date() + datetime.timedelta(minutes=self.wheel.span)
+        rows = (
+            Booking.objects.filter(
+                Q(date__gt=since.date()) | Q(date=since.date(), time__gt=since.time()),
+                status__in=('Pending', 'Accepted'),
+                date__lte=last_day,
+            )
+            .values_list('id', 'status', 'date', 'time', 'reminded_at')
+            .order_by('status', 'date', 'time')
+        )
+        loaded = 0
+        for booking_id, status, date, time, reminded_at in rows.iterator(chunk_size=2000):
+            start = booking_start(date, time)
+            if reminded_at is None and start > self.now:
+                loaded += self.wheel.add(to_tick(start - REMINDER_LEAD), (REMIND, booking_id))
+            if status == 'Pending':
+                loaded += self.wheel.add(to_tick(start + EXPIRY_GRACE), (EXPIRE, booking_id))
+        return loaded
+
+    def reload(self, now=None):
+        """
+        Expire Pending bookings already past start + grace, then refill the wheel from now.
+        Bookings created or moved into the past since the last load are older than the
+        wheel's window, so only the sweep sees them. Returns (expired, timers loaded).
+        """
+        self.now = now or timezone.now()
+        return expire_overdue(now=self.now), self.load()
+
+    def tick(self, now=None):
+        """Advance to now and run everything due. Returns {'remind': n, 'expire': n}."""
+        self.now = now or timezone.now()
+        due = defaultdict(list)
+        for kind, booking_id in self.wheel.advance(to_tick(self.now)):
+            due[kind].append(booking_id)
+        return {
+            REMIND: remind_bookings(due[REMIND], now=self.now) if due[REMIND] else 0,
+            EXPIRE: expire_bookings(due[EXPIRE], now=self.now) if due[EXPIRE] else 0,
+        }
@@ -0,0 +1,119 @@
+"""
+Provider response-time SLA : incremental percentile refresh.
+
+Each run reads only bookings whose accepted_at / completed_at moved past the last
+checkpoint, folds those durations into the per-provider sketches stored on
+ProviderSLA, and rewrites the p50/p90 columns the pages read.
+
+Timestamps are stamped before their transaction commits, so a row can become
+visible after a run has already moved the checkpoint past it. Every run therefore
+re-reads the last OVERLAP before the checkpoint too, and skips the ids the
+checkpoint remembers counting in that window ('response' / 'completion' in
+JobCheckpoint.seen). Rows that commit more than OVERLAP late are still missed;
+`refresh_provider_sla(rebuild=True)` recounts everything.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from Services.algorithm_utils import QuantileSketch
+from Services.versions import bump
+from .models import Booking, JobCheckpoint, ProviderSLA
+
+CHECKPOINT_NAME = 'provider_sla'
+
+# How late a transition may commit and still be counted.
+OVERLAP = timedelta(minutes=15)
+
+
+def _collect(qs, start_field, end_field, seen, recent):
+    """
+    Group (end - start) seconds per provider for the rows in qs not in seen. Also
+    returns the ids of rows ending after recent, which the next run must not count again.
+    """
+    samples, counted = defaultdict(list), []
+    rows = qs.values_list('id', 'service__provider_id', start_field, end_field)
+    for pk, provider_id, start, end in rows.iterator(chunk_size=2000):
+        if end > recent:
+            counted.append(pk)
+        if pk in seen or start is None:
+            continue
+        samples[provider_id].append(max((end - start).total_seconds(), 0.0))
+    return samples, counted
+
+
+def refresh_provider_sla(rebuild=False, now=None):
+    """Fold new transitions into ProviderSLA rows. Returns number of providers touched."""
+    now = now or timezone.now()
+    recent = now - OVERLAP
+
+    with transaction.atomic():
+        checkpoint, _ = JobCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+        lower, seen = None, {}
+        if not rebuild and checkpoint.value is not None:
+            seen = checkpoint.seen
+            # A checkpoint from before the overlap existed remembers no ids: start at it.
+            lower = checkpoint.value - OVERLAP if seen else checkpoint.value
+
+        accepted = Booking.objects.filter(created_at__isnull=False, accepted_at__lte=now)
+        completed = Booking.objects.filter(accepted_at__isnull=False, completed_at__lte=now)
+        if lower is not None:
+            accepted = accepted.filter(accepted_at__gt=lower)
+            completed = completed.filter(completed_at__gt=lower)
+
+        response_samples, response_seen = _collect(
+            accepted, 'created_at', 'accepted_at', set(seen.get('response', ())), recent,
+        )
+        completion_samples, completion_seen = _collect(
+            completed, 'accepted_at', 'completed_at', set(seen.get('completion', ())), recent,
+        )
+        provider_ids = set(response_samples) | set(completion_samples)
+
+        if rebuild:
+            ProviderSLA.objects.all().delete()
+        existing = {s.provider_id: s for s in ProviderSLA.objects.filter(provider_id__in=provider_ids)}
+
+        to_create, to_update = [], []
+        for provider_id in provider_ids:
+            sla = existing.get(provider_id)
+            if sla is None:
+                sla = ProviderSLA(provider_id=provider_id)
+                to_create.append(sla)
+            else:
+                to_update.append(sla)
+
+            response = QuantileSketch.from_dict(sla.response_sketch)
+            response.extend(response_samples.get(provider_id, ()))
+            completion = QuantileSketch.from_dict(sla.completion_sketch)
+            completion.extend(completion_samples.get(provider_id, ()))
+
+            sla.response_sketch = response.to_dict()
+            sla.response_count = response.count
+            sla.response_p50 = response.quantile(0.5)
+            sla.response_p90 = response.quantile(0.9)
+            sla.completion_sketch = completion.to_dict()
+            sla.completion_count = completion.count
+            sla.completion_p50 = completion.quantile(0.5)
+            sla.completion_p90 = completion.quantile(0.9)
+            sla.updated_at = now
+
+        ProviderSLA.objects.bulk_create(to_create)
+        ProviderSLA.objects.bulk_update(
+            to_update,
+            [
+                'response_sketch', 'response_count', 'response_p50', 'response_p90',
+                'completion_sketch', 'completion_count', 'completion_p50', 'completion_p90',
+                'updated_at',
+            ],
+        )
+
+        checkpoint.value = now
+        checkpoint.seen = {'response': response_seen, 'completion': completion_seen}
+        checkpoint.save(update_fields=['value', 'seen', 'updated_at'])
+
+    # bulk_create/bulk_update send no signals.
+    bump('sla', *(f'user:{provider_id}' for provider_id in provider_ids))
+
+    return len(provider_ids)
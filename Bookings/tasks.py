@@ -0,0 +1,21 @@
+from taskqueue.queue import task
+
+from . import cohorts
+from .models import Booking
+from .notifications import send_status_update
+
+
+@task(lane='default')
+def notify_booking_status(booking_id):
+    booking = (
+        Booking.objects.select_related('customer', 'service')
+        .filter(id=booking_id)
+        .first()
+    )
+    if booking is not None:
+        send_status_update(booking)
+
+
+@task(lane='low', max_attempts=2)
+def build_booking_cohorts():
+    cohorts.build_cohorts()
@@ -1,3 +1,550 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+import unittest
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from Accounts.models import User
+from Services.algorithm_utils import QuantileSketch
+from Services.models import Service
+from Services.tasks import record_booked_prices
+from taskqueue.models import Task
+from .availability import ProviderIndex, engine, find_conflict, find_conflicts, to_minutes
+from .cart import checkout_cart
+from .cohorts import ALL, build_cohorts, cohort_matrix
+from .esewa_signature import genSha256
+from .forecast import fit_forecast, np, refresh_demand_forecast
+from .models import (
+    Booking, Checkout, DemandForecast, ProviderCategoryScore, ProviderSchedule, ProviderSLA, RecurringBooking,
+    ReviewRating,
+)
+from .ranking import category_leaders, refresh_provider_scores, smoothed_rating
+from .recurring import materialize_series, occurrence_dates
+from .scheduler import EXPIRE, REMIND, BookingScheduler, HierarchicalTimingWheel
+from .sla import refresh_provider_sla
+from .views import ESEWA_PRODUCT_CODE, ESEWA_SECRET_KEY, _resume_from
+
+
+class BookingFixtures:
+    """One bookable provider with a service, and one customer."""
+
+    def setUp(self):
+        super().setUp()
+        engine.invalidate()
+        self.provider = User.objects.create_user(
+            'provider', password='pw', is_provider=True, company_name='Fix It Co',
+        )
+        self.customer = User.objects.create_user('customer', password='pw', is_customer=True)
+        self.service = Service.objects.create(
+            name='Pipe repair', category='Plumbing', price=500, provider=self.provider,
+        )
+
+    def book(self, date, time, status='Pending', **fields):
+        return Booking.objects.create(
+            customer=self.customer, service=self.service, date=date, time=time, status=status, **fields
+        )
+
+
+class ProviderSLATests(BookingFixtures, TestCase):
+    start = datetime.datetime(2026, 5, 4, 9, tzinfo=datetime.timezone.utc)
+
+    def accepted(self, minutes, after):
+        """A booking made at start + minutes and accepted after more seconds."""
+        booking = self.book(datetime.date(2026, 5, 10), datetime.time(10))
+        created = self.start + datetime.timedelta(minutes=minutes)
+        Booking.objects.filter(pk=booking.pk).update(
+            created_at=created, accepted_at=created + datetime.timedelta(seconds=after), status='Accepted',
+        )
+
+    def refresh(self, minutes, **options):
+        return refresh_provider_sla(now=self.start + datetime.timedelta(minutes=minutes), **options)
+
+    def sla(self):
+        return ProviderSLA.objects.get(provider=self.provider)
+
+    def test_incremental_runs_fold_in_new_acceptances_once(self):
+        self.accepted(0, 60)
+        self.assertEqual(self.refresh(5), 1)
+        self.assertEqual(self.sla().response_count, 1)
+        self.accepted(10, 600)
+        self.refresh(20)
+        self.assertEqual(self.sla().response_count, 2)
+        self.assertAlmostEqual(QuantileSketch.from_dict(self.sla().response_sketch).quantile(1), 600, delta=12)
+        self.assertEqual(self.refresh(21), 0)
+        self.assertEqual(self.refresh(90), 0)
+        self.assertEqual(self.sla().response_count, 2)
+
+    def test_transition_committed_after_the_run_is_still_counted(self):
+        self.accepted(0, 60)
+        self.refresh(10)
+        self.accepted(0, 9 * 60)  # stamped before that run, visible only after it
+        self.refresh(11)
+        self.assertEqual(self.sla().response_count, 2)
+        self.refresh(12)
+        self.assertEqual(self.sla().response_count, 2)
+
+    def test_rebuild_recounts_everything(self):
+        self.accepted(0, 60)
+        self.accepted(1, 120)
+        self.refresh(5)
+        self.refresh(60, rebuild=True)
+        self.assertEqual(self.sla().response_count, 2)
+
+
+class ProviderIndexTests(TestCase):
+    def test_conflicts_within_one_slot(self):
+        day = datetime.date(2026, 5, 4)
+        index = ProviderIndex([to_minutes(day, datetime.time(10))], 60, datetime.time(9), datetime.time(18), '0123456')
+        self.assertTrue(index.conflicts(to_minutes(day, datetime.time(10, 30))))
+        self.assertTrue(index.conflicts(to_minutes(day, datetime.time(9, 30))))
+        self.assertFalse(index.conflicts(to_minutes(day, datetime.time(11))))
+        self.assertFalse(index.conflicts(to_minutes(day, datetime.time(9))))
+
+    def test_free_slots_skip_booked_and_days_off(self):
+        monday = datetime.date(2026, 5, 4)
+        index = ProviderIndex([to_minutes(monday, datetime.time(10))], 60, datetime.time(9), datetime.time(12), '0')
+        self.assertEqual(
+            index.free_slots(monday, 2),
+            [(monday, [datetime.time(9), datetime.time(11)])],
+        )
+
+
+    def test_working_hours_and_days(self):
+        monday, sunday = datetime.date(2026, 5, 4), datetime.date(2026, 5, 10)
+        index = ProviderIndex([], 60, datetime.time(9), datetime.time(18), '012345')
+        self.assertTrue(index.works_at(to_minutes(monday, datetime.time(9))))
+        self.assertTrue(index.works_at(to_minutes(monday, datetime.time(17))))
+        self.assertFalse(index.works_at(to_minutes(monday, datetime.time(17, 30))))
+        self.assertFalse(index.works_at(to_minutes(monday, datetime.time(8))))
+        self.assertFalse(index.works_at(to_minutes(sunday, datetime.time(10))))
+
+    def test_changes_replace_the_starts_tuple(self):
+        day = datetime.date(2026, 5, 4)
+        index = ProviderIndex([], 60, datetime.time(9), datetime.time(18), '0123456')
+        before = index.starts
+        index.add(to_minutes(day, datetime.time(10)))
+        index.add(to_minutes(day, datetime.time(9)))
+        self.assertEqual(before, ())
+        self.assertEqual(index.starts, (to_minutes(day, datetime.time(9)), to_minutes(day, datetime.time(10))))
+        index.remove(to_minutes(day, datetime.time(9)))
+        self.assertEqual(index.starts, (to_minutes(day, datetime.time(10)),))
+
+
+class IsFreeTests(BookingFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        ProviderSchedule.objects.create(provider=self.provider, day_start=datetime.time(9),
+                                        day_end=datetime.time(17), working_days='01234')
+        today = datetime.date.today()
+        self.monday = today + datetime.timedelta(days=7 - today.weekday())
+
+    def test_outside_working_hours_is_not_free(self):
+        self.assertTrue(engine.is_free(self.provider.id, self.monday, datetime.time(10)))
+        self.assertFalse(engine.is_free(self.provider.id, self.monday, datetime.time(7)))
+        self.assertFalse(engine.is_free(self.provider.id, self.monday, datetime.time(16, 30)))
+        saturday = self.monday + datetime.timedelta(days=5)
+        self.assertFalse(engine.is_free(self.provider.id, saturday, datetime.time(10)))
+
+    def test_booking_outside_working_hours_is_refused(self):
+        self.client.force_login(self.customer)
+        for time in ('20:00', '10:00'):
+            self.client.post(reverse('book_service', args=[self.service.id]), {
+                'date': self.monday.isoformat(), 'time': time, 'address': 'Home', 'phone_number': '98000',
+            })
+        self.assertEqual(list(Booking.objects.values_list('time', flat=True)), [datetime.time(10)])
+
+
+class FindConflictTests(BookingFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        ProviderSchedule.objects.create(provider=self.provider, slot_minutes=60)
+        self.day = datetime.date(2026, 5, 4)
+
+    def test_same_day_overlap(self):
+        accepted = self.book(self.day, datetime.time(10), status='Accepted')
+        self.assertEqual(find_conflict(self.provider.id, self.day, datetime.time(10, 30)), accepted)
+        self.assertIsNone(find_conflict(self.provider.id, self.day, datetime.time(11)))
+
+    def test_pending_bookings_do_not_block(self):
+        self.book(self.day, datetime.time(10))
+        self.assertIsNone(find_conflict(self.provider.id, self.day, datetime.time(10)))
+
+    def test_slot_crossing_midnight(self):
+        late = self.book(self.day, datetime.time(23, 30), status='Accepted')
+        next_day = self.day + datetime.timedelta(days=1)
+        self.assertEqual(find_conflict(self.provider.id, next_day, datetime.time(0, 15)), late)
+        early = self.book(next_day, datetime.time(0, 10), status='Accepted')
+        self.assertEqual(find_conflict(self.provider.id, self.day, datetime.time(23, 50), late.id), early)
+
+    def test_exclude_the_booking_itself(self):
+        accepted = self.book(self.day, datetime.time(10), status='Accepted')
+        self.assertIsNone(find_conflict(self.provider.id, self.day, datetime.time(10), accepted.id))
+
+    def test_find_conflicts_checks_neighbouring_days_and_each_other(self):
+        self.book(self.day, datetime.time(23, 30), status='Accepted')
+        next_day = self.day + datetime.timedelta(days=1)
+        requests = [
+            (self.provider.id, next_day, datetime.time(0)),
+            (self.provider.id, next_day, datetime.time(12)),
+            (self.provider.id, next_day, datetime.time(12, 30)),
+        ]
+        self.assertEqual(find_conflicts(requests), [0, 2])
+
+
+class AcceptBookingTests(BookingFixtures, TestCase):
+    def test_second_overlapping_accept_is_refused(self):
+        day = datetime.date.today() + datetime.timedelta(days=3)
+        first = self.book(day, datetime.time(10))
+        second = self.book(day, datetime.time(10, 30))
+        self.client.force_login(self.provider)
+        for booking in (first, second):
+            self.client.post(reverse('update_booking_status_provider', args=[booking.id]), {'status': 'Accepted'})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('Accepted', 'Pending'))
+
+
+class RecurringBookingTests(BookingFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = datetime.date(2026, 5, 4)
+        self.series = RecurringBooking.objects.create(
+            customer=self.customer, service=self.service, frequency='Weekly',
+            start_date=self.today, time=datetime.time(10),
+        )
+
+    def test_monthly_dates_keep_the_anchor_day(self):
+        series = RecurringBooking(frequency='Monthly', start_date=datetime.date(2026, 1, 31))
+        self.assertEqual(
+            list(occurrence_dates(series, None, datetime.date(2026, 4, 30))),
+            [datetime.date(2026, 1, 31), datetime.date(2026, 2, 28), datetime.date(2026, 3, 31),
+             datetime.date(2026, 4, 30)],
+        )
+
+    def test_counts_only_rows_created(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(materialize_series([self.series], horizon_days=21, today=self.today), 4)
+        # A second run with a stale copy of the series re-reads its progress and adds nothing.
+        stale = RecurringBooking.objects.get(id=self.series.id)
+        stale.materialized_until = None
+        self.assertEqual(materialize_series([stale], horizon_days=21, today=self.today), 0)
+        self.assertEqual(self.series.occurrences.count(), 4)
+        task = Task.objects.get(name=record_booked_prices.name)
+        self.assertEqual(task.args, [[self.service.id] * 4])
+
+    def test_skips_occurrences_overlapping_accepted_bookings(self):
+        other = User.objects.create_user('other', password='pw', is_customer=True)
+        Booking.objects.create(
+            customer=other, service=self.service, date=self.today + datetime.timedelta(days=7),
+            time=datetime.time(10, 30), status='Accepted',
+        )
+        self.assertEqual(materialize_series([self.series], horizon_days=21, today=self.today), 3)
+        self.assertNotIn(
+            self.today + datetime.timedelta(days=7),
+            self.series.occurrences.values_list('date', flat=True),
+        )
+
+
+class CheckoutCartTests(BookingFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = datetime.date(2026, 5, 4)
+        self.other = Service.objects.create(name='Tap fitting', category='Plumbing', price=300,
+                                            provider=self.provider)
+
+    def checkout(self, *items):
+        return checkout_cart(self.customer, items, 'Home', '98000', 'Esewa')
+
+    def test_one_checkout_and_one_booking_per_line(self):
+        checkout, conflicts = self.checkout(
+            (self.service, self.day, datetime.time(10)), (self.other, self.day, datetime.time(11)),
+        )
+        self.assertEqual(conflicts, [])
+        self.assertEqual(Checkout.objects.get().total_amount, 800)
+        self.assertEqual(
+            list(checkout.bookings.order_by('time').values_list('service', 'time', 'payment_method')),
+            [(self.service.id, datetime.time(10), 'Esewa'), (self.other.id, datetime.time(11), 'Esewa')],
+        )
+
+    def test_lines_overlapping_each_other_abort_the_checkout(self):
+        checkout, conflicts = self.checkout(
+            (self.service, self.day, datetime.time(10)), (self.other, self.day, datetime.time(10, 30)),
+        )
+        self.assertIsNone(checkout)
+        self.assertEqual(conflicts, [1])
+        self.assertFalse(Checkout.objects.exists())
+        self.assertFalse(Booking.objects.exists())
+
+    def test_accepted_booking_blocks_the_checkout(self):
+        self.book(self.day, datetime.time(10), status='Accepted')
+        self.assertEqual(self.checkout((self.other, self.day, datetime.time(10)))[1], [0])
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class EsewaCheckoutTests(BookingFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.checkout = Checkout.objects.create(customer=self.customer, payment_method='Esewa', total_amount=1000)
+        self.booking = self.book(datetime.date(2026, 5, 4), datetime.time(10), checkout=self.checkout,
+                                 payment_method='Esewa')
+        self.client.force_login(self.customer)
+
+    def callback(self, tamper=None, **fields):
+        payload = {
+            'transaction_code': '000AB1', 'status': 'COMPLETE', 'total_amount': '1,000.0',
+            'transaction_uuid': str(self.checkout.transaction_uuid), 'product_code': ESEWA_PRODUCT_CODE,
+            **fields,
+        }
+        payload['signed_field_names'] = (
+            'transaction_code,status,total_amount,transaction_uuid,product_code,signed_field_names'
+        )
+        message = ','.join(f'{name}={payload[name]}' for name in payload['signed_field_names'].split(','))
+        payload['signature'] = genSha256(ESEWA_SECRET_KEY, message)
+        payload.update(tamper or {})
+        data = base64.b64encode(json.dumps(payload).encode()).decode()
+        return self.client.get(reverse('esewa_verify_checkout', args=[self.checkout.id]), {'data': data})
+
+    def payment_status(self):
+        self.booking.refresh_from_db()
+        return self.booking.payment_status
+
+    def test_signed_matching_callback_marks_bookings_paid(self):
+        self.assertEqual(self.callback().status_code, 302)
+        self.assertEqual(self.payment_status(), 'Paid')
+
+    def test_rejects_forged_signature(self):
+        self.assertEqual(self.callback(tamper={'total_amount': '10.0'}).status_code, 400)
+        self.assertEqual(self.payment_status(), 'Pending')
+
+    def test_rejects_other_amount_or_transaction(self):
+        self.assertEqual(self.callback(total_amount='10.0').status_code, 400)
+        self.assertEqual(self.callback(transaction_uuid='00000000-0000-0000-0000-000000000000').status_code, 400)
+        self.assertEqual(self.payment_status(), 'Pending')
+
+    def test_requires_the_checkout_owner(self):
+        self.client.logout()
+        self.assertEqual(self.callback().status_code, 302)
+        self.client.force_login(self.provider)
+        self.assertEqual(self.callback().status_code, 404)
+        self.assertEqual(self.payment_status(), 'Pending')
+
+    def test_paid_checkout_is_not_sent_to_esewa_again(self):
+        self.assertEqual(self.client.get(reverse('checkout_esewa', args=[self.checkout.id])).status_code, 200)
+        self.callback()
+        self.checkout.refresh_from_db()
+        self.assertEqual(self.checkout.status, 'Paid')
+        response = self.client.get(reverse('checkout_esewa', args=[self.checkout.id]))
+        self.assertRedirects(response, reverse('my_bookings'), fetch_redirect_response=False)
+
+    def test_make_payment_sends_checkout_bookings_to_the_checkout(self):
+        response = self.client.post(reverse('make_payment', args=[self.booking.id]))
+        self.assertRedirects(response, reverse('checkout_esewa', args=[self.checkout.id]),
+                             fetch_redirect_response=False)
+        self.assertEqual(self.payment_status(), 'Pending')
+
+
+class TimingWheelTests(SimpleTestCase):
+    def test_fires_each_timer_once_at_its_tick(self):
+        wheel = HierarchicalTimingWheel(1000)
+        for due in (1000, 1001, 1059, 1061, 1000 + 1440 * 3 + 7):
+            self.assertTrue(wheel.add(due, due))
+        self.assertFalse(wheel.add(1000 + wheel.span + 1440, 'too far'))
+        self.assertEqual(wheel.advance(1000), [1000])
+        self.assertEqual(wheel.advance(1060), [1001, 1059])
+        self.assertEqual(wheel.advance(1000 + 1440 * 3 + 6), [1061])
+        self.assertEqual(wheel.advance(1000 + 1440 * 4), [1000 + 1440 * 3 + 7])
+        self.assertEqual(len(wheel), 0)
+
+
+class BookingSchedulerTests(BookingFixtures, TestCase):
+    def test_no_reminders_for_started_visits(self):
+        now = timezone.make_aware(datetime.datetime(2026, 5, 4, 12, 0))
+        day = now.date()
+        started = self.book(day, datetime.time(11, 30))
+        self.book(day, datetime.time(8))
+        soon = self.book(day, datetime.time(14), status='Accepted')
+        later = self.book(day + datetime.timedelta(days=3), datetime.time(14))
+
+        scheduler = BookingScheduler(now=now)
+        self.assertEqual(scheduler.load(), 4)  # started: expire; soon: remind; later: both
+        self.assertEqual(scheduler.tick(now), {REMIND: 1, EXPIRE: 0})
+        self.assertEqual(scheduler.tick(now + datetime.timedelta(minutes=31)), {REMIND: 0, EXPIRE: 1})
+
+        for booking in (started, soon, later):
+            booking.refresh_from_db()
+        self.assertEqual((started.status, started.reminded_at), ('Expired', None))
+        self.assertIsNotNone(soon.reminded_at)
+        self.assertIsNone(later.reminded_at)
+
+
+    def test_reload_expires_bookings_that_appear_already_overdue(self):
+        now = timezone.make_aware(datetime.datetime(2026, 5, 4, 12, 0))
+        scheduler = BookingScheduler()
+        self.assertEqual(scheduler.reload(now), (0, 0))
+        overdue = self.book(now.date() - datetime.timedelta(days=1), datetime.time(10))
+        self.assertEqual(scheduler.tick(now + datetime.timedelta(minutes=5)), {REMIND: 0, EXPIRE: 0})
+        self.assertEqual(scheduler.reload(now + datetime.timedelta(minutes=10)), (1, 0))
+        overdue.refresh_from_db()
+        self.assertEqual(overdue.status, 'Expired')
+
+
+class BookingEventsTests(BookingFixtures, TestCase):
+    def test_no_stream_under_wsgi(self):
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(reverse('booking_events')).status_code, 204)
+        page = self.client.get(reverse('my_bookings'))
+        self.assertNotContains(page, 'EventSource(')
+
+    def test_login_required(self):
+        self.assertEqual(self.client.get(reverse('booking_events')).status_code, 403)
+
+    async def test_stream_under_asgi(self):
+        await self.async_client.aforce_login(self.customer)
+        response = await self.async_client.get(reverse('booking_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        await stream.aclose()
+
+
+class ResumeFromTests(SimpleTestCase):
+    def resume(self, last_event_id=None):
+        headers = {'Last-Event-ID': last_event_id} if last_event_id else {}
+        return _resume_from(RequestFactory().get('/', headers=headers))
+
+    def test_aware_id_resumes_there(self):
+        sent = timezone.now() - datetime.timedelta(minutes=5)
+        self.assertEqual(self.resume(sent.isoformat()), sent)
+
+    def test_naive_future_or_garbage_ids_start_now(self):
+        before = timezone.now()
+        for last_event_id in (None, '2026-05-04T10:00:00', 'not a date',
+                              (before + datetime.timedelta(days=1)).isoformat()):
+            resumed = self.resume(last_event_id)
+            self.assertTrue(timezone.is_aware(resumed))
+            self.assertGreaterEqual(resumed, before)
+            self.assertLessEqual(resumed, timezone.now())
+
+
+class ProviderRankingTests(BookingFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.rivals = []
+        for name in ('few', 'many'):
+            provider = User.objects.create_user(name, password='pw', is_provider=True, company_name=name.title())
+            Service.objects.create(name='Pipes', category='Plumbing', price=400, provider=provider)
+            self.rivals.append(provider)
+
+    def rate(self, provider, *ratings):
+        for rating in ratings:
+            ReviewRating.objects.create(provider=provider, customer=self.customer, rating=rating)
+
+    def leaders(self):
+        return [row.provider.username for row in category_leaders('Plumbing')]
+
+    def test_few_ratings_are_pulled_towards_the_mean(self):
+        self.assertAlmostEqual(smoothed_rating(5, 1, 4.0), 25 / 6)
+        self.assertAlmostEqual(smoothed_rating(4.8, 50, 4.0), 260 / 55)
+        self.assertEqual(smoothed_rating(None, 0, 4.2), 4.2)
+        few, many = self.rivals
+        self.rate(self.provider, *[3] * 10)
+        self.rate(few, 5)
+        self.rate(many, *[5] * 16, *[4] * 4)
+        refresh_provider_scores()
+        scores = {row.provider_id: row for row in ProviderCategoryScore.objects.filter(category='Plumbing')}
+        mean = (30 + 5 + 96) / 31
+        self.assertAlmostEqual(scores[few.id].rating, (mean * 5 + 5) / 6)
+        self.assertAlmostEqual(scores[many.id].rating, (mean * 5 + 96) / 25)
+        # A single 5-star review ranks below twenty averaging 4.8.
+        self.assertLess(scores[few.id].rating, scores[many.id].rating)
+        self.assertEqual(self.leaders(), ['many', 'few', 'provider'])
+
+    def test_leaders_are_refreshed_after_a_new_rating(self):
+        few, many = self.rivals
+        self.rate(few, 5, 5)
+        self.rate(many, 4)
+        refresh_provider_scores()
+        self.assertEqual(self.leaders(), ['few', 'provider', 'many'])
+        self.rate(few, 1)
+        refresh_provider_scores(now=timezone.now() + datetime.timedelta(minutes=1))
+        self.assertEqual(self.leaders()[-1], 'few')
+        self.assertEqual(ProviderCategoryScore.objects.get(provider=few).rating_count, 3)
+
+    def test_unchanged_providers_are_not_rewritten(self):
+        now = timezone.now()
+        refresh_provider_scores(now=now + datetime.timedelta(minutes=1))
+        self.assertEqual(refresh_provider_scores(now=now + datetime.timedelta(minutes=2)), 0)
+        self.rate(self.rivals[0], 5)
+        ReviewRating.objects.update(updated_at=now + datetime.timedelta(minutes=2, seconds=30))
+        self.assertEqual(refresh_provider_scores(now=now + datetime.timedelta(minutes=3)), 1)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class FitForecastTests(SimpleTestCase):
+    def test_weekly_pattern_and_trend(self):
+        # 10 weeks: 7 bookings on Mondays, 1 on other days, plus +1 per week.
+        days = np.arange(70)
+        counts = np.where(days % 7 == 0, 7.0, 1.0) + days // 7
+        expected, low, high = fit_forecast(counts[None, :], first_weekday=0, horizon=7)
+        self.assertEqual(expected.shape, (1, 7))
+        self.assertEqual(int(np.argmax(expected[0])), 0)  # day 70 is a Monday
+        self.assertGreater(expected[0, 0], 14)
+        self.assertTrue(np.all(low <= expected) and np.all(expected <= high))
+
+    def test_short_history_gives_a_flat_finite_forecast(self):
+        for days in (1, 3):
+            expected, low, high = fit_forecast(np.full((2, days), 4.0), first_weekday=2, horizon=5)
+            self.assertTrue(np.isfinite(expected).all() and np.isfinite(low).all() and np.isfinite(high).all())
+            np.testing.assert_allclose(expected, 4.0)
+
+    def test_no_bookings_forecasts_zero(self):
+        expected, low, high = fit_forecast(np.zeros((1, 30)), first_weekday=0, horizon=3)
+        np.testing.assert_array_equal(expected, 0)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class RefreshDemandForecastTests(BookingFixtures, TestCase):
+    def test_one_day_of_history(self):
+        today = datetime.date(2026, 5, 4)
+        self.book(today - datetime.timedelta(days=1), datetime.time(10))
+        self.assertEqual(refresh_demand_forecast(today=today, horizon=3), 3 * len(Service.CATEGORY_CHOICES))
+        row = DemandForecast.objects.get(category='Plumbing', date=today)
+        self.assertEqual((row.expected, row.low, row.high), (1.0, 1.0, 1.0))
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class CohortMatrixTests(SimpleTestCase):
+    def test_retention_by_first_month(self):
+        customers = np.array([1, 1, 1, 2, 2, 3])
+        months = np.array([600, 600, 601, 600, 602, 601])
+        segments = np.zeros(6, dtype=np.int16)
+        first, active, repeat, people = cohort_matrix(customers, months, segments, 1, max_offset=2)
+        self.assertEqual(first, 600)
+        np.testing.assert_array_equal(active[0], [[2, 1, 1], [1, 0, 0], [0, 0, 0]])
+        self.assertEqual((repeat.tolist(), people.tolist()), ([2], [3]))
+
+    def test_segments_are_separate_cohorts(self):
+        customers = np.array([1, 1])
+        months = np.array([10, 11])
+        segments = np.array([0, 1], dtype=np.int16)
+        _, active, repeat, people = cohort_matrix(customers, months, segments, 2, max_offset=1)
+        np.testing.assert_array_equal(active[0], [[1, 0], [0, 0]])
+        np.testing.assert_array_equal(active[1], [[0, 0], [1, 0]])
+        self.assertEqual((repeat.tolist(), people.tolist()), ([0, 0], [1, 1]))
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class BuildCohortsTests(BookingFixtures, TestCase):
+    def test_build_from_bookings(self):
+        self.book(datetime.date(2026, 1, 10), datetime.time(10))
+        self.book(datetime.date(2026, 2, 10), datetime.time(10))
+        result = build_cohorts(max_offset=2)
+        self.assertEqual(result['bookings'], 2)
+        overall = result['segments'][0]
+        self.assertEqual((overall['name'], overall['customers'], overall['repeat_rate']), (ALL, 1, 100.0))
+        self.assertEqual(overall['cohorts'][0]['month'], '2026-01')
+        self.assertEqual(overall['cohorts'][0]['retention'][:2], [100.0, 100.0])
+        self.assertEqual([segment['name'] for segment in result['segments']], [ALL, 'Plumbing'])
@@ -2,7 +2,9 @@ from django.urls import path
 from .views import (
     book_service,
     my_bookings,
+    cancel_recurring_booking,
     provider_bookings,
+    provider_schedule,
     update_booking_status_provider,
     mark_payment_received,
     make_payment,
@@ -10,13 +12,25 @@ from .views import (
     esewa_verify_booking,
     payment_failed,
     add_review,
+    booking_events,
+    cart_view,
+    cart_add,
+    cart_remove,
+    checkout_esewa,
+    esewa_verify_checkout,
    
 )
 
 urlpatterns = [
     path('book/<int:service_id>/', book_service, name='book_service'),
     path('my-bookings/', my_bookings, name='my_bookings'),
+    path(
+        'my-bookings/recurring/<int:series_id>/cancel/',
+        cancel_recurring_booking,
+        name='cancel_recurring_booking',
+    ),
     path('provider-bookings/', provider_bookings, name='provider_bookings'),
+    path('provider-bookings/schedule/', provider_schedule, name='provider_schedule'),
     path(
         'provider-bookings/<int:booking_id>/update-status/',
         update_booking_status_provider,
@@ -40,6 +54,13 @@ urlpatterns = [
     name='esewa_verify_booking',
 ),
     
+    path('events/', booking_events, name='booking_events'),
+    path('cart/', cart_view, name='cart'),
+    path('cart/add/<int:service_id>/', cart_add, name='cart_add'),
+    path('cart/remove/<int:service_id>/', cart_remove, name='cart_remove'),
+    path('checkout/<int:checkout_id>/esewa/', checkout_esewa, name='checkout_esewa'),
+    path('checkout/<int:checkout_id>/esewa-verify/', esewa_verify_checkout, name='esewa_verify_checkout'),
+
     path("payment-failed/", payment_failed, name="payment_failed"),
      path('review/<int:booking_id>/', add_review, name='add_review'),
 
@@ -1,17 +1,36 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views import View
-from django.http import HttpResponseBadRequest
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
 from django.urls import reverse
-from .models import Booking, ReviewRating
+from django.db import transaction
+from django.utils import timezone
+from .models import Booking, Checkout, ProviderSchedule, RecurringBooking, ReviewRating
+from .availability import BLOCKING_STATUSES, booking_status_changed, engine, find_conflict, lock_provider_bookings
+from .recurring import materialize_series
+from .cart import Cart, checkout_cart
+from .tasks import notify_booking_status
+from .events import booking_event, hub, publish_booking, streams_supported
+from .forecast import demand_summary
 from Services.models import Service
+from Services.recommendations import recommendations_for_customer
 from django.contrib.auth.decorators import login_required
+from HomeService.routers import use_primary
 from django.db.models import Q, Count, Sum
+import asyncio
+import datetime
+from functools import partial
 import uuid
 import json
 import base64
+import hmac
 from .esewa_signature import genSha256
 
+# Seconds an idle event stream waits before polling for changes made by other processes.
+SSE_POLL_SECONDS = 15
+
+WEEKDAYS = [('0', 'Mon'), ('1', 'Tue'), ('2', 'Wed'), ('3', 'Thu'), ('4', 'Fri'), ('5', 'Sat'), ('6', 'Sun')]
+
 @login_required
 def book_service(request, service_id):
     service = get_object_or_404(
@@ -19,49 +38,134 @@ def book_service(request, service_id):
         id=service_id,
     )
 
+    def render_form():
+        return render(request, 'book_service.html', {
+            'service': service,
+            'free_slots': engine.free_slots(service.provider_id, days=14),
+            'frequency_choices': RecurringBooking.FREQUENCY_CHOICES,
+        })
+
     if request.method == 'POST':
         date = request.POST.get('date')
         time = request.POST.get('time')
         address = request.POST.get('address', '').strip()
         phone_number = request.POST.get('phone_number', '').strip()
         payment_method = request.POST.get('payment_method', 'Cash')
+        repeat = request.POST.get('repeat', '')
+        repeat_until = request.POST.get('repeat_until', '')
 
         if not date or not time:
             messages.error(request, 'Please provide both date and time.')
-            return render(request, 'book_service.html', {'service': service})
+            return render_form()
         
         if not address:
             messages.error(request, 'Please provide a service address.')
-            return render(request, 'book_service.html', {'service': service})
+            return render_form()
         
         if not phone_number:
             messages.error(request, 'Please provide your phone number.')
-            return render(request, 'book_service.html', {'service': service})
+            return render_form()
 
-        Booking.objects.create(
-            customer=request.user,
-            service=service,
-            date=date,
-            time=time,
-            address=address,
-            phone_number=phone_number,
-            payment_method=payment_method,
-            payment_status='Pending'
-        )
-        messages.success(request, f'Booking created for {service.name}!')
+        try:
+            date = datetime.date.fromisoformat(date)
+            time = datetime.time.fromisoformat(time)
+        except ValueError:
+            messages.error(request, 'Please provide a valid date and time.')
+            return render_form()
+
+        if repeat and repeat not in dict(RecurringBooking.FREQUENCY_CHOICES):
+            messages.error(request, 'Please choose a valid repeat option.')
+            return render_form()
+        try:
+            repeat_until = datetime.date.fromisoformat(repeat_until) if repeat and repeat_until else None
+        except ValueError:
+            messages.error(request, 'Please provide a valid end date for the repeat.')
+            return render_form()
+        if repeat_until and repeat_until < date:
+            messages.error(request, 'The repeat end date must be on or after the first booking.')
+            return render_form()
+
+        # Fast in-memory rejection first, then the authoritative check inside the write.
+        if not engine.works_at(service.provider_id, date, time):
+            messages.error(request, 'The provider does not work at that time. Please pick one of the open slots.')
+            return render_form()
+        if not engine.is_free(service.provider_id, date, time):
+            messages.error(request, 'The provider is already booked at that time. Please pick a free slot.')
+            return render_form()
+
+        with transaction.atomic():
+            lock_provider_bookings(service.provider_id, date)
+            if find_conflict(service.provider_id, date, time):
+                engine.invalidate(service.provider_id)
+                messages.error(request, 'The provider is already booked at that time. Please pick a free slot.')
+                return render_form()
+            if repeat:
+                series = RecurringBooking.objects.create(
+                    customer=request.user,
+                    service=service,
+                    frequency=repeat,
+                    start_date=date,
+                    end_date=repeat_until,
+                    time=time,
+                    address=address,
+                    phone_number=phone_number,
+                    payment_method=payment_method,
+                )
+                materialize_series([series])
+            else:
+                booking = Booking.objects.create(
+                    customer=request.user,
+                    service=service,
+                    date=date,
+                    time=time,
+                    address=address,
+                    phone_number=phone_number,
+                    payment_method=payment_method,
+                    payment_status='Pending'
+                )
+                publish_booking(booking)
+        if repeat:
+            messages.success(request, f'Recurring booking created for {service.name}!')
+        else:
+            messages.success(request, f'Booking created for {service.name}!')
         return redirect('my_bookings')
 
-    return render(request, 'book_service.html', {'service': service})
+    return render_form()
 
 @login_required
 def my_bookings(request):
     bookings = (
         Booking.objects.filter(customer=request.user)
-        .select_related('service', 'service__provider')
+        .select_related('service', 'service__provider', 'series')
         .annotate(review_count=Count('review'))
         .order_by('-date', '-time')
     )
-    return render(request, 'my_bookings.html', {'bookings': bookings})
+    recurring = (
+        RecurringBooking.objects.filter(customer=request.user, is_active=True)
+        .select_related('service', 'service__provider')
+        .order_by('start_date')
+    )
+    context = {
+        'bookings': bookings,
+        'recurring_bookings': recurring,
+        'recommended_services': recommendations_for_customer(request.user.id),
+        'live_updates': streams_supported(request),
+    }
+    return render(request, 'my_bookings.html', context)
+
+@login_required
+def cancel_recurring_booking(request, series_id):
+    """Stop a recurring booking and drop its upcoming Pending occurrences."""
+    series = get_object_or_404(RecurringBooking, id=series_id, customer=request.user)
+    if request.method == 'POST':
+        series.is_active = False
+        series.save(update_fields=['is_active'])
+        removed, _ = series.occurrences.filter(
+            status='Pending',
+            date__gte=timezone.localdate(),
+        ).delete()
+        messages.success(request, f'Recurring booking stopped; {removed} upcoming visit(s) removed.')
+    return redirect('my_bookings')
 
 @login_required
 def provider_bookings(request):
@@ -76,7 +180,7 @@ def provider_bookings(request):
     # Get all bookings for these services (include customer review when present)
     bookings = (
         Booking.objects.filter(service__in=my_services)
-        .select_related('customer', 'service', 'review')
+        .select_related('customer', 'service', 'review', 'series')
         .order_by('-date', '-time')
     )
     
@@ -106,9 +210,48 @@ def provider_bookings(request):
         'unpaid_bookings': unpaid_bookings,
         'status_filter': status_filter,
         'status_choices': Booking.STATUS_CHOICES,
+        'demand_forecast': demand_summary(categories=my_services.values_list('category', flat=True), days=14),
+        'live_updates': streams_supported(request),
     }
     return render(request, 'provider_bookings.html', context)
 
+@login_required
+def provider_schedule(request):
+    """Let a provider set working hours and slot length for the availability engine."""
+    if not request.user.is_provider:
+        messages.error(request, 'You must be a service provider to access this page.')
+        return redirect('home')
+
+    schedule, _ = ProviderSchedule.objects.get_or_create(provider=request.user)
+
+    if request.method == 'POST':
+        try:
+            day_start = datetime.time.fromisoformat(request.POST.get('day_start', ''))
+            day_end = datetime.time.fromisoformat(request.POST.get('day_end', ''))
+            slot_minutes = int(request.POST.get('slot_minutes', ''))
+        except ValueError:
+            messages.error(request, 'Please provide valid working hours and slot length.')
+            return render(request, 'provider_schedule.html', {'schedule': schedule, 'weekdays': WEEKDAYS})
+
+        working_days = ''.join(sorted(set(request.POST.getlist('working_days')) & set('0123456')))
+        if day_end <= day_start:
+            messages.error(request, 'Working hours must end after they start.')
+        elif not 15 <= slot_minutes <= 480:
+            messages.error(request, 'Slot length must be between 15 and 480 minutes.')
+        elif not working_days:
+            messages.error(request, 'Select at least one working day.')
+        else:
+            schedule.day_start = day_start
+            schedule.day_end = day_end
+            schedule.slot_minutes = slot_minutes
+            schedule.working_days = working_days
+            schedule.save()
+            engine.invalidate(request.user.id)
+            messages.success(request, 'Working hours updated.')
+            return redirect('provider_bookings')
+
+    return render(request, 'provider_schedule.html', {'schedule': schedule, 'weekdays': WEEKDAYS})
+
 @login_required
 def update_booking_status_provider(request, booking_id):
     """Allow provider to update booking status"""
@@ -123,20 +266,35 @@ def update_booking_status_provider(request, booking_id):
         messages.error(request, 'You do not have permission to update this booking.')
         return redirect('provider_bookings')
 
-    # If booking already marked Not Available, block further status updates
-    if booking.status == 'Not Available':
-        messages.error(request, 'Status updates are disabled for bookings marked as Not Available.')
+    # If booking already marked Not Available (or expired unanswered), block further status updates
+    if booking.status in ('Not Available', 'Expired'):
+        messages.error(request, f'Status updates are disabled for bookings marked as {booking.status}.')
         return redirect('provider_bookings')
     
     if request.method == 'POST':
         new_status = request.POST.get('status')
         # Allow providers to set any valid status except when already Not Available
         if new_status in dict(Booking.STATUS_CHOICES):
-            booking.status = new_status
-            if new_status == 'Not Available':
-                booking.payment_status = 'Cancelled'
-                booking.payment_received = False
-            booking.save()
+            # Check and write under the provider's lock, so two overlapping accepts cannot both pass.
+            with transaction.atomic():
+                lock_provider_bookings(request.user.id, booking.date)
+                booking.refresh_from_db()
+                old_status = booking.status
+                if (
+                    new_status in BLOCKING_STATUSES
+                    and old_status not in BLOCKING_STATUSES
+                    and find_conflict(request.user.id, booking.date, booking.time, exclude_booking_id=booking.id)
+                ):
+                    messages.error(request, f'You already have an accepted booking overlapping Booking #{booking.id}.')
+                    return redirect('provider_bookings')
+                booking.set_status(new_status)
+                if new_status == 'Not Available':
+                    booking.payment_status = 'Cancelled'
+                    booking.payment_received = False
+                booking.save()
+            booking_status_changed(booking, old_status)
+            transaction.on_commit(partial(notify_booking_status.enqueue, booking.id))
+            publish_booking(booking)
             messages.success(request, f'Booking #{booking.id} status updated to {new_status}.')
         else:
             messages.error(request, 'Invalid status selected.')
@@ -165,6 +323,8 @@ def mark_payment_received(request, booking_id):
         booking.payment_received = True
         booking.payment_status = 'Received'
         booking.save()
+        transaction.on_commit(partial(notify_booking_status.enqueue, booking.id))
+        publish_booking(booking)
         messages.success(request, f'Payment for Booking #{booking.id} marked as received.')
     
     return redirect('provider_bookings')
@@ -184,14 +344,20 @@ def make_payment(request, booking_id):
         messages.error(request, 'You do not have permission to access this booking.')
         return redirect('my_bookings')
     
+    # eSewa cart bookings are paid together, through their checkout
+    if booking.checkout_id and booking.payment_method == 'Esewa':
+        messages.info(request, f'Booking #{booking.id} is paid with Checkout #{booking.checkout_id}.')
+        return redirect('checkout_esewa', checkout_id=booking.checkout_id)
+
     if request.method == 'POST':
         # If Esewa is selected, send user to Esewa payment page
         if booking.payment_method == 'Esewa':
             return redirect('booking_esewa', booking_id=booking.id)
 
         # For other methods (Cash, Khalti, etc.), mark as paid directly
-        booking.payment_status = 'Paid'
+        booking.mark_paid()
         booking.save()
+        publish_booking(booking)
         messages.success(
             request,
             f'Payment for Booking #{booking.id} has been marked as paid. The provider will confirm receipt.'
@@ -202,6 +368,28 @@ def make_payment(request, booking_id):
     return render(request, 'make_payment.html', {'booking': booking})
 
 
+ESEWA_SECRET_KEY = '8gBm/:&EnhH.1/q'
+ESEWA_PRODUCT_CODE = 'EPAYTEST'
+
+
+def esewa_form_data(request, total_amount, transaction_uuid, success_url):
+    """Signed eSewa v2 form fields for one payment of total_amount."""
+    data_to_sign = (
+        f"total_amount={total_amount},"
+        f"transaction_uuid={transaction_uuid},"
+        f"product_code={ESEWA_PRODUCT_CODE}"
+    )
+    return {
+        'amount': total_amount,
+        'total_amount': total_amount,  # no extra charges
+        'transaction_uuid': transaction_uuid,
+        'product_code': ESEWA_PRODUCT_CODE,
+        'signature': genSha256(ESEWA_SECRET_KEY, data_to_sign),
+        'success_url': request.build_absolute_uri(success_url),
+        'failure_url': request.build_absolute_uri(reverse('payment_failed')),
+    }
+
+
 class EsewaBookingView(View):
     """Start Esewa payment for a booking."""
 
@@ -212,37 +400,16 @@ class EsewaBookingView(View):
         if booking.customer != request.user:
             messages.error(request, 'You do not have permission to access this booking.')
             return redirect('my_bookings')
+        if booking.checkout_id:
+            return redirect('checkout_esewa', checkout_id=booking.checkout_id)
 
-        amount = booking.service.price
-        total_amount = amount  # no extra charges
-
-        transaction_uuid = uuid.uuid4()
-
-        secret_key = '8gBm/:&EnhH.1/q'
-        data_to_sign = (
-            f"total_amount={total_amount},"
-            f"transaction_uuid={transaction_uuid},"
-            f"product_code=EPAYTEST"
-        )
-        result = genSha256(secret_key, data_to_sign)
-
-        success_url = request.build_absolute_uri(
-            reverse('esewa_verify_booking', args=[booking.id])
-        )
-        failure_url = request.build_absolute_uri(
-            reverse('payment_failed')
+        data = esewa_form_data(
+            request,
+            booking.service.price,
+            uuid.uuid4(),
+            reverse('esewa_verify_booking', args=[booking.id]),
         )
 
-        data = {
-            'amount': amount,
-            'total_amount': total_amount,
-            'transaction_uuid': transaction_uuid,
-            'product_code': 'EPAYTEST',
-            'signature': result,
-            'success_url': success_url,
-            'failure_url': failure_url,
-        }
-
         return render(
             request,
             'bookings/esewaform.html',
@@ -253,6 +420,7 @@ class EsewaBookingView(View):
         )
 
 
+@use_primary
 def esewa_verify_booking(request, booking_id):
     """Handle Esewa callback and update booking payment status."""
     data = request.GET.get('data')
@@ -270,8 +438,9 @@ def esewa_verify_booking(request, booking_id):
     status = str(map_data.get('status', '')).lower()
 
     if status == 'complete':
-        booking.payment_status = 'Paid'
+        booking.mark_paid()
         booking.save()
+        publish_booking(booking)
         messages.success(
             request,
             f'Esewa payment for Booking #{booking.id} was successful. The provider will confirm receipt.',
@@ -279,6 +448,7 @@ def esewa_verify_booking(request, booking_id):
     else:
         booking.payment_status = 'Failed'
         booking.save()
+        publish_booking(booking)
         messages.error(
             request,
             f'Esewa payment for Booking #{booking.id} failed or was cancelled.',
@@ -287,6 +457,202 @@ def esewa_verify_booking(request, booking_id):
     return redirect('my_bookings')
 
 
+@login_required
+def cart_add(request, service_id):
+    if request.method == 'POST':
+        service = get_object_or_404(Service.objects.exclude(provider__company_name=''), id=service_id)
+        if not service.is_available:
+            messages.error(request, f'{service.name} is currently not available.')
+        else:
+            Cart(request).add(service.id)
+            messages.success(request, f'{service.name} added to your cart.')
+    return redirect('cart')
+
+@login_required
+def cart_remove(request, service_id):
+    if request.method == 'POST':
+        Cart(request).remove(service_id)
+    return redirect('cart')
+
+@login_required
+def cart_view(request):
+    """Show the cart and book every service in it with one checkout."""
+    cart = Cart(request)
+    services = cart.services()
+    context = {
+        'services': services,
+        'cart_total': sum(s.price for s in services),
+    }
+
+    if request.method == 'POST' and services:
+        date = request.POST.get('date', '')
+        address = request.POST.get('address', '').strip()
+        phone_number = request.POST.get('phone_number', '').strip()
+        payment_method = request.POST.get('payment_method', 'Cash')
+
+        if not address or not phone_number:
+            messages.error(request, 'Please provide a service address and your phone number.')
+            return render(request, 'cart.html', context)
+        if any(not s.is_available for s in services):
+            messages.error(request, 'Remove services that are no longer available before checking out.')
+            return render(request, 'cart.html', context)
+        try:
+            date = datetime.date.fromisoformat(date)
+            items = [
+                (s, date, datetime.time.fromisoformat(request.POST.get(f'time_{s.id}', '')))
+                for s in services
+            ]
+        except ValueError:
+            messages.error(request, 'Please provide a valid date and a time for every service.')
+            return render(request, 'cart.html', context)
+
+        checkout, conflicts = checkout_cart(request.user, items, address, phone_number, payment_method)
+        if conflicts:
+            names = ', '.join(items[i][0].name for i in conflicts)
+            messages.error(request, f'These services are not available at the chosen time: {names}.')
+            return render(request, 'cart.html', context)
+
+        cart.clear()
+        messages.success(request, f'{len(items)} bookings created.')
+        if payment_method == 'Esewa':
+            return redirect('checkout_esewa', checkout_id=checkout.id)
+        return redirect('my_bookings')
+
+    return render(request, 'cart.html', context)
+
+@login_required
+def checkout_esewa(request, checkout_id):
+    """Start a single eSewa payment covering every booking of a cart checkout."""
+    checkout = get_object_or_404(Checkout, id=checkout_id, customer=request.user)
+    if checkout.status != 'Pending':
+        messages.info(request, f'Checkout #{checkout.id} is already paid.')
+        return redirect('my_bookings')
+    data = esewa_form_data(
+        request,
+        checkout.total_amount,
+        checkout.transaction_uuid,
+        reverse('esewa_verify_checkout', args=[checkout.id]),
+    )
+    return render(request, 'bookings/esewaform.html', {'checkout': checkout, 'data': data})
+
+def esewa_response_data(data):
+    """
+    Decoded eSewa v2 callback payload, or None unless its signature checks out. The
+    signature is an HMAC over "name=value" of each field in signed_field_names.
+    """
+    try:
+        map_data = json.loads(base64.b64decode(data).decode('utf-8'))
+        signed = ','.join(f'{name}={map_data[name]}' for name in map_data['signed_field_names'].split(','))
+        signature = str(map_data['signature'])
+    except Exception:
+        return None
+    if not hmac.compare_digest(genSha256(ESEWA_SECRET_KEY, signed), signature):
+        return None
+    return map_data
+
+
+def esewa_amount_matches(map_data, amount):
+    try:
+        paid = float(str(map_data.get('total_amount', '')).replace(',', ''))
+    except ValueError:
+        return False
+    return abs(paid - amount) < 0.005
+
+
+@login_required
+@use_primary
+def esewa_verify_checkout(request, checkout_id):
+    """Handle the eSewa callback for a cart checkout and update all its bookings at once."""
+    data = request.GET.get('data')
+    if not data:
+        return HttpResponseBadRequest('Missing payment data.')
+
+    map_data = esewa_response_data(data)
+    if map_data is None:
+        return HttpResponseBadRequest('Invalid payment data.')
+
+    checkout = get_object_or_404(Checkout, id=checkout_id, customer=request.user)
+    # A signed payload for another checkout or amount must not pay this one.
+    if (
+        str(map_data.get('transaction_uuid')) != str(checkout.transaction_uuid)
+        or map_data.get('product_code') != ESEWA_PRODUCT_CODE
+        or not esewa_amount_matches(map_data, checkout.total_amount)
+    ):
+        return HttpResponseBadRequest('Payment data does not match this checkout.')
+    bookings = checkout.bookings.exclude(payment_status__in=('Paid', 'Received'))
+
+    if str(map_data.get('status', '')).lower() == 'complete':
+        with transaction.atomic():
+            bookings.update(payment_status='Paid', paid_at=timezone.now(), updated_at=timezone.now())
+            Checkout.objects.filter(pk=checkout.pk).update(status='Paid')
+        messages.success(
+            request,
+            f'Esewa payment for Checkout #{checkout.id} was successful. The providers will confirm receipt.',
+        )
+    else:
+        bookings.update(payment_status='Failed', updated_at=timezone.now())
+        messages.error(request, f'Esewa payment for Checkout #{checkout.id} failed or was cancelled.')
+
+    return redirect('my_bookings')
+
+
+async def _booking_event_stream(user_id, last_seen):
+    """SSE frames for one user: hub events as they arrive, DB poll when idle."""
+    entry = hub.subscribe(user_id)
+    queue = entry[1]
+    changed = Booking.objects.filter(
+        Q(customer_id=user_id) | Q(service__provider_id=user_id)
+    ).select_related('service', 'service__provider')
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                events = [await asyncio.wait_for(queue.get(), timeout=SSE_POLL_SECONDS)]
+            except asyncio.TimeoutError:
+                events = [
+                    booking_event(b)
+                    async for b in changed.filter(updated_at__gt=last_seen).order_by('updated_at')[:50]
+                ]
+            if not events:
+                yield ': ping\n\n'
+                continue
+            for event in events:
+                if event['updated_at']:
+                    last_seen = max(last_seen, datetime.datetime.fromisoformat(event['updated_at']))
+                yield f"event: booking\nid: {last_seen.isoformat()}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        hub.unsubscribe(user_id, entry)
+
+
+def _resume_from(request):
+    """Where a reconnecting stream picks up: the Last-Event-ID timestamp we sent, else now."""
+    now = timezone.now()
+    try:
+        resumed = datetime.datetime.fromisoformat(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        return now
+    # Ids we send are aware; a naive one did not come from us and cannot be compared.
+    return min(resumed, now) if timezone.is_aware(resumed) else now
+
+
+async def booking_events(request):
+    """Server-Sent Events stream of booking status/payment changes for the logged-in user."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden('Login required.')
+    if not streams_supported(request):
+        # 204 tells EventSource to stop reconnecting; pages fall back to refreshing.
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        _booking_event_stream(user.id, _resume_from(request)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def payment_failed(request):
     return render(request, "bookings/payment_failed.html")
 
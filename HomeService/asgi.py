@@ -2,6 +2,9 @@
 ASGI config for HomeService project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through it (e.g. ``uvicorn HomeService.asgi:application``)
+so the booking event stream at /bookings/events/ holds an idle coroutine per
+client instead of a whole worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -0,0 +1,44 @@
+"""
+Shared helpers for the bench_* management commands.
+
+Benchmarks that seed synthetic rows run inside `scratch_database`: a throwaway
+test database built from the migrations the way `manage.py test` builds one
+(test_<NAME> on Postgres, in memory on SQLite) and destroyed on exit, so the
+configured database is never written. The default cache is swapped for a
+private LocMemCache for the same span: content-version bumps and rebuilt price
+sketches describe rows that only exist in the scratch database and must not
+reach the caches live processes read.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+SCRATCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark-scratch',
+    }
+}
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """Point the default database and cache at throwaway copies for the duration of the block."""
+    with override_settings(CACHES=SCRATCH_CACHES):
+        old_config = setup_databases(verbosity, interactive=False, aliases={'default'}, serialized_aliases=set())
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity)
+
+
+def timed(stdout, label, call, repeat):
+    """Run call repeat times and write the median and worst wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - t) * 1000)
+    stdout.write(f'{label:<36} median {statistics.median(samples):8.2f} ms   max {max(samples):8.2f} ms')
@@ -0,0 +1,19 @@
+"""
+Cache topology checks.
+
+Several features keep derived state in the default cache and rely on every
+process seeing every write (content versions, cached request.user). That holds
+for Redis, Memcached, the database and file caches, but not for LocMemCache,
+which lives inside one process, or DummyCache, which stores nothing. Those
+features ask `cache_is_shared` and fall back to their uncached behaviour.
+"""
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """True when writes to the cache are visible to every worker process."""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
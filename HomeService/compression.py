@@ -0,0 +1,81 @@
+"""
+Response compression : brotli when the client accepts it and the brotli package is
+installed, gzip otherwise (Django's GZipMiddleware).
+
+Only text-like responses are compressed; images, uploads and already-encoded
+static files pass through untouched, and Server-Sent Events stay uncompressed so
+every event is flushed as soon as it is written. Streaming responses are
+compressed chunk by chunk with a flush after each one.
+
+Pages that rendered a CSRF token always get gzip: GZipMiddleware pads its output
+with random bytes against BREACH, and a brotli stream has no field to pad.
+"""
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(r'^(text/(?!event-stream)|application/(json|javascript|xml|xhtml\+xml)|image/svg\+xml)')
+accepts_br = re.compile(r'\bbr\b')
+
+BROTLI_QUALITY = 5  # per response, so favour speed over the last few percent
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+        if (
+            brotli is None
+            or not accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            # get_token() sets this when the page carries a CSRF token: keep gzip's padding.
+            or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        ):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < 200:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _abrotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = _brotli_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,118 @@
+"""
+Database configuration from environment variables.
+
+DB_ENGINE=sqlite (default) keeps the development setup: db.sqlite3 next to
+manage.py, or DB_NAME. Every SQLite connection gets the tuning profile below
+(synchronous=NORMAL, mmap, a larger page cache, in-memory temp tables) and
+BEGIN IMMEDIATE transactions with a busy timeout, so concurrent writers queue
+for the lock instead of failing with "database is locked"; set
+DB_SQLITE_TUNING=0 for SQLite's stock behaviour. WAL is a property of the
+file, not the connection, so it is switched on once with
+`manage.py sqlite_maintenance --enable-wal` rather than on every connect
+(which would rewrite a checked-in database file). DB_ENGINE=postgres uses the docker-compose database
+unless DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT say otherwise.
+
+Postgres connections are persistent by default (DB_CONN_MAX_AGE seconds,
+checked before reuse when DB_CONN_HEALTH_CHECKS is on). DB_POOL=1 switches to
+psycopg's server-side pool instead (sized by DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE,
+DB_POOL_TIMEOUT). The pool is the better fit under ASGI, where persistent
+connections are tied to short-lived threads. Django requires CONN_MAX_AGE=0
+with a pool, so it is forced here.
+
+DB_REPLICAS adds read replicas as replica1, replica2, ... : comma-separated
+host or host:port for Postgres, file paths for SQLite. They inherit every
+other setting from the primary; HomeService.routers sends reads to them.
+"""
+import copy
+import os
+
+
+def env_bool(env, name, default=False):
+    value = env.get(name)
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(env, name, default):
+    value = env.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def sqlite_pragmas(env):
+    """PRAGMA statements run on every new SQLite connection."""
+    return [
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={env_int(env, 'DB_SQLITE_MMAP_MB', 128) * 1024 * 1024}",
+        f"PRAGMA cache_size=-{env_int(env, 'DB_SQLITE_CACHE_MB', 32) * 1024}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+def sqlite_database(env, base_dir):
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env.get('DB_NAME') or base_dir / 'db.sqlite3',
+        'CONN_MAX_AGE': env_int(env, 'DB_CONN_MAX_AGE', 0),
+        'OPTIONS': {},
+    }
+    if env_bool(env, 'DB_SQLITE_TUNING', True):
+        config['OPTIONS'] = {
+            'init_command': ';'.join(sqlite_pragmas(env)),
+            # Take the write lock up front: a deferred transaction that upgrades from
+            # read to write fails immediately on contention, ignoring the busy timeout.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': env_int(env, 'DB_SQLITE_BUSY_TIMEOUT', 20),
+        }
+    return config
+
+
+def postgres_database(env):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('DB_NAME', 'gharsewa_db'),
+        'USER': env.get('DB_USER', 'admin'),
+        'PASSWORD': env.get('DB_PASSWORD', 'admin@123'),
+        'HOST': env.get('DB_HOST', 'localhost'),
+        'PORT': env.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': env_int(env, 'DB_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': env_bool(env, 'DB_CONN_HEALTH_CHECKS', True),
+        'OPTIONS': {},
+    }
+    if env_bool(env, 'DB_POOL'):
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': env_int(env, 'DB_POOL_MIN_SIZE', 2),
+            'max_size': env_int(env, 'DB_POOL_MAX_SIZE', 10),
+            'timeout': env_int(env, 'DB_POOL_TIMEOUT', 10),
+        }
+    return config
+
+
+def replica_databases(primary, env):
+    replicas = {}
+    targets = [t.strip() for t in env.get('DB_REPLICAS', '').split(',') if t.strip()]
+    for i, target in enumerate(targets, start=1):
+        config = copy.deepcopy(primary)
+        config['TEST'] = {'MIRROR': 'default'}
+        if primary['ENGINE'] == 'django.db.backends.sqlite3':
+            config['NAME'] = target
+        else:
+            host, _, port = target.partition(':')
+            config['HOST'] = host
+            config['PORT'] = port or primary['PORT']
+        replicas[f'replica{i}'] = config
+    return replicas
+
+
+def database_settings(base_dir, env=None):
+    """The DATABASES setting for the current environment."""
+    env = os.environ if env is None else env
+    engine = env.get('DB_ENGINE', 'sqlite').strip().lower()
+    if engine in ('postgres', 'postgresql'):
+        primary = postgres_database(env)
+    elif engine == 'sqlite':
+        primary = sqlite_database(env, base_dir)
+    else:
+        raise ValueError(f'Unsupported DB_ENGINE {engine!r}; use sqlite or postgres.')
+    return {'default': primary, **replica_databases(primary, env)}
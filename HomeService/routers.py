@@ -0,0 +1,133 @@
+"""
+Primary/replica routing with read-your-writes.
+
+Reads made while handling a request go to a random replica (see DB_REPLICAS
+in HomeService.databases); writes always go to the primary. Once a request
+writes, the rest of it reads from the primary, and ReplicaPinMiddleware sets
+a short-lived cookie so that user's next requests do too until the replicas
+have caught up (DATABASE_REPLICA_PIN_SECONDS). Unsafe methods, views marked
+@use_primary (GET handlers that write), reads outside a request (jobs,
+workers, management commands), inside transaction.atomic() and for apps that
+must never see stale rows stay on the primary.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Sessions back login state and tasks are claimed under lock: always primary.
+PRIMARY_ONLY_APPS = {'sessions', 'taskqueue'}
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def pin_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or state.pinned or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+def _pin_request():
+    state = _routing.get()
+    if state is not None:
+        state.pinned = True
+
+
+def use_primary(view):
+    """Read from the primary for the whole view (for GET handlers that write). Sync or async views."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            _pin_request()
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            _pin_request()
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+class ReplicaPinMiddleware:
+    """Scopes routing to the request and carries the read-your-writes pin between requests."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _begin(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        # Writes read-modify-write: a stale replica row must never be saved back.
+        state = RoutingState(pinned=request.method not in SAFE_METHODS or pinned_until > time.time())
+        return state, _routing.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote:
+            seconds = pin_seconds()
+            response.set_cookie(PIN_COOKIE, f'{time.time() + seconds:.0f}', max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self._finish(state, response)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .databases import database_settings, env_bool
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,7 +43,8 @@ INSTALLED_APPS = [
     'Accounts.apps.AccountsConfig',
     'Bookings.apps.BookingsConfig',
     'Services.apps.ServicesConfig',
-    'dashboard.apps.DashboardConfig'
+    'dashboard.apps.DashboardConfig',
+    'taskqueue.apps.TaskqueueConfig',
 
 ]
 AUTH_USER_MODEL = 'Accounts.User'
@@ -51,10 +55,15 @@ LOGOUT_REDIRECT_URL = '/'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'HomeService.routers.ReplicaPinMiddleware',
+    # Compress (br/gzip) on the way out; ConditionalGet ETags the uncompressed body of
+    # pages without their own validators (Services.versions.versioned).
+    'HomeService.compression.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Accounts.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -72,6 +81,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'Bookings.context_processors.cart',
             ],
         },
     },
@@ -83,13 +93,37 @@ WSGI_APPLICATION = 'HomeService.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
+# SQLite unless DB_ENGINE=postgres; see HomeService/databases.py for the variables.
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+DATABASES = database_settings(BASE_DIR)
+DATABASE_ROUTERS = ['HomeService.routers.PrimaryReplicaRouter']
+
+# After a write, keep that user's reads on the primary for this long (replication lag).
+DATABASE_REPLICA_PIN_SECONDS = 10
+
+
+# Caches: Redis when REDIS_URL is set (shared across workers), else per-process memory.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Sessions: cached_db (default) reads through the cache; SESSION_BACKEND=signed_cookies
+# keeps them in the browser with no storage at all; db is Django's stock engine.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('SESSION_BACKEND', 'cached_db')
+
+# Accounts.auth caches request.user for this long (dropped on every User save/delete).
+# Only with a shared cache (REDIS_URL); with per-process memory the user is loaded per request.
+AUTH_USER_CACHE_SECONDS = 300
 
 
 # Password validation
@@ -131,9 +165,33 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Serve STATIC_ROOT from Django (HomeService.staticfiles.serve_static) when no CDN/proxy does.
+SERVE_STATIC = env_bool(os.environ, 'SERVE_STATIC')
+
+# Part of every content-version ETag (Services.versions); set per deploy so template changes revalidate.
+CONTENT_RELEASE = os.environ.get('RELEASE', '')
 
 # Media files (User uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per content hash (HomeService.storage); see gc_media_blobs.
+STORAGES = {
+    'default': {
+        'BACKEND': 'HomeService.storage.ContentAddressedStorage',
+    },
+    # collectstatic: hashed names, .gz/.br siblings and image variants (HomeService.staticfiles).
+    'staticfiles': {
+        'BACKEND': 'HomeService.staticfiles.OptimizedStaticFilesStorage',
+    },
+}
+
+# Outgoing email (booking reminders). Console backend until SMTP is configured.
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'Ghar Sewa <no-reply@gharsewa.local>'
 
+# Booking scheduler (Bookings.scheduler)
+BOOKING_REMINDER_LEAD_MINUTES = 24 * 60
+BOOKING_EXPIRY_GRACE_MINUTES = 60
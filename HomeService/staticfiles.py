@@ -0,0 +1,184 @@
+"""
+Static files : hashed names, precompressed siblings, responsive image variants.
+
+`collectstatic` with OptimizedStaticFilesStorage:
+  * writes content-hashed copies and staticfiles.json (Django's manifest storage);
+  * renders JPEG/PNG images at IMAGE_WIDTHS (and native width) as WebP plus the
+    original format, registered in the manifest as <name>.<width>w.<ext> so
+    `{% static_picture %}` can build srcset lists;
+  * writes .gz and .br (when the brotli package is installed) next to every
+    hashed text asset where that saves space.
+
+serve_static serves STATIC_ROOT from the app (SERVE_STATIC=1) for deployments
+without a CDN or front proxy: hashed names get immutable year-long caching and
+the best precompressed sibling the client accepts.
+"""
+import gzip
+import io
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+from PIL import Image, ImageOps
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+IMAGE_WIDTHS = (480, 960, 1600)
+IMAGE_EXTENSIONS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG'}
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml', '.ico', '.ttf', '.otf', '.eot',
+}
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=300'
+
+
+def variant_name(name, width, ext):
+    return f'{os.path.splitext(name)[0]}.{width}w.{ext}'
+
+
+class OptimizedStaticFilesStorage(ManifestStaticFilesStorage):
+    # Templates reference a few images that are not in static/: keep their plain URL.
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(paths):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                for variant, hashed in self._image_variants(name):
+                    yield variant, hashed, True
+        self.save_manifest()
+        for hashed in sorted(set(self.hashed_files.values())):
+            if os.path.splitext(hashed)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self._precompress(hashed)
+
+    def _store(self, name, data):
+        hashed = self.clean_name(self.hashed_name(name, ContentFile(data)))
+        if not self.exists(hashed):
+            self._save(hashed, ContentFile(data))
+        self.hashed_files[self.hash_key(self.clean_name(name))] = hashed
+        return hashed
+
+    def _image_variants(self, name):
+        ext = os.path.splitext(name)[1].lower()
+        original = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+        with self.open(name) as fh:
+            image = ImageOps.exif_transpose(Image.open(fh))
+            image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+
+        native = image.width
+        widths = [w for w in IMAGE_WIDTHS if w < native] + [min(native, max(IMAGE_WIDTHS))]
+        for width in sorted(set(widths)):
+            resized = image if width == native else image.resize(
+                (width, max(round(image.height * width / native), 1)), Image.Resampling.LANCZOS
+            )
+            buffer = io.BytesIO()
+            resized.save(buffer, 'WEBP', quality=80, method=4)
+            webp = variant_name(name, width, 'webp')
+            yield webp, self._store(webp, buffer.getvalue())
+
+            same = variant_name(name, width, ext.lstrip('.'))
+            if width == native and original:
+                # Native width in the original format is the original itself: alias it.
+                self.hashed_files[self.hash_key(self.clean_name(same))] = original
+                yield same, original
+                continue
+            buffer = io.BytesIO()
+            if IMAGE_EXTENSIONS[ext] == 'JPEG':
+                resized.convert('RGB').save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+            else:
+                resized.save(buffer, 'PNG', optimize=True)
+            yield same, self._store(same, buffer.getvalue())
+
+    def _precompress(self, name):
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        encoded = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            encoded['.br'] = brotli.compress(data, quality=11)
+        for suffix, payload in encoded.items():
+            if len(payload) < len(data) * 0.95:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(payload))
+
+
+@lru_cache(maxsize=None)
+def image_variants(name):
+    """{'webp': [(width, url), ...], '<ext>': [...]} from the manifest; {} without one (DEBUG)."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if settings.DEBUG or not hashed_files:
+        return {}
+    pattern = re.compile(re.escape(os.path.splitext(name)[0]) + r'\.(\d+)w\.(\w+)$')
+    variants = {}
+    for key in hashed_files:
+        match = pattern.match(key)
+        if match:
+            variants.setdefault(match.group(2), []).append((int(match.group(1)), staticfiles_storage.url(key)))
+    for entries in variants.values():
+        entries.sort()
+    return variants
+
+
+@lru_cache(maxsize=1)
+def _hashed_names():
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve a collected static file: precompressed when accepted, immutable when hashed."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    stat = os.stat(full_path)
+    cache_control = IMMUTABLE if path in _hashed_names() else REVALIDATE
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['Cache-Control'] = cache_control
+        return response
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    serve_path, encoding = full_path, None
+    accepted = request.headers.get('Accept-Encoding', '')
+    for name, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if name in accepted and os.path.isfile(full_path + suffix):
+            serve_path, encoding = full_path + suffix, name
+            break
+
+    response = FileResponse(open(serve_path, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
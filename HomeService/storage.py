@@ -0,0 +1,89 @@
+"""
+Content-addressed media storage.
+
+Uploads are streamed to a temporary file while being hashed (SHA-256), then
+moved to blobs/<aa>/<bb>/<digest><ext>. The same bytes uploaded twice end up
+as one file, whatever name the model's upload_to produced. Blob names never
+change meaning, so serve_blob can send them with an immutable, year-long
+Cache-Control and the digest as ETag. Nothing is deleted when a row stops
+pointing at a blob; the gc_media_blobs command removes unreferenced ones.
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+BLOB_DIR = 'blobs'
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def blob_name(digest, ext):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save; never suffix it.
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()
+        # Same filesystem as the blobs so the final move is an atomic rename.
+        tmp_dir = os.path.join(self.location, '.uploads')
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+            final = blob_name(digest.hexdigest(), ext)
+            final_path = self.path(final)
+            if os.path.exists(final_path):
+                os.unlink(tmp_path)
+                # Refresh mtime so gc_media_blobs' grace period covers the new reference.
+                os.utime(final_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return final
+
+
+@require_safe
+def serve_blob(request, path):
+    """Serve a content-addressed blob with far-future caching; the digest is the ETag."""
+    from django.core.files.storage import default_storage
+
+    try:
+        full_path = safe_join(default_storage.location, BLOB_DIR, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = '"%s"' % os.path.splitext(os.path.basename(path))[0]
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(full_path)
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type or 'application/octet-stream')
+    response['ETag'] = etag
+    response['Cache-Control'] = IMMUTABLE
+    return response
@@ -15,11 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.shortcuts import render
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .staticfiles import serve_static
+from .storage import BLOB_DIR, serve_blob
+
 def home(request):
     return render(request, 'home.html')
 
@@ -33,6 +36,16 @@ urlpatterns = [
     path('dashboard/', include('dashboard.urls')),
 ]
 
+# Content-addressed uploads: served in every environment, cached forever by clients.
+urlpatterns += [
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}{BLOB_DIR}/(?P<path>.+)$', serve_blob, name='media_blob'),
+]
+
+if settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(rf'^{settings.STATIC_URL.lstrip("/")}(?P<path>.+)$', serve_static, name='static_file'),
+    ]
+
 # Serve media files during development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
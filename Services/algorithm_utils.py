@@ -2,11 +2,19 @@
 
 from __future__ import annotations
 
-from typing import List, Sequence, TypeVar
+import math
+from functools import reduce
+from itertools import groupby
+from operator import or_
+from typing import Callable, Iterable, List, Optional, Sequence, TypeVar
 
-from django.db.models import Avg, Count
+from collections import defaultdict
 
-from Bookings.models import ReviewRating
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import Lower, Trim
+
+from Bookings.models import Booking, ProviderSLA, ReviewRating
+from .models import Service
 
 T = TypeVar('T')
 
@@ -58,6 +66,71 @@ def add_ratings_to_category_list(categories_list: list) -> None:
                 pd['rating_count'] = r['n'] if r else 0
 
 
+def get_sla_summary_for_providers(provider_ids: Sequence[int]) -> dict[int, ProviderSLA]:
+    """
+    Data harvesting : one DB query for the precomputed SLA percentiles (see Bookings.sla).
+    Returns { provider_id: ProviderSLA, ... }; providers without stats are absent.
+    """
+    if not provider_ids:
+        return {}
+    rows = ProviderSLA.objects.filter(provider_id__in=provider_ids).only(
+        'provider_id', 'response_p50', 'response_p90', 'response_count',
+        'completion_p50', 'completion_p90', 'completion_count',
+    )
+    return {r.provider_id: r for r in rows}
+
+
+def add_sla_to_provider_items(items: List[dict]) -> None:
+    """Data harvesting : attach item['sla'] (ProviderSLA or None) to each provider item dict."""
+    if not items:
+        return
+    summary = get_sla_summary_for_providers(list({item['provider'].id for item in items}))
+    for item in items:
+        item['sla'] = summary.get(item['provider'].id)
+
+
+def add_sla_to_category_list(categories_list: list) -> None:
+    """Data harvesting : SLA stats for the whole category → company → provider tree."""
+    pids = {
+        pd['provider'].id
+        for cat_data in categories_list
+        for co in cat_data.get('companies', [])
+        for pd in co['providers']
+    }
+    summary = get_sla_summary_for_providers(pids)
+    for cat_data in categories_list:
+        for co in cat_data.get('companies', []):
+            for pd in co['providers']:
+                pd['sla'] = summary.get(pd['provider'].id)
+
+
+def get_services_for_providers(provider_ids: Sequence[int], category: str) -> dict[int, list]:
+    """Data harvesting : one DB query for every provider's services in a category."""
+    if not provider_ids:
+        return {}
+    by_provider = defaultdict(list)
+    for service in Service.objects.filter(provider_id__in=provider_ids, category=category):
+        by_provider[service.provider_id].append(service)
+    return by_provider
+
+
+def get_earnings_for_providers(provider_ids: Sequence[int], category: str) -> dict[int, object]:
+    """Data harvesting : one DB query summing completed-booking prices per provider."""
+    if not provider_ids:
+        return {}
+    rows = (
+        Booking.objects.filter(
+            service__provider_id__in=provider_ids,
+            service__category=category,
+            status='Completed',
+        )
+        .order_by()
+        .values_list('service__provider_id')
+        .annotate(total=Sum('service__price'))
+    )
+    return dict(rows)
+
+
 #  Binary search algorithm
 
 def binary_search(sorted_seq: Sequence[T], target: T) -> int:
@@ -91,36 +164,272 @@ def match_exact_username(providers: Sequence, search_lower: str) -> tuple[list,
 
 
 
+# Edit distance algorithm (bounded dynamic programming)
+
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Dynamic programming : optimal string alignment distance between a and b (insert,
+    delete, substitute, swap two neighbours), or limit + 1 as soon as it must exceed limit.
+    Common prefix and suffix are stripped first, so near-identical strings cost almost nothing.
+    """
+    if a == b:
+        return 0
+    start, shortest = 0, min(len(a), len(b))
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    a, b = a[start:], b[start:]
+    while a and b and a[-1] == b[-1]:
+        a, b = a[:-1], b[:-1]
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if not a or not b:
+        return len(a) or len(b)
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            d = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, before[j - 2] + 1)
+            current[j] = d
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+
 # Filtering algorithm (filter-based methods)
 
 
 
-def provider_matches_search(provider, services, category: str, raw_search: str) -> bool:
-    """Filtering : True if any predicate matches (profile, category label, service name)."""
+def matches_search_terms(texts: Iterable[Optional[str]], terms: Optional[Sequence[Sequence[str]]]) -> bool:
+    """
+    Filtering : True if every search term occurs, in one of its spellings, in one of texts.
+    terms is [[word, correction, ...], ...] as built by Services.autocomplete.search_terms.
+    """
+    if not terms:
+        return False
+    texts = [text.lower() for text in texts if text]
+    return all(any(spelling in text for spelling in spellings for text in texts) for spellings in terms)
+
+
+def search_terms_q(terms: Sequence[Sequence[str]], fields: Sequence[str]) -> Q:
+    """Filtering : matches_search_terms as a queryset filter over fields (icontains)."""
+    query = Q()
+    for spellings in terms:
+        query &= reduce(or_, (Q(**{f'{field}__icontains': s}) for s in spellings for field in fields))
+    return query
+
+
+def provider_matches_search(provider, services, category: str, raw_search: str, terms=None) -> bool:
+    """
+    Filtering : True if any predicate matches (profile, category label, service name),
+    or, with terms, if every term or a correction of it matches one of them. services
+    is the provider's services in category, already loaded: no queries here.
+    """
     if not raw_search:
         return True
     q = raw_search.strip().lower()
-    raw = raw_search.strip()
+    fields = (provider.username, provider.first_name, provider.last_name, provider.company_name)
+    names = [service.name for service in services]
     return (
-        q in provider.username.lower()
-        or q in (provider.first_name or '').lower()
-        or q in (provider.last_name or '').lower()
-        or q in (provider.company_name or '').lower()
+        any(q in (field or '').lower() for field in (*fields, *names))
         or q in category.lower()
-        or services.filter(name__icontains=raw).exists()
+        or (terms is not None and matches_search_terms((*fields, category, *names), terms))
     )
 
 
-def filter_providers_by_search(items: List[dict], search_query: str) -> List[dict]:
-    """Filtering : keep only items whose provider fields contain the search text."""
+def filter_providers_by_search(items: List[dict], search_query: str, terms=None, category: str = '') -> List[dict]:
+    """
+    Filtering : keep only items whose provider fields contain the search text, or,
+    with terms, whose provider fields and category match every term or a correction of it.
+    """
     if not search_query:
         return items
     q = search_query.lower()
+    kept = []
+    for item in items:
+        provider = item['provider']
+        fields = (provider.username, provider.first_name, provider.last_name, provider.company_name)
+        if any(q in (field or '').lower() for field in fields) or (
+            terms is not None and matches_search_terms((*fields, category), terms)
+        ):
+            kept.append(item)
+    return kept
+
+
+
+# Grouping algorithm (one-pass tree builder)
+
+
+
+def company_label(company_name: Optional[str]) -> str:
+    """Grouping : the company heading a provider is listed under ('—' when blank)."""
+    return (company_name or '').strip() or '—'
+
+
+def company_ordering(prefix: str = '') -> list:
+    """
+    Grouping : ORDER BY terms that keep every company_label group contiguous, A–Z.
+    Case-insensitive first, exact second, so names differing only in case never interleave.
+    """
+    name = Trim(f'{prefix}company_name')
+    return [Lower(name), name]
+
+
+def group_sorted(items: Iterable[T], *keys: Callable) -> list:
+    """
+    Grouping : nest an ordered stream in one linear pass, without sorting.
+    items must arrive ordered by (keys[0], keys[1], ...); returns
+    [(k0, [(k1, [... [item, ...]])]), ...] with one level per key function.
+    """
+    if not keys:
+        return list(items)
+    key, rest = keys[0], keys[1:]
+    return [(k, group_sorted(group, *rest)) for k, group in groupby(items, key)]
+
+
+def group_provider_items_by_company(items: List[dict]) -> List[dict]:
+    """
+    Grouping : [{'company_name', 'providers': [...]}, ...] from provider items whose
+    providers are ordered by company_ordering(), then username.
+    """
     return [
-        item
-        for item in items
-        if q in item['provider'].username.lower()
-        or q in (item['provider'].first_name or '').lower()
-        or q in (item['provider'].last_name or '').lower()
-        or q in (item['provider'].company_name or '').lower()
+        {'company_name': company, 'providers': providers}
+        for company, providers in group_sorted(items, lambda item: company_label(item['provider'].company_name))
     ]
+
+
+def category_tree_ordering() -> list:
+    """Grouping : ORDER BY terms for build_category_tree on a Service queryset."""
+    return ['category', *company_ordering('provider__'), Lower('provider__username'), 'provider_id', 'id']
+
+
+def build_category_tree(services: Iterable) -> dict:
+    """
+    Grouping : {category: [{'company_name', 'providers': [{'provider', 'services'}]}]}
+    in one pass over services ordered by category_tree_ordering(). Same result as
+    group_sorted with three keys, but the company label is only computed when the
+    provider changes, which is what keeps it cheaper than the old dict-and-sort.
+    """
+    tree = {}
+    category = company = provider_id = None
+    for service in services:
+        if service.category != category:
+            category = service.category
+            companies = tree[category] = []
+            company = provider_id = None
+        if service.provider_id != provider_id:
+            provider_id = service.provider_id
+            label = company_label(service.provider.company_name)
+            if label != company:
+                company = label
+                providers = []
+                companies.append({'company_name': company, 'providers': providers})
+            provider_services = []
+            providers.append({'provider': service.provider, 'services': provider_services})
+        provider_services.append(service)
+    return tree
+
+
+# Streaming quantile sketch
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles : log-bucketed counts (DDSketch-style) with relative error ~alpha.
+    Mergeable, JSON-serialisable and supports removals, so jobs can update a stored
+    sketch incrementally instead of re-reading every sample.
+    """
+
+    def __init__(self, alpha: float = 0.02, buckets: Optional[dict] = None, zeros: int = 0):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = dict(buckets or {})
+        self.zeros = zeros
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.buckets.values())
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, weight: int = 1) -> None:
+        if value <= 0:
+            self.zeros += weight
+            return
+        k = self._key(value)
+        self.buckets[k] = self.buckets.get(k, 0) + weight
+
+    def extend(self, values: Iterable[float]) -> None:
+        for v in values:
+            self.add(v)
+
+    def discard(self, value: float, weight: int = 1) -> None:
+        """
+        Undo add(value, weight): bucket counts are exact, so removals are too. Only discard
+        what was added: a value that never was takes the count of another value in the
+        same bucket (or is dropped when the bucket is empty).
+        """
+        if value <= 0:
+            self.zeros = max(self.zeros - weight, 0)
+            return
+        k = self._key(value)
+        left = self.buckets.get(k, 0) - weight
+        if left > 0:
+            self.buckets[k] = left
+        else:
+            self.buckets.pop(k, None)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        self.zeros += other.zeros
+        for k, n in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + n
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0..1), or None for an empty sketch."""
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if rank < seen:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def rank(self, value: float) -> Optional[float]:
+        """Fraction of samples <= value (0..1), or None for an empty sketch."""
+        total = self.count
+        if not total:
+            return None
+        if value <= 0:
+            return self.zeros / total
+        limit = self._key(value)
+        below = self.zeros + sum(n for k, n in self.buckets.items() if k <= limit)
+        return below / total
+
+    def to_dict(self) -> dict:
+        return {
+            'alpha': self.alpha,
+            'zeros': self.zeros,
+            'buckets': {str(k): n for k, n in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict], alpha: float = 0.02) -> 'QuantileSketch':
+        if not data:
+            return cls(alpha=alpha)
+        return cls(
+            alpha=data.get('alpha', alpha),
+            buckets={int(k): n for k, n in data.get('buckets', {}).items()},
+            zeros=data.get('zeros', 0),
+        )
@@ -0,0 +1,446 @@
+"""
+Search autocomplete : in-memory sorted-array prefix index over the marketplace.
+
+Every bookable service contributes four suggestions: its name, its category, its
+provider (matched by username, first and last name) and the provider's company.
+Each suggestion is indexed under the start of every word it contains, so "sharma"
+finds "Ram Sharma Plumbing". Terms live in one sorted list of (term, entry key)
+pairs, so a prefix is a bisect range; suggestions are ranked by booking volume.
+Every word is also kept in a symmetric-delete index (Services.fuzzy): when a prefix
+finds too little, suggestions fall back to words within a small edit distance, and
+search_terms gives the search pages corrected spellings ("plumbr" -> "plumber").
+
+The index is kept current in place: Services.signals calls service_saved,
+service_deleted, provider_saved and booking_added for writes made by this
+process. Writes made by other processes or by bulk statements are picked up by a
+background rebuild once the index is older than REBUILD_SECONDS; with a shared
+cache the rebuild is skipped while the content versions (Services.versions) have
+not moved, with a process-local one it always runs, since other processes' bumps
+never show up there.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice, product
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from HomeService.caches import cache_is_shared
+from .fuzzy import FuzzyIndex, parts, pieces
+from .models import Service
+from .versions import version_key
+
+REBUILD_SECONDS = getattr(settings, 'AUTOCOMPLETE_REBUILD_SECONDS', 60)
+SHORT_PREFIX = 4
+HEAVY_RANGE = 256
+TOP_K = 20
+MAX_QUERY = 64
+MAX_CORRECTIONS = 5
+
+SOURCE_COLUMNS = (
+    'id', 'name', 'category', 'provider_id', 'provider__username', 'provider__first_name',
+    'provider__last_name', 'provider__company_name',
+)
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def word_starts(text):
+    """'ram sharma plumbing' -> ['ram sharma plumbing', 'sharma plumbing', 'plumbing']"""
+    words = normalize(text).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class Entry:
+    __slots__ = ('kind', 'text', 'weight', 'refs', 'terms', 'categories')
+
+    def __init__(self, kind, text, terms):
+        self.kind = kind
+        self.text = text
+        self.weight = 0
+        self.refs = 0
+        self.terms = terms
+        self.categories = defaultdict(int)
+
+
+class Source:
+    """What one service contributes: its entry keys, category and booking count."""
+
+    __slots__ = ('keys', 'category', 'provider_id', 'bookings')
+
+    def __init__(self, keys, category, provider_id, bookings):
+        self.keys = keys
+        self.category = category
+        self.provider_id = provider_id
+        self.bookings = bookings
+
+
+def _rank(entry):
+    return (-entry.weight, entry.text.lower(), entry.kind)
+
+
+def _as_dict(entry, distance=0):
+    return {'text': entry.text, 'kind': entry.kind, 'bookings': entry.weight, 'distance': distance}
+
+
+def _parts(terms):
+    # Each term starts at a different word; its first word is enough.
+    return {part for term in terms for part in parts(term.split(' ', 1)[0])}
+
+
+def corrected_query(terms):
+    """The query as searched with each word's best correction, or '' when nothing was corrected."""
+    if not any(len(spellings) > 1 for spellings in terms):
+        return ''
+    return ' '.join(spellings[1] if len(spellings) > 1 else spellings[0] for spellings in terms)
+
+
+class AutocompleteIndex:
+    """
+    Broad prefixes answer from top-TOP_K lists per (category, prefix) that are kept in
+    order as entries change: every prefix up to SHORT_PREFIX characters is listed at
+    build time, and a longer prefix gets a list the first time its bisect range holds
+    more than HEAVY_RANGE terms. A list that may have lost a member it cannot replace
+    is marked dirty and rescanned on its next lookup. Narrow prefixes are ranked
+    straight from their range.
+    """
+
+    def __init__(self):
+        self.pairs = []  # sorted (term, entry key)
+        self.entries = {}  # entry key -> Entry
+        self.sources = {}  # service id -> Source
+        self.by_provider = defaultdict(set)  # provider id -> service ids
+        self.top = {}  # (category or None, short prefix) -> [Entry, ...] best first
+        self.dirty = set()  # top keys to rescan
+        self.fuzzy = FuzzyIndex()  # word -> entry keys
+        self.lock = threading.RLock()
+        self._building = False
+
+    # Building
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: (SOURCE_COLUMNS..., bookings) tuples. Sorts once instead of inserting one by one."""
+        index = cls()
+        index._building = True
+        pairs = []
+        for row in rows:
+            index._add_source(row[:-1], row[-1], pairs)
+        pairs.sort()
+        index.pairs = pairs
+        candidates = defaultdict(list)
+        for entry in index.entries.values():
+            for key in index._top_keys(entry):
+                if len(key[1]) <= SHORT_PREFIX:
+                    candidates[key].append(entry)
+        index.top = {key: heapq.nsmallest(TOP_K, found, key=_rank) for key, found in candidates.items()}
+        index._building = False
+        return index
+
+    @staticmethod
+    def _entry_specs(name, category, username, first_name, last_name, company):
+        company = (company or '').strip()
+        full_name = f'{first_name or ""} {last_name or ""}'.strip()
+        specs = [
+            ('service', name.strip(), [name]),
+            ('category', category, [category]),
+            ('provider', username, [username, full_name] if full_name else [username]),
+        ]
+        if company:
+            specs.append(('company', company, [company]))
+        return specs
+
+    @staticmethod
+    def _top_keys(entry):
+        """Every (category, prefix) list entry can appear in."""
+        prefixes = {term[:n] for term in entry.terms for n in range(1, len(term) + 1)}
+        return [(category, prefix) for prefix in prefixes for category in (None, *entry.categories)]
+
+    def _promote(self, entry):
+        """entry is new, heavier or in a new category: place it in the lists it now qualifies for."""
+        rank = _rank(entry)
+        for key in self._top_keys(entry):
+            top = self.top.get(key)
+            if top is None:
+                # A missing short list means nothing else matches; missing long lists are narrow.
+                if len(key[1]) <= SHORT_PREFIX:
+                    self.top[key] = [entry]
+            elif entry in top:
+                top.sort(key=_rank)
+            elif len(top) < TOP_K or rank < _rank(top[-1]):
+                insort(top, entry, key=_rank)
+                del top[TOP_K:]
+
+    def _demote(self, entry, keys):
+        """entry lost weight, a category or its last source; keys are its list keys from before."""
+        for key in keys:
+            top = self.top.get(key)
+            if not top or entry not in top:
+                continue
+            if len(top) >= TOP_K:
+                # Whatever should take its place is not in the list: rescan on next lookup.
+                self.dirty.add(key)
+            elif entry.refs and (key[0] is None or key[0] in entry.categories):
+                top.sort(key=_rank)
+            else:
+                top.remove(entry)
+
+    def _add_source(self, row, bookings, pairs=None):
+        service_id, name, category, provider_id, username, first_name, last_name, company = row
+        keys = []
+        for kind, text, aliases in self._entry_specs(name, category, username, first_name, last_name, company):
+            key = (kind, normalize(text))
+            entry = self.entries.get(key)
+            if entry is None:
+                terms = sorted({term for alias in aliases for term in word_starts(alias)})
+                entry = self.entries[key] = Entry(kind, text, terms)
+                for part in _parts(terms):
+                    self.fuzzy.add(part, key)
+                for term in terms:
+                    if pairs is None:
+                        insort(self.pairs, (term, key))
+                    else:
+                        pairs.append((term, key))
+            entry.refs += 1
+            entry.weight += bookings
+            entry.categories[category] += 1
+            if not self._building:
+                self._promote(entry)
+            keys.append(key)
+        self.sources[service_id] = Source(keys, category, provider_id, bookings)
+        self.by_provider[provider_id].add(service_id)
+
+    def _remove_source(self, service_id):
+        source = self.sources.pop(service_id, None)
+        if source is None:
+            return None
+        self.by_provider[source.provider_id].discard(service_id)
+        for key in source.keys:
+            entry = self.entries[key]
+            top_keys = self._top_keys(entry)
+            entry.refs -= 1
+            entry.weight -= source.bookings
+            entry.categories[source.category] -= 1
+            if not entry.categories[source.category]:
+                del entry.categories[source.category]
+            if not entry.refs:
+                del self.entries[key]
+                for part in _parts(entry.terms):
+                    self.fuzzy.discard(part, key)
+                for term in entry.terms:
+                    i = bisect_left(self.pairs, (term, key))
+                    if i < len(self.pairs) and self.pairs[i] == (term, key):
+                        del self.pairs[i]
+            self._demote(entry, top_keys)
+        return source
+
+    # Incremental updates
+
+    def upsert(self, row):
+        with self.lock:
+            old = self._remove_source(row[0])
+            self._add_source(row, old.bookings if old else 0)
+
+    def remove(self, service_id):
+        with self.lock:
+            self._remove_source(service_id)
+
+    def add_bookings(self, service_id, delta=1):
+        with self.lock:
+            source = self.sources.get(service_id)
+            if source is None:
+                return
+            source.bookings += delta
+            for key in source.keys:
+                entry = self.entries[key]
+                top_keys = self._top_keys(entry) if delta < 0 else None
+                entry.weight += delta
+                if delta < 0:
+                    self._demote(entry, top_keys)
+                else:
+                    self._promote(entry)
+
+    # Lookup
+
+    def _scan(self, prefix, category, k):
+        """(top k entries, number of terms scanned) from the prefix's bisect range."""
+        lo = bisect_left(self.pairs, (prefix,))
+        hi = bisect_left(self.pairs, (prefix + '\uffff',), lo)
+        entries = {self.entries[key] for _, key in self.pairs[lo:hi]}
+        if category:
+            entries = [entry for entry in entries if category in entry.categories]
+        return heapq.nsmallest(k, entries, key=_rank), hi - lo
+
+    def suggest(self, query, k=8, category=None):
+        """
+        Top k (at most TOP_K) suggestions whose words start with query, by booking volume
+        then text; topped up with the suggestions of its corrected spellings when fewer match.
+        """
+        prefix = normalize(query)[:MAX_QUERY]
+        if not prefix:
+            return []
+        k = min(k, TOP_K)
+        top = self._prefix_top(prefix, category)[:k]
+        results = [_as_dict(entry) for entry in top]
+        if len(results) < k:
+            seen = set(top)
+            for distance, entry in self._corrected_top(prefix, category):
+                if entry not in seen:
+                    seen.add(entry)
+                    results.append(_as_dict(entry, distance))
+                    if len(results) == k:
+                        break
+        return results
+
+    def _prefix_top(self, prefix, category):
+        key = (category, prefix)
+        top = self.top.get(key)
+        if top is None and len(prefix) <= SHORT_PREFIX:
+            top = ()
+        if top is None or key in self.dirty:
+            with self.lock:
+                top = self.top.get(key)
+                if top is None or key in self.dirty:
+                    top, scanned = self._scan(prefix, category, TOP_K)
+                    if key in self.dirty or scanned > HEAVY_RANGE:
+                        self.top[key] = top
+                        self.dirty.discard(key)
+        return top
+
+    def _corrected_top(self, prefix, category):
+        """[(edits, entry), ...] from the prefix lists of the query's corrected spellings, fewest edits first."""
+        options = [self._spellings(token) for token in prefix.split(' ')]
+        found = []
+        for combo in islice(product(*options), MAX_CORRECTIONS + 1):
+            edits = sum(distance for _, distance in combo)
+            if edits:
+                spelling = ' '.join(word for word, _ in combo)
+                found += [(edits, entry) for entry in self._prefix_top(spelling, category)]
+        found.sort(key=lambda match: (match[0], *_rank(match[1])))
+        return found
+
+    def _starts_word(self, token):
+        i = bisect_left(self.pairs, (token,))
+        return i < len(self.pairs) and self.pairs[i][0].startswith(token)
+
+    def _spellings(self, token):
+        """
+        [(spelling, edits), ...] for one query word: the word itself when an indexed word
+        starts with it, else the word with each misspelt letter run (Services.fuzzy.parts)
+        replaced by its closest indexed parts, at most MAX_CORRECTIONS of them.
+        """
+        if not token or self._starts_word(token):
+            return [(token, 0)]
+        options = []
+        with self.lock:
+            for i, piece in enumerate(pieces(token)):
+                matches = self.fuzzy.lookup(piece) if i % 2 and piece not in self.fuzzy.words else ()
+                options.append([match for match in matches if match[1] == matches[0][1]] or [(piece, 0)])
+        return [
+            (''.join(word for word, _ in combo), sum(distance for _, distance in combo))
+            for combo in islice(product(*options), MAX_CORRECTIONS)
+        ]
+
+    def search_terms(self, query):
+        """
+        [[word, correction, ...], ...] per query word, for the search pages: the word itself
+        plus its corrected spellings when no indexed word starts with it.
+        """
+        terms = []
+        for token in normalize(query)[:MAX_QUERY].split(' '):
+            if token:
+                terms.append([token, *(spelling for spelling, edits in self._spellings(token) if edits)])
+        return terms
+
+
+def source_rows(**filters):
+    """(SOURCE_COLUMNS..., bookings) for bookable services matching filters."""
+    qs = Service.objects.filter(provider__is_provider=True, **filters).exclude(provider__company_name='')
+    return qs.annotate(bookings=Count('booking')).values_list(*SOURCE_COLUMNS, 'bookings').order_by()
+
+
+def _watched_versions():
+    keys = [version_key('catalog'), *(version_key(f'category:{c}') for c, _ in Service.CATEGORY_CHOICES)]
+    values = cache.get_many(keys)
+    return tuple(values.get(key) for key in keys)
+
+
+class AutocompleteService:
+    """Process-wide index: built on first use, rebuilt in the background when stale."""
+
+    def __init__(self):
+        self.index = None
+        self.built_at = 0.0
+        self.versions = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+
+    def rebuild(self):
+        versions = _watched_versions()
+        index = AutocompleteIndex.from_rows(source_rows())
+        self.index, self.versions, self.built_at = index, versions, time.monotonic()
+        return index
+
+    def _rebuild_in_background(self):
+        from django.db import close_old_connections
+
+        try:
+            self.rebuild()
+        finally:
+            self._rebuilding = False
+            close_old_connections()
+
+    def get(self):
+        if self.index is None:
+            with self._lock:
+                if self.index is None:
+                    self.rebuild()
+        elif time.monotonic() - self.built_at > REBUILD_SECONDS and not self._rebuilding:
+            if not cache_is_shared() or _watched_versions() != self.versions:
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+            else:
+                self.built_at = time.monotonic()
+        return self.index
+
+    def suggest(self, query, k=8, category=None):
+        return self.get().suggest(query, k=k, category=category)
+
+    def search_terms(self, query):
+        return self.get().search_terms(query)
+
+    # Hooks for Services.signals; no-ops until the index has been built.
+
+    def service_saved(self, service_id):
+        if self.index is not None:
+            rows = list(source_rows(id=service_id))
+            if rows:
+                self.index.upsert(rows[0][:-1])
+            else:
+                self.index.remove(service_id)
+
+    def service_deleted(self, service_id):
+        if self.index is not None:
+            self.index.remove(service_id)
+
+    def provider_saved(self, provider_id):
+        """Re-index a provider's services (name, company or bookability may have changed)."""
+        if self.index is not None:
+            rows = {row[0]: row for row in source_rows(provider_id=provider_id)}
+            for service_id in set(self.index.by_provider.get(provider_id, ())) - rows.keys():
+                self.index.remove(service_id)
+            for row in rows.values():
+                self.index.upsert(row[:-1])
+
+    def booking_added(self, service_id, delta=1):
+        if self.index is not None:
+            self.index.add_bookings(service_id, delta)
+
+
+autocomplete = AutocompleteService()
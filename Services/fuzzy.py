@@ -0,0 +1,109 @@
+"""
+Fuzzy search : symmetric-delete index for typo-tolerant lookups ("plumbr", "electrcal").
+
+Two words are within edit distance d only if deleting at most d characters from each
+leaves a common string. Every indexed word is stored under the strings left after
+deleting up to two characters of its first PREFIX characters; a query generates its
+own deletes the same way and only the words filed under them are checked with
+algorithm_utils.edit_distance. Lookups cost a few dict probes plus a short candidate
+list instead of a distance computation against the whole vocabulary (a BK-tree still
+visits a large share of it at distance 2).
+
+Words are split into letter and digit runs first ("ramsharma42" -> "ramsharma", "42"):
+typos are corrected in the letters only, so usernames that differ by a number share
+one entry instead of crowding the same delete lists. The index holds these parts
+only; callers attach their own keys to each (the autocomplete index attaches
+suggestion entries).
+"""
+import re
+from collections import defaultdict
+
+from .algorithm_utils import edit_distance
+
+PREFIX = 7
+MAX_DISTANCE = 2
+PART = re.compile(r'([^\W\d_]+|\d+)')
+
+
+def parts(text):
+    """Letter and digit runs of text, in order: 'sharma_ram42' -> ['sharma', 'ram', '42']."""
+    return PART.findall(text)
+
+
+def pieces(text):
+    """text cut around its parts; odd items are the parts: 'ram_42' -> ['', 'ram', '_', '42', '']."""
+    return PART.split(text)
+
+
+def max_distance(word):
+    """Edits allowed for a query word: none for numbers or up to 3 letters, one up to 7, then two."""
+    if len(word) <= 3 or not word.isalpha():
+        return 0
+    return 1 if len(word) <= 7 else MAX_DISTANCE
+
+
+def _index_distance(word):
+    # Deletes a stored word needs so every query allowed to reach it can (len 4+ -> 1, len 8+ -> 2).
+    if len(word) < 3 or not word.isalpha():
+        return 0
+    return 1 if len(word) < 6 else MAX_DISTANCE
+
+
+def deletes(word, distance):
+    """word[:PREFIX] and every string left after deleting up to distance of its characters."""
+    level = {word[:PREFIX]}
+    found = set(level)
+    for _ in range(distance):
+        level = {variant[:i] + variant[i + 1:] for variant in level for i in range(len(variant))}
+        found |= level
+    return found
+
+
+class FuzzyIndex:
+    """Word -> keys, plus delete string -> words. Not thread-safe: callers hold their own lock."""
+
+    def __init__(self):
+        self.words = {}  # word -> set of caller keys
+        self.deletes = defaultdict(list)  # delete string -> words
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word, key):
+        keys = self.words.get(word)
+        if keys is None:
+            keys = self.words[word] = set()
+            for variant in deletes(word, _index_distance(word)):
+                self.deletes[variant].append(word)
+        keys.add(key)
+
+    def discard(self, word, key):
+        keys = self.words.get(word)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self.words[word]
+            for variant in deletes(word, _index_distance(word)):
+                words = self.deletes[variant]
+                words.remove(word)
+                if not words:
+                    del self.deletes[variant]
+
+    def lookup(self, token, limit=None):
+        """
+        [(word, distance), ...] for indexed words within limit edits of token (default
+        max_distance(token)), closest first, then the most used, then A-Z. An indexed
+        token comes back as itself at distance 0.
+        """
+        limit = max_distance(token) if limit is None else min(limit, MAX_DISTANCE)
+        if not limit:
+            return [(token, 0)] if token in self.words else []
+        found = {}
+        for variant in deletes(token, limit):
+            for word in self.deletes.get(variant, ()):
+                if word not in found and abs(len(word) - len(token)) <= limit:
+                    found[word] = edit_distance(token, word, limit)
+        matches = [(word, distance) for word, distance in found.items() if distance <= limit]
+        matches.sort(key=lambda match: (match[1], -len(self.words[match[0]]), match[0]))
+        return matches
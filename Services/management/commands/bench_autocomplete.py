@@ -0,0 +1,89 @@
+import random
+import statistics
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from Services.autocomplete import AutocompleteIndex, word_starts
+from Services.models import Service
+
+WORDS = [
+    'plumbing', 'pipe', 'leak', 'repair', 'electrical', 'wiring', 'fan', 'deep', 'cleaning', 'sofa',
+    'painting', 'wall', 'interior', 'exterior', 'fridge', 'washing', 'machine', 'ac', 'service', 'door',
+    'lock', 'carpenter', 'tap', 'geyser', 'bathroom', 'kitchen', 'roof', 'waterproofing', 'tile', 'switch',
+]
+SURNAMES = ['sharma', 'shrestha', 'karki', 'thapa', 'gurung', 'rai', 'tamang', 'adhikari', 'poudel', 'khadka']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the autocomplete index (Services.autocomplete) on synthetic data: build time, '
+        'lookup latency under concurrent threads (first pass materializes broad prefixes), and incremental updates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100_000)
+        parser.add_argument('--providers', type=int, default=10_000)
+        parser.add_argument('--lookups', type=int, default=50_000)
+        parser.add_argument('--threads', type=int, default=8)
+
+    def handle(self, *args, **options):
+        rng = random.Random(11)
+        categories = [c for c, _ in Service.CATEGORY_CHOICES]
+        providers = [
+            (i, f'{rng.choice(string.ascii_lowercase)}{rng.choice(SURNAMES)}{i}', rng.choice(SURNAMES).title(),
+             rng.choice(SURNAMES).title(), f'{rng.choice(SURNAMES).title()} {rng.choice(WORDS).title()} Pvt Ltd')
+            for i in range(options['providers'])
+        ]
+        rows = []
+        for i in range(options['services']):
+            pid, username, first, last, company = rng.choice(providers)
+            name = ' '.join(rng.sample(WORDS, 3)).title()
+            rows.append((i, name, rng.choice(categories), pid, username, first, last, company,
+                         int(rng.paretovariate(1.2))))
+
+        t0 = time.perf_counter()
+        index = AutocompleteIndex.from_rows(rows)
+        self.stdout.write(
+            f'build: {len(rows)} services -> {len(index.entries)} suggestions, {len(index.pairs)} terms '
+            f'in {(time.perf_counter() - t0) * 1000:.0f} ms'
+        )
+
+        terms = [term for entry in list(index.entries.values())[:5000] for term in entry.terms]
+        queries = [rng.choice(terms)[:rng.randint(1, 6)] for _ in range(options['lookups'])]
+
+        def run(label):
+            def worker(chunk):
+                samples = []
+                for query in chunk:
+                    t = time.perf_counter()
+                    index.suggest(query)
+                    samples.append((time.perf_counter() - t) * 1e6)
+                return samples
+
+            chunks = [queries[i::options['threads']] for i in range(options['threads'])]
+            with ThreadPoolExecutor(options['threads']) as pool:
+                samples = sorted(s for part in pool.map(worker, chunks) for s in part)
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            self.stdout.write(
+                f'{label:<22} p50 {statistics.median(samples):8.1f} us   p99 {p99:8.1f} us   '
+                f'max {samples[-1]:8.1f} us   ({options["threads"]} threads)'
+            )
+
+        run('lookup, first pass')
+        run('lookup, second pass')
+
+        t0 = time.perf_counter()
+        for i in range(1000):
+            row = rows[rng.randrange(len(rows))]
+            index.upsert((row[0], f'Renamed {row[1]}', *row[2:8]))
+        upsert = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        for i in range(10_000):
+            index.add_bookings(rng.randrange(len(rows)))
+        bookings = (time.perf_counter() - t0) * 1000
+        self.stdout.write(f'incremental: 1000 renames {upsert:.0f} ms, 10000 booking increments {bookings:.0f} ms')
+        assert index.suggest('renamed'), 'renamed services must be findable'
+        assert word_starts('Ram Sharma') == ['ram sharma', 'sharma']
@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from Accounts.models import User
+from Services.models import Service
+
+DEFAULT_PATHS = [
+    '/services/',
+    '/services/providers/',
+    '/services/plumbing/providers/',
+]
+
+MODES = [
+    # (label, Accept-Encoding, revalidate)
+    ('full identity', 'identity', False),
+    ('full gzip', 'gzip', False),
+    ('full br', 'br, gzip', False),
+    ('304 revalidate', 'br, gzip', True),
+]
+
+
+def wire_bytes(response):
+    """Body plus header bytes as sent (status line and framing left out)."""
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    headers = sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+    return len(body) + headers
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure bytes on the wire and latency of the marketplace pages: uncompressed, gzip, '
+        'brotli, and conditional revalidation (If-None-Match) answered with 304.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help='Page to request (repeatable)')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per page and mode')
+        parser.add_argument('--user', help='Username to log in as (default: first superuser)')
+
+    def handle(self, *args, **options):
+        # The test client sends Host: testserver.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.run(options)
+
+    def run(self, options):
+        users = User.objects.filter(username=options['user']) if options['user'] else User.objects.filter(
+            is_superuser=True
+        )
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to log in as; pass --user.')
+        paths = options['paths'] or DEFAULT_PATHS + [
+            f'/services/{service_id}/'
+            for service_id in Service.objects.exclude(provider__company_name='').values_list('id', flat=True)[:1]
+        ]
+
+        client = Client()
+        client.force_login(user)
+        self.stdout.write(f'{options["requests"]} requests per page and mode, {len(paths)} pages')
+        for path in paths:
+            first = client.get(path, HTTP_ACCEPT_ENCODING='identity')
+            if first.status_code != 200:
+                raise CommandError(f'{path} returned {first.status_code}')
+            etag = first.get('ETag')
+            self.stdout.write(f'\n{path}  (ETag: {"yes" if etag else "no"})')
+
+            for label, encoding, revalidate in MODES:
+                if revalidate and not etag:
+                    continue
+                headers = {'HTTP_ACCEPT_ENCODING': encoding}
+                if revalidate:
+                    headers['HTTP_IF_NONE_MATCH'] = etag
+                samples, size = [], 0
+                for _ in range(options['requests']):
+                    t0 = time.perf_counter()
+                    response = client.get(path, **headers)
+                    size = wire_bytes(response)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                expected = 304 if revalidate else 200
+                if response.status_code != expected:
+                    raise CommandError(f'{path} [{label}] returned {response.status_code}, expected {expected}')
+                samples.sort()
+                p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+                self.stdout.write(
+                    f'  {label:<15} {size:>8} B   p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms'
+                )
@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from Services.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        'Per-request latency of a small marketplace query when every request opens its own '
+        'connection (CONN_MAX_AGE=0) versus reusing a persistent or pooled one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--max-age', type=int, default=600, help='CONN_MAX_AGE for the reuse run')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        conn = connections[alias]
+        settings_dict = conn.settings_dict
+        original_age = settings_dict['CONN_MAX_AGE']
+        pooled = 'pool' in settings_dict.get('OPTIONS', {})
+
+        connects = []
+
+        def count_connect(sender, connection, **kwargs):
+            if connection.alias == alias:
+                connects.append(1)
+
+        def simulate(max_age):
+            # Same lifecycle as a request: close_old_connections runs on both signals.
+            settings_dict['CONN_MAX_AGE'] = max_age
+            conn.close()
+            connects.clear()
+            samples = []
+            for _ in range(options['requests']):
+                t0 = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                list(Service.objects.using(alias).select_related('provider')[:20])
+                request_finished.send(sender=self.__class__)
+                samples.append((time.perf_counter() - t0) * 1000)
+            return samples, len(connects)
+
+        if pooled:
+            runs = [('pooled (CONN_MAX_AGE=0)', 0)]
+        else:
+            runs = [('new connection per request', 0), (f"persistent (CONN_MAX_AGE={options['max_age']})", options['max_age'])]
+
+        connection_created.connect(count_connect)
+        try:
+            self.stdout.write(f"{settings_dict['ENGINE']} {alias}, {options['requests']} requests")
+            for label, max_age in runs:
+                samples, opened = simulate(max_age)
+                samples.sort()
+                p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+                self.stdout.write(
+                    f'{label:<32} p50 {statistics.median(samples):7.3f} ms   '
+                    f'p99 {p99:7.3f} ms   connections opened {opened}'
+                )
+        finally:
+            connection_created.disconnect(count_connect)
+            settings_dict['CONN_MAX_AGE'] = original_age
+            conn.close()
@@ -0,0 +1,102 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from Services.algorithm_utils import edit_distance
+from Services.autocomplete import AutocompleteIndex
+from Services.fuzzy import FuzzyIndex, max_distance, parts
+from Services.models import Service
+
+from .bench_autocomplete import SURNAMES, WORDS
+
+FIRST_NAMES = ['ram', 'sita', 'hari', 'gita', 'krishna', 'bikash', 'sunita', 'anil', 'manish', 'puja', 'suresh', 'nabin']
+TRADES = ['plumber', 'electrician', 'painter', 'carpenter', 'cleaner', 'technician']
+
+
+def typo(rng, word):
+    """word with one random insert, delete, substitution or swap."""
+    i = rng.randrange(len(word))
+    letter = rng.choice(string.ascii_lowercase)
+    edit = rng.randrange(4)
+    if edit == 0:
+        return word[:i] + letter + word[i:]
+    if edit == 1 and len(word) > 4:
+        return word[:i] + word[i + 1:]
+    if edit == 2 or i == len(word) - 1:
+        return word[:i] + letter + word[i + 1:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark typo-tolerant search (Services.fuzzy through the autocomplete index) on synthetic '
+        'providers: index size, lookup latency for misspelt words, and recall against a brute-force scan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--providers', type=int, default=100_000)
+        parser.add_argument('--services', type=int, default=200_000)
+        parser.add_argument('--lookups', type=int, default=2_000)
+        parser.add_argument('--checks', type=int, default=50)
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        categories = [c for c, _ in Service.CATEGORY_CHOICES]
+        providers = []
+        for i in range(options['providers']):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+            username = rng.choice([f'{first}{last}{i}', f'{first[0]}{last}{i}', f'{last}_{first}{i}'])
+            providers.append((i, username, first.title(), last.title(),
+                              f'{last.title()} {rng.choice(TRADES).title()} Services'))
+        rows = []
+        for i in range(options['services']):
+            pid, username, first, last, company = rng.choice(providers)
+            rows.append((i, ' '.join(rng.sample(WORDS, 2)).title(), rng.choice(categories), pid, username,
+                         first, last, company, 0))
+
+        index = AutocompleteIndex.from_rows(rows)
+        t0 = time.perf_counter()
+        fuzzy = FuzzyIndex()
+        for key, entry in index.entries.items():
+            for term in entry.terms:
+                for part in parts(term.split(' ', 1)[0]):
+                    fuzzy.add(part, key)
+        postings = sum(len(words) for words in fuzzy.deletes.values())
+        self.stdout.write(
+            f'build: {len(fuzzy)} word parts, {len(fuzzy.deletes)} delete keys, {postings} postings '
+            f'in {(time.perf_counter() - t0) * 1000:.0f} ms (fuzzy part of the autocomplete index)'
+        )
+
+        vocabulary = [word for word in index.fuzzy.words if word.isalpha()]
+        queries = [typo(rng, rng.choice(vocabulary)) for _ in range(options['lookups'])]
+        queries = [q for q in queries if max_distance(q)]
+        self.stdout.write(f'{len(queries)} misspelt word lookups')
+        for label, call in [
+            ('word lookup', index.fuzzy.lookup),
+            ('search_terms', index.search_terms),
+            ('suggest, 1st pass', index.suggest),
+            ('suggest, 2nd pass', index.suggest),
+        ]:
+            samples = []
+            for query in queries:
+                t = time.perf_counter()
+                call(query)
+                samples.append((time.perf_counter() - t) * 1000)
+            samples.sort()
+            self.stdout.write(
+                f'{label:<18} p50 {statistics.median(samples):6.3f} ms   '
+                f'p99 {samples[int(len(samples) * 0.99) - 1]:6.3f} ms   max {samples[-1]:6.3f} ms'
+            )
+
+        missed = 0
+        for query in queries[:options['checks']]:
+            limit = max_distance(query)
+            expected = {word for word in vocabulary if edit_distance(query, word, limit) <= limit}
+            missed += len(expected - {word for word, _ in index.fuzzy.lookup(query)})
+        self.stdout.write(f'recall vs brute force on {options["checks"]} queries: {missed} words missed')
+
+        for query in ('plumbr', 'sharma electrican', 'shresta'):
+            self.stdout.write(f'{query!r}: {index.search_terms(query)}  {[r["text"] for r in index.suggest(query, 3)]}')
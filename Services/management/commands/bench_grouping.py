@@ -0,0 +1,103 @@
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from Services.algorithm_utils import build_category_tree, company_label, group_provider_items_by_company
+from Services.models import Service
+from Services.rows import ProviderRow, ServiceRow, StoredFile
+
+
+def legacy_category_tree(services):
+    """The former service_list grouping: nested dicts on unordered rows, then .lower() sorts."""
+    categories_dict = {}
+    for service in services:
+        provider = service.provider
+        company = (provider.company_name or '').strip() or '—'
+        companies = categories_dict.setdefault(service.category, {})
+        providers = companies.setdefault(company, {})
+        if provider.id not in providers:
+            providers[provider.id] = {'provider': provider, 'services': []}
+        providers[provider.id]['services'].append(service)
+    return {
+        category: [
+            {'company_name': name, 'providers': list(companies[name].values())}
+            for name in sorted(companies, key=lambda x: x.lower())
+        ]
+        for category, companies in categories_dict.items()
+    }
+
+
+def legacy_group_by_company(provider_list):
+    """The former group_provider_items_by_company: bucket, then sort companies and usernames."""
+    by_company = defaultdict(list)
+    for item in provider_list:
+        by_company[(item['provider'].company_name or '').strip() or '—'].append(item)
+    return [
+        {'company_name': name, 'providers': sorted(items, key=lambda x: x['provider'].username.lower())}
+        for name, items in sorted(by_company.items(), key=lambda x: x[0].lower())
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the one-pass grouping (Services.algorithm_utils.group_sorted) against the '
+        'former dict-and-sort grouping on synthetic in-memory rows. The new path gets rows '
+        'in database order; the ORDER BY itself runs in the database and is not timed here.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100_000)
+        parser.add_argument('--providers', type=int, default=5_000)
+        parser.add_argument('--companies', type=int, default=800)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        categories = [c for c, _ in Service.CATEGORY_CHOICES]
+        providers = [
+            ProviderRow(i, f'user{i:05d}', '', '', f'Company {rng.randrange(options["companies"])}', '',
+                        StoredFile(''), {})
+            for i in range(options['providers'])
+        ]
+        services = [
+            ServiceRow(i, f'Service {i}', rng.choice(categories), 1000, True, p.id, p)
+            for i, p in ((i, rng.choice(providers)) for i in range(options['services']))
+        ]
+        # What the database returns for category_tree_ordering() / company_ordering().
+        services_ordered = sorted(services, key=lambda s: (
+            s.category, company_label(s.provider.company_name).lower(), s.provider.username.lower(),
+            s.provider_id, s.id,
+        ))
+        items = [{'provider': p} for p in providers]
+        rng.shuffle(items)
+        items_ordered = sorted(items, key=lambda i: (
+            company_label(i['provider'].company_name).lower(), i['provider'].username.lower(),
+        ))
+
+        def best(func, data):
+            times = []
+            for _ in range(options['repeat']):
+                t0 = time.perf_counter()
+                func(data)
+                times.append(time.perf_counter() - t0)
+            return min(times) * 1000
+
+        self.stdout.write(
+            f'{len(services)} services, {len(providers)} providers, best of {options["repeat"]}'
+        )
+        old = best(legacy_category_tree, services)
+        new = best(build_category_tree, services_ordered)
+        self.stdout.write(f'category tree     legacy {old:8.1f} ms   one-pass {new:8.1f} ms   ({old / new:.1f}x)')
+        old = best(legacy_group_by_company, items)
+        new = best(group_provider_items_by_company, items_ordered)
+        self.stdout.write(f'company groups    legacy {old:8.1f} ms   one-pass {new:8.1f} ms   ({old / new:.1f}x)')
+
+        # Same structure either way (legacy providers in first-seen order, so compare as sets).
+        legacy = legacy_category_tree(services_ordered)
+        tree = build_category_tree(services_ordered)
+        same = all(
+            [c['company_name'] for c in legacy[k]] == [c['company_name'] for c in tree[k]] for k in legacy
+        ) and legacy.keys() == tree.keys()
+        self.stdout.write(f'structure matches legacy: {same}')
@@ -0,0 +1,99 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+
+from Accounts.models import User
+
+DEFAULT_PATHS = [
+    '/services/',
+    '/services/providers/',
+    '/services/plumbing/providers/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the marketplace pages through the ASGI handler (async views on the event '
+        'loop) and the WSGI handler (one thread per in-flight request), in process.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append', dest='paths', help='Page to request (repeatable)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--user', help='Username to log in as (default: first superuser)')
+
+    def handle(self, *args, **options):
+        # The test clients send Host: testserver.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.run(options)
+
+    def run(self, options):
+        paths = options['paths'] or DEFAULT_PATHS
+        users = User.objects.filter(username=options['user']) if options['user'] else User.objects.filter(
+            is_superuser=True
+        )
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to log in as; pass --user.')
+
+        total = options['requests']
+        concurrency = options['concurrency']
+        targets = [paths[i % len(paths)] for i in range(total)]
+
+        # WSGI: a pool of threads, each with its own client and login session.
+        def wsgi_worker(worker_paths):
+            client = Client()
+            client.force_login(user)
+            samples = []
+            for path in worker_paths:
+                t0 = time.perf_counter()
+                response = client.get(path)
+                samples.append(time.perf_counter() - t0)
+                if response.status_code != 200:
+                    raise CommandError(f'WSGI {path} returned {response.status_code}')
+            return samples
+
+        chunks = [targets[i::concurrency] for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            wsgi_samples = [s for samples in pool.map(wsgi_worker, chunks) for s in samples]
+        wsgi_elapsed = time.perf_counter() - start
+
+        # ASGI: one event loop, `concurrency` requests in flight at a time.
+        async def asgi_run():
+            client = AsyncClient()
+            await client.aforce_login(user)
+            gate = asyncio.Semaphore(concurrency)
+            samples = []
+
+            async def one(path):
+                async with gate:
+                    t0 = time.perf_counter()
+                    response = await client.get(path)
+                    samples.append(time.perf_counter() - t0)
+                    if response.status_code != 200:
+                        raise CommandError(f'ASGI {path} returned {response.status_code}')
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(path) for path in targets))
+            return samples, time.perf_counter() - started
+
+        asgi_samples, asgi_elapsed = asyncio.run(asgi_run())
+
+        def summary(label, samples, elapsed):
+            samples = sorted(s * 1000 for s in samples)
+            p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+            self.stdout.write(
+                f'{label:<5} {len(samples) / elapsed:8.1f} req/s   '
+                f'p50 {statistics.median(samples):8.1f} ms   p99 {p99:8.1f} ms'
+            )
+
+        self.stdout.write(f'{total} requests, concurrency {concurrency}, paths: {", ".join(paths)}')
+        summary('WSGI', wsgi_samples, wsgi_elapsed)
+        summary('ASGI', asgi_samples, asgi_elapsed)
@@ -0,0 +1,73 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from Accounts.models import User
+from HomeService.benchmarks import scratch_database, timed
+from Services.algorithm_utils import QuantileSketch
+from Services.models import Service
+from Services.pricing import PERCENTILES, build_price_sketches, price_bands, service_price_changed
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark per-category price bands (Services.pricing): percentiles from the stored sketch columns '
+        'versus sorting the category per request, the cost of one price edit, and the sketch error. '
+        'Seeds synthetic services into a scratch test database that is destroyed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100_000)
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--edits', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.seed(options['services'])
+            self.run(options['reads'], options['edits'])
+
+    def seed(self, n_services):
+        rng = random.Random(11)
+        password = User().password or '!'
+        providers = User.objects.bulk_create([
+            User(username=f'bench-price-{i}', password=password, is_provider=True, company_name=f'Bench Co {i}')
+            for i in range(max(n_services // 20, 1))
+        ], batch_size=1000)
+        categories = [c for c, _ in Service.CATEGORY_CHOICES]
+        self.services = Service.objects.bulk_create([
+            Service(name=f'Service {i}', category=categories[i % len(categories)],
+                    price=max(int(rng.lognormvariate(7, 0.6)), 50), provider=rng.choice(providers))
+            for i in range(n_services)
+        ], batch_size=1000)
+        t0 = time.perf_counter()
+        build_price_sketches()
+        self.stdout.write(f'seeded {n_services} services; build_price_sketches {(time.perf_counter() - t0) * 1000:.0f} ms')
+
+    @staticmethod
+    def sorted_percentiles(category):
+        """What a page would do without the sketches: sort the category's prices."""
+        prices = sorted(Service.objects.filter(category=category).values_list('price', flat=True))
+        return {name: prices[int(q * (len(prices) - 1))] for name, q in PERCENTILES.items()}
+
+    def run(self, reads, edits):
+        timed(self.stdout, 'bands for every category, stored', price_bands, reads)
+        timed(self.stdout, 'bands for one category, sorted', lambda: self.sorted_percentiles('Plumbing'),
+              max(reads // 20, 3))
+
+        rng = random.Random(12)
+        changes = []
+        for service in rng.sample(self.services, edits):
+            new_price = max(int(service.price * rng.uniform(0.8, 1.25)), 50)
+            changes.append(((service.category, service.price), (service.category, new_price)))
+        edit = iter(changes)
+        timed(self.stdout, 'one price edit (remove + add)', lambda: service_price_changed(*next(edit)), edits)
+
+        sketch = QuantileSketch()
+        prices = sorted(Service.objects.filter(category='Plumbing').values_list('price', flat=True))
+        sketch.extend(prices)
+        worst = max(
+            abs(sketch.quantile(q) - prices[int(q * (len(prices) - 1))]) / prices[int(q * (len(prices) - 1))]
+            for q in PERCENTILES.values()
+        )
+        self.stdout.write(f'worst relative error of a stored percentile: {worst:.2%}')
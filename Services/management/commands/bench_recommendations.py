@@ -0,0 +1,67 @@
+import time
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Services.recommendations import np, similar_services
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the "customers also booked" similarity step (Services.recommendations) on synthetic '
+        'booking pairs, and check its top neighbours against a pure-Python pair count on a sample.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=200_000)
+        parser.add_argument('--services', type=int, default=20_000)
+        parser.add_argument('--bookings', type=int, default=1_000_000)
+        parser.add_argument('--checks', type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('numpy and scipy are required.')
+        rng = np.random.default_rng(3)
+        # Skewed popularity, like real catalogues: a few services take most bookings.
+        customers = rng.integers(1, options['customers'] + 1, options['bookings'])
+        services = np.minimum(rng.zipf(1.3, options['bookings']), options['services'])
+
+        t0 = time.perf_counter()
+        found = similar_services(customers, services)
+        self.stdout.write(
+            f'{options["bookings"]} bookings -> {len(found[0])} recommendations for '
+            f'{len(np.unique(found[0]))} services in {(time.perf_counter() - t0) * 1000:.0f} ms'
+        )
+
+        small_c, small_s = customers[:options['checks']], services[:options['checks']]
+        t0 = time.perf_counter()
+        expected = self.brute_force(small_c.tolist(), small_s.tolist())
+        slow = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        service, neighbour, *_ = similar_services(small_c, small_s)
+        fast = (time.perf_counter() - t0) * 1000
+        got = defaultdict(list)
+        for s, n in zip(service.tolist(), neighbour.tolist()):
+            got[s].append(n)
+        wrong = sum(1 for s, top in expected.items() if got[s] != top)
+        self.stdout.write(
+            f'{options["checks"]} bookings: sparse {fast:.0f} ms, pair loop {slow:.0f} ms, '
+            f'{wrong} of {len(expected)} services with different neighbours'
+        )
+
+    @staticmethod
+    def brute_force(customers, services, top_n=10):
+        booked = defaultdict(set)
+        for customer, service in zip(customers, services):
+            booked[customer].add(service)
+        per_service = Counter(service for items in booked.values() for service in items)
+        together = Counter()
+        for items in booked.values():
+            for a, b in combinations(sorted(items), 2):
+                together[a, b] += 1
+                together[b, a] += 1
+        ranked = defaultdict(list)
+        for (a, b), shared in together.items():
+            ranked[a].append((-shared / (per_service[a] * per_service[b]) ** 0.5, -shared, b))
+        return {a: [b for *_, b in sorted(rows)[:top_n]] for a, rows in ranked.items()}
@@ -0,0 +1,80 @@
+import datetime
+import gc
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Accounts.models import User
+from Bookings.models import Booking
+from Services.models import Service
+from Services.rows import booking_rows, service_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare model instances with slotted row projections (Services.rows) for the service '
+        'and booking listings: tracemalloc peak and retained memory, and build time. Seeds '
+        'synthetic rows inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=20000)
+        parser.add_argument('--services-per-provider', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['services'], options['services_per_provider'])
+            self.compare('services', lambda: list(Service.objects.select_related('provider')),
+                         lambda: service_rows(Service.objects.all()))
+            self.compare('bookings', lambda: list(Booking.objects.select_related('customer', 'service')),
+                         lambda: booking_rows(Booking.objects.all()))
+            transaction.set_rollback(True)
+
+    def seed(self, n_services, per_provider):
+        n_providers = max(n_services // per_provider, 1)
+        password = User().password or '!'
+        users = User.objects.bulk_create([
+            User(
+                username=f'bench-provider-{i}', password=password, is_provider=True,
+                company_name=f'Bench Co {i % 50}', address='Kathmandu ' * 10, phone_number='9800000000',
+            )
+            for i in range(n_providers)
+        ] + [User(username='bench-customer', password=password, is_customer=True)], batch_size=1000)
+        providers, customer = users[:-1], users[-1]
+        categories = [c for c, _ in Service.CATEGORY_CHOICES]
+        services = Service.objects.bulk_create([
+            Service(name=f'Service {i}', category=categories[i % len(categories)], price=500 + i % 900,
+                    provider=providers[i % n_providers])
+            for i in range(n_services)
+        ], batch_size=1000)
+        today = datetime.date.today()
+        Booking.objects.bulk_create([
+            Booking(customer=customer, service=service, date=today, time=datetime.time(9 + i % 8),
+                    address='Kathmandu', phone_number='9800000000')
+            for i, service in enumerate(services)
+        ], batch_size=1000)
+        self.stdout.write(f'seeded {n_services} services, {n_providers} providers, {n_services} bookings')
+
+    def measure(self, build):
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        result = build()
+        elapsed = time.perf_counter() - t0
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        return retained, peak, elapsed
+
+    def compare(self, label, models, rows):
+        results = {'models': self.measure(models), 'rows': self.measure(rows)}
+        self.stdout.write(f'\n{label}')
+        for kind, (retained, peak, elapsed) in results.items():
+            self.stdout.write(
+                f'  {kind:<7} retained {retained / 2**20:7.1f} MiB   peak {peak / 2**20:7.1f} MiB   '
+                f'build {elapsed * 1000:8.1f} ms (traced)'
+            )
+        (m_ret, _, m_time), (r_ret, _, r_time) = results['models'], results['rows']
+        self.stdout.write(f'  rows use {r_ret / m_ret:.0%} of the memory and {r_time / m_time:.0%} of the time')
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from HomeService.databases import sqlite_pragmas
+
+SCHEMA = 'CREATE TABLE booking (id INTEGER PRIMARY KEY, provider INTEGER, slot INTEGER, created REAL)'
+
+
+class Command(BaseCommand):
+    help = (
+        'N writer threads doing book_service-style transactions (conflict check, then insert) '
+        'against a scratch SQLite file, with stock settings and with the tuned profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--transactions', type=int, default=200, help='Per writer')
+        parser.add_argument('--stock-timeout', type=float, default=5.0, help="Python sqlite3's default")
+
+    def run_profile(self, path, writers, per_writer, tuned, timeout):
+        setup = sqlite3.connect(path)
+        if tuned:
+            setup.execute('PRAGMA journal_mode=WAL')  # what sqlite_maintenance --enable-wal does once
+        setup.execute(SCHEMA)
+        setup.execute('CREATE INDEX booking_slot ON booking (provider, slot)')
+        setup.commit()
+        setup.close()
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def writer(worker):
+            conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+            if tuned:
+                for statement in sqlite_pragmas(os.environ):
+                    conn.execute(statement)
+            begin = 'BEGIN IMMEDIATE' if tuned else 'BEGIN'
+            local, failed = [], 0
+            for i in range(per_writer):
+                provider, slot = worker, i
+                t0 = time.perf_counter()
+                try:
+                    conn.execute(begin)
+                    taken = conn.execute(
+                        'SELECT COUNT(*) FROM booking WHERE provider = ? AND slot = ?', (provider, slot)
+                    ).fetchone()[0]
+                    if not taken:
+                        conn.execute(
+                            'INSERT INTO booking (provider, slot, created) VALUES (?, ?, ?)',
+                            (provider, slot, time.time()),
+                        )
+                    conn.execute('COMMIT')
+                    local.append(time.perf_counter() - t0)
+                except sqlite3.OperationalError:
+                    failed += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                latencies.extend(local)
+                errors.append(failed)
+
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return latencies, sum(errors), time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        writers, per_writer = options['writers'], options['transactions']
+        self.stdout.write(f'{writers} writers x {per_writer} transactions')
+        for label, tuned, timeout in (
+            ('stock (rollback journal, BEGIN)', False, options['stock_timeout']),
+            ('tuned (WAL, BEGIN IMMEDIATE)', True, 20.0),
+        ):
+            with tempfile.TemporaryDirectory() as tmp:
+                latencies, failed, elapsed = self.run_profile(
+                    os.path.join(tmp, 'bench.sqlite3'), writers, per_writer, tuned, timeout
+                )
+            latencies = sorted(s * 1000 for s in latencies) or [0.0]
+            p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+            self.stdout.write(
+                f'{label:<32} {len(latencies) / elapsed:8.0f} tx/s   p50 {statistics.median(latencies):7.2f} ms   '
+                f'p99 {p99:7.2f} ms   locked errors {failed}'
+            )
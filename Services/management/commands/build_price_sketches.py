@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from Services.pricing import build_price_sketches
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the per-category price sketches (listed prices and booked amounts) from the database. '
+        'Writes keep them current; run this after imports or to drop deleted bookings.'
+    )
+
+    def handle(self, *args, **options):
+        counts = build_price_sketches()
+        self.stdout.write(self.style.SUCCESS(
+            f'Sketched {counts["listed"]} listed price(s) and {counts["booked"]} booked amount(s).'
+        ))
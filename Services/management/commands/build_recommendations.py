@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Services import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "customers also booked" neighbours for every service from all bookings (needs numpy and scipy).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=recommendations.TOP_N, help='Neighbours kept per service.')
+        parser.add_argument(
+            '--min-customers',
+            type=int,
+            default=1,
+            help='Ignore pairs of services booked together by fewer customers than this.',
+        )
+
+    def handle(self, *args, **options):
+        if recommendations.np is None:
+            raise CommandError('numpy and scipy are required: pip install numpy scipy')
+        stored = recommendations.build_recommendations(top_n=options['top'], min_customers=options['min_customers'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {stored} recommendation(s).'))
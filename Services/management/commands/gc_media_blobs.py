@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from HomeService.storage import BLOB_DIR
+
+
+def _strings(value):
+    """Every string inside a JSON value (file names kept in JSON fields, e.g. thumbnails)."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _strings(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from _strings(v)
+
+
+def referenced_names():
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                names.update(
+                    model._default_manager.exclude(**{field.name: ''})
+                    .exclude(**{f'{field.name}__isnull': True})
+                    .values_list(field.name, flat=True)
+                    .iterator()
+                )
+            elif isinstance(field, models.JSONField):
+                for value in model._default_manager.values_list(field.name, flat=True).iterator():
+                    names.update(n for n in _strings(value) if n.startswith(f'{BLOB_DIR}/'))
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media blobs that no FileField (or JSON file reference) points to.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep unreferenced blobs younger than this (uploads not yet saved)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        root = os.path.join(default_storage.location, BLOB_DIR)
+        if not os.path.isdir(root):
+            self.stdout.write('No blobs yet.')
+            return
+
+        referenced = referenced_names()
+        cutoff = time.time() - options['grace_hours'] * 3600
+        kept = removed = freed = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, default_storage.location).replace(os.sep, '/')
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    kept += 1
+                    continue
+                size = os.path.getsize(path)
+                if not options['dry_run']:
+                    os.unlink(path)
+                removed += 1
+                freed += size
+
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(f'{verb} {removed} blobs ({freed / 1024 / 1024:.1f} MB), kept {kept}')
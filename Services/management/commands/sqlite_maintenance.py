@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Routine SQLite upkeep: PRAGMA optimize / ANALYZE, incremental vacuum of free pages '
+        'and a WAL checkpoint. --enable-wal switches the file to journal_mode=WAL (it stays '
+        'set for every later connection). --enable-incremental-vacuum switches an existing file to '
+        'auto_vacuum=INCREMENTAL (one full VACUUM, needs exclusive access).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--analyze', action='store_true', help='Full ANALYZE instead of PRAGMA optimize')
+        parser.add_argument('--vacuum-pages', type=int, default=0, help='Free pages to release (0 = all)')
+        parser.add_argument('--enable-wal', action='store_true')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true')
+
+    def pragma(self, cursor, statement):
+        cursor.execute(f'PRAGMA {statement}')
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def handle(self, *args, **options):
+        conn = connections[options['database']]
+        if conn.vendor != 'sqlite':
+            raise CommandError(f"Database {options['database']!r} is {conn.vendor}, not SQLite.")
+
+        with conn.cursor() as cursor:
+            page_size = self.pragma(cursor, 'page_size')
+            before = self.pragma(cursor, 'freelist_count')
+
+            if options['enable_wal']:
+                mode = self.pragma(cursor, 'journal_mode=WAL')
+                self.stdout.write(f'journal_mode is {mode}')
+
+            if options['enable_incremental_vacuum']:
+                cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                cursor.execute('VACUUM')
+                self.stdout.write('auto_vacuum set to INCREMENTAL (full VACUUM done)')
+
+            if options['analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write('ANALYZE done')
+            else:
+                # Only re-analyzes tables whose statistics have drifted.
+                cursor.execute('PRAGMA optimize')
+                self.stdout.write('PRAGMA optimize done')
+
+            if self.pragma(cursor, 'auto_vacuum') == 2:
+                pages = options['vacuum_pages']
+                cursor.execute(f'PRAGMA incremental_vacuum({pages})' if pages else 'PRAGMA incremental_vacuum')
+                cursor.fetchall()
+            elif before:
+                self.stdout.write(
+                    f'{before} free pages kept: auto_vacuum is not INCREMENTAL '
+                    '(run once with --enable-incremental-vacuum)'
+                )
+            after = self.pragma(cursor, 'freelist_count')
+
+            if self.pragma(cursor, 'journal_mode') == 'wal':
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, log_pages, checkpointed = cursor.fetchone()
+                self.stdout.write(f'WAL checkpoint: {checkpointed}/{log_pages} pages' + (' (busy)' if busy else ''))
+
+            total = self.pragma(cursor, 'page_count')
+
+        self.stdout.write(
+            f'{total} pages ({total * page_size / 1024 / 1024:.1f} MB), '
+            f'free pages {before} -> {after}'
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 16:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Services', '0006_delete_reviewrating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(help_text='0 = most similar')),
+                ('score', models.FloatField(help_text="Cosine similarity of the two services' customer sets")),
+                ('customers', models.PositiveIntegerField(help_text='Customers who booked both')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Services.service')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='Services.service')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('service', 'rank'), name='unique_service_recommendation_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-19 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Services', '0007_servicerecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryPriceSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('listed', 'Listed prices'), ('booked', 'Booked amounts')], max_length=10)),
+                ('category', models.CharField(choices=[('Plumbing', 'Plumbing'), ('Electrical', 'Electrical'), ('Cleaning', 'Cleaning'), ('Painting', 'Painting'), ('Appliance Repair', 'Appliance Repair'), ('Handyman', 'Handyman')], max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('p10', models.FloatField(blank=True, null=True)),
+                ('p25', models.FloatField(blank=True, null=True)),
+                ('p50', models.FloatField(blank=True, null=True)),
+                ('p75', models.FloatField(blank=True, null=True)),
+                ('p90', models.FloatField(blank=True, null=True)),
+                ('sketch', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'category'), name='unique_category_price_sketch')],
+            },
+        ),
+    ]
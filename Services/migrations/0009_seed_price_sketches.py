@@ -0,0 +1,45 @@
+from django.db import migrations
+
+from Services.algorithm_utils import QuantileSketch
+
+PERCENTILES = {'p10': 0.1, 'p25': 0.25, 'p50': 0.5, 'p75': 0.75, 'p90': 0.9}
+
+
+def seed_price_sketches(apps, schema_editor):
+    """
+    Fill the sketches from the existing rows, as build_price_sketches does, so later
+    removals (a service edit drops its old price) only take out prices that were added.
+    """
+    CategoryPriceSketch = apps.get_model('Services', 'CategoryPriceSketch')
+    Service = apps.get_model('Services', 'Service')
+    Booking = apps.get_model('Bookings', 'Booking')
+    if CategoryPriceSketch.objects.exists():
+        return
+    sources = {
+        'listed': Service.objects.values_list('category', 'price'),
+        'booked': Booking.objects.values_list('service__category', 'service__price'),
+    }
+    rows = []
+    for kind, prices in sources.items():
+        sketches = {}
+        for category, price in prices.order_by().iterator(chunk_size=2000):
+            sketches.setdefault(category, QuantileSketch()).add(price)
+        for category, sketch in sketches.items():
+            values = {name: sketch.quantile(q) for name, q in PERCENTILES.items()}
+            rows.append(CategoryPriceSketch(
+                kind=kind, category=category, count=sketch.count, sketch=sketch.to_dict(),
+                **{name: round(value, 2) if value is not None else None for name, value in values.items()},
+            ))
+    CategoryPriceSketch.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Services', '0008_categorypricesketch'),
+        ('Bookings', '0019_demandforecast'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_price_sketches, migrations.RunPython.noop),
+    ]
@@ -21,3 +21,70 @@ class Service(models.Model):
     def __str__(self):
         return self.name
 
+
+
+class ServiceRecommendation(models.Model):
+    """"Customers also booked": a service's nearest neighbours, rebuilt by `build_recommendations`."""
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField(help_text="0 = most similar")
+    score = models.FloatField(help_text="Cosine similarity of the two services' customer sets")
+    customers = models.PositiveIntegerField(help_text="Customers who booked both")
+
+    class Meta:
+        constraints = [
+            # Also the lookup index: a service's list is one range read in rank order.
+            models.UniqueConstraint(fields=['service', 'rank'], name='unique_service_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.service} -> {self.recommended} ({self.score:.2f})'
+
+
+class CategoryPriceSketch(models.Model):
+    """Price distribution of one category (listed prices or booked amounts), kept by Services.pricing."""
+    KIND_CHOICES = [
+        ('listed', 'Listed prices'),
+        ('booked', 'Booked amounts'),
+    ]
+    MIN_COUNT = 5  # fewer prices than this are not shown as a band
+    ERROR = 0.02  # relative error of the sketch (and so of the stored percentiles)
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    category = models.CharField(max_length=50, choices=Service.CATEGORY_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    p10 = models.FloatField(blank=True, null=True)
+    p25 = models.FloatField(blank=True, null=True)
+    p50 = models.FloatField(blank=True, null=True)
+    p75 = models.FloatField(blank=True, null=True)
+    p90 = models.FloatField(blank=True, null=True)
+    sketch = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'category'], name='unique_category_price_sketch'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} in {self.category} (n={self.count})'
+
+    @property
+    def has_band(self):
+        return self.count >= self.MIN_COUNT and self.p50 is not None
+
+    def percentile(self, price):
+        """Approximate percentile (0-100) of price, interpolated between the stored columns."""
+        points = [(self.p10, 10), (self.p25, 25), (self.p50, 50), (self.p75, 75), (self.p90, 90)]
+        if price <= points[0][0]:
+            return 10 * price / points[0][0] if points[0][0] else 0
+        for (low, low_pct), (high, high_pct) in zip(points, points[1:]):
+            if price <= high:
+                return low_pct + (high_pct - low_pct) * (price - low) / (high - low) if high > low else high_pct
+        return 100 - 10 * points[-1][0] / price
+
+    def position(self, price):
+        """'low', 'typical' or 'high': below p25, within p25-p75, above p75 (give or take ERROR)."""
+        if price < self.p25 * (1 - self.ERROR):
+            return 'low'
+        return 'high' if price > self.p75 * (1 + self.ERROR) else 'typical'
@@ -0,0 +1,113 @@
+"""
+Price bands : per-category quantile sketches of listed prices and booked amounts.
+
+Each (kind, category) keeps a QuantileSketch (algorithm_utils) of its prices in a
+CategoryPriceSketch row, next to the p10/p25/p50/p75/p90 it implies. Writes fold
+single prices in or out of the sketch (a service edit removes the old price and
+adds the new one), so no write re-reads the category. Pages read the stored
+percentiles: at most two rows per category and no sorting, and a price's position
+in its band is a few comparisons.
+
+    listed   Service.price of every service: Services.signals on save / delete,
+             record_prices from bulk_create callers
+    booked   the service's price when a booking is made (Booking keeps no amount
+             of its own), appended by the record_booked_prices task (Services.tasks)
+             after creation; deleted bookings stay counted
+
+`build_price_sketches` recomputes both from the database (booked amounts then use
+today's prices); migration 0009 seeded them the same way, so a removal only ever
+takes out a price that was added before. The 'prices' version scope is bumped only when a stored
+percentile moves, which most single writes do not.
+"""
+from django.db import transaction
+
+from Bookings.models import Booking
+from .algorithm_utils import QuantileSketch
+from .models import CategoryPriceSketch, Service
+from .versions import bump
+
+PERCENTILES = {'p10': 0.1, 'p25': 0.25, 'p50': 0.5, 'p75': 0.75, 'p90': 0.9}
+BATCH_SIZE = 2000
+
+
+def _apply(row, sketch):
+    """Store sketch and its percentiles on row; True when a percentile changed."""
+    before = [getattr(row, name) for name in PERCENTILES]
+    row.sketch = sketch.to_dict()
+    row.count = sketch.count
+    for name, q in PERCENTILES.items():
+        value = sketch.quantile(q)
+        setattr(row, name, round(value, 2) if value is not None else None)
+    return before != [getattr(row, name) for name in PERCENTILES]
+
+
+def record_prices(kind, changes):
+    """
+    Fold (category, price, weight) changes into the kind's sketches: weight 1 adds a
+    price, -1 removes one. Locks the touched rows, so concurrent writers serialise per category.
+    """
+    changes = [(category, price, weight) for category, price, weight in changes if weight and price is not None]
+    if not changes:
+        return
+    categories = {category for category, _, _ in changes}
+    moved = False
+    with transaction.atomic():
+        locked = CategoryPriceSketch.objects.select_for_update().filter(kind=kind)
+        rows = {row.category: row for row in locked.filter(category__in=categories)}
+        missing = categories - rows.keys()
+        if missing:
+            CategoryPriceSketch.objects.bulk_create(
+                [CategoryPriceSketch(kind=kind, category=category) for category in missing], ignore_conflicts=True,
+            )
+            rows.update((row.category, row) for row in locked.filter(category__in=missing))
+        sketches = {category: QuantileSketch.from_dict(row.sketch) for category, row in rows.items()}
+        for category, price, weight in changes:
+            if weight > 0:
+                sketches[category].add(price, weight)
+            else:
+                sketches[category].discard(price, -weight)
+        # Usually one row: plain saves beat bulk_update's CASE expressions.
+        for category, row in rows.items():
+            moved |= _apply(row, sketches[category])
+            row.save(update_fields=['sketch', 'count', *PERCENTILES, 'updated_at'])
+    if moved:
+        bump('prices')
+
+
+def service_price_changed(before, after):
+    """before / after are (category, price) of one service, None when it did not / no longer exists."""
+    if before != after:
+        record_prices('listed', [(*pair, weight) for pair, weight in ((before, -1), (after, 1)) if pair])
+
+
+def build_price_sketches():
+    """Recompute every sketch from services and bookings. Returns {kind: number of prices}."""
+    sources = {
+        'listed': Service.objects.values_list('category', 'price'),
+        'booked': Booking.objects.values_list('service__category', 'service__price'),
+    }
+    counts = {}
+    with transaction.atomic():
+        CategoryPriceSketch.objects.all().delete()
+        rows = []
+        for kind, prices in sources.items():
+            sketches = {category: QuantileSketch() for category, _ in Service.CATEGORY_CHOICES}
+            for category, price in prices.order_by().iterator(chunk_size=BATCH_SIZE):
+                sketches.setdefault(category, QuantileSketch()).add(price)
+            for category, sketch in sketches.items():
+                row = CategoryPriceSketch(kind=kind, category=category)
+                _apply(row, sketch)
+                rows.append(row)
+            counts[kind] = sum(sketch.count for sketch in sketches.values())
+        CategoryPriceSketch.objects.bulk_create(rows)
+    bump('prices')
+    return counts
+
+
+def price_bands():
+    """{category: {kind: CategoryPriceSketch}} for categories with enough prices to show a band."""
+    bands = {}
+    for row in CategoryPriceSketch.objects.defer('sketch'):
+        if row.has_band:
+            bands.setdefault(row.category, {})[row.kind] = row
+    return bands
@@ -0,0 +1,108 @@
+"""
+"Customers also booked" : item-item recommendations from a sparse co-occurrence matrix.
+
+`build_recommendations` streams every (customer, service) booking pair in one query,
+builds the binary customer x service matrix X with SciPy, and gets co-booking counts
+for every pair of services from X.T @ X. Dividing by sqrt(customers_i * customers_j)
+turns counts into cosine similarities; the top TOP_N neighbours of each service are
+selected with one lexsort and stored as ServiceRecommendation rows, so pages only do
+an indexed read. numpy and scipy are only needed by the offline job.
+"""
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Sum
+
+from Bookings.models import Booking
+from .models import Service, ServiceRecommendation
+from .versions import bump
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional: only the offline job needs them
+    np = sparse = None
+
+TOP_N = 10
+BATCH_SIZE = 2000
+
+
+def booking_pairs():
+    """(customer_ids, service_ids) int64 arrays, one entry per booking, from one streaming query."""
+    rows = Booking.objects.values_list('customer_id', 'service_id').order_by().iterator(chunk_size=BATCH_SIZE)
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def similar_services(customers, services, top_n=TOP_N, min_customers=1):
+    """
+    Each service's top_n neighbours among services booked by the same customers, as
+    arrays (service, neighbour, score, customers, rank). Ties on cosine similarity go to
+    the larger overlap, then the lower id; pairs shared by fewer than min_customers are dropped.
+    """
+    customer_ids, rows = np.unique(customers, return_inverse=True)
+    service_ids, cols = np.unique(services, return_inverse=True)
+    booked = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(customer_ids), len(service_ids)),
+    )
+    booked.sum_duplicates()
+    booked.data[:] = 1  # repeat bookings count once
+    per_service = np.asarray(booked.sum(axis=0)).ravel()
+    together = (booked.T @ booked).tocoo()
+
+    keep = (together.row != together.col) & (together.data >= min_customers)
+    i, j, shared = together.row[keep], together.col[keep], together.data[keep]
+    score = shared / np.sqrt(per_service[i].astype(np.float64) * per_service[j])
+
+    order = np.lexsort((service_ids[j], -shared, -score, i))
+    i, j, shared, score = i[order], j[order], shared[order], score[order]
+    rank = np.arange(len(i)) - np.searchsorted(i, i)  # position inside each service's run
+    top = rank < top_n
+    return service_ids[i[top]], service_ids[j[top]], score[top], shared[top], rank[top]
+
+
+def build_recommendations(top_n=TOP_N, min_customers=1):
+    """Recompute every service's neighbours from all bookings. Returns number of rows stored."""
+    customers, services = booking_pairs()
+    found = similar_services(customers, services, top_n, min_customers) if len(customers) else ((),) * 5
+    rows = [
+        ServiceRecommendation(
+            service_id=int(service), recommended_id=int(neighbour), score=float(score),
+            customers=int(shared), rank=int(rank),
+        )
+        for service, neighbour, score, shared, rank in zip(*found)
+    ]
+    with transaction.atomic():
+        ServiceRecommendation.objects.all().delete()
+        ServiceRecommendation.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    bump('recommendations')
+    return len(rows)
+
+
+def _bookable(qs):
+    return qs.filter(recommended__is_available=True).exclude(recommended__provider__company_name='')
+
+
+def recommendations_for_service(service, limit=5):
+    """Services other customers booked with service (other providers only), best first."""
+    rows = (
+        _bookable(ServiceRecommendation.objects.filter(service_id=service.id))
+        .exclude(recommended__provider_id=service.provider_id)
+        .select_related('recommended', 'recommended__provider')
+        .order_by('rank')[:limit]
+    )
+    return [row.recommended for row in rows]
+
+
+def recommendations_for_customer(customer_id, limit=6):
+    """Neighbours of everything the customer booked, summed over their bookings, minus what they already booked."""
+    booked = Booking.objects.filter(customer_id=customer_id).values('service_id')
+    ranked = list(
+        _bookable(ServiceRecommendation.objects.filter(service_id__in=booked))
+        .exclude(recommended_id__in=booked)
+        .values_list('recommended_id')
+        .annotate(strength=Sum('score'))
+        .order_by('-strength', 'recommended_id')[:limit]
+    )
+    services = Service.objects.select_related('provider').in_bulk([service_id for service_id, _ in ranked])
+    return [services[service_id] for service_id, _ in ranked if service_id in services]
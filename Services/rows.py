@@ -0,0 +1,121 @@
+"""
+Row projections : slotted, read-only rows for listing pages.
+
+A listing needs a handful of columns, but a model instance carries every field
+(password hash, address, the whole AbstractUser set), its _state and a __dict__.
+These rows are built straight from values_list() tuples into fixed __slots__ and
+expose the attribute names the templates already use (`service.provider.username`,
+`booking.service.price`, ...). Related rows are shared: a provider with 40 services
+is one ProviderRow, not 40 User instances.
+"""
+from django.core.files.storage import default_storage
+
+
+class Row:
+    """Positional constructor over __slots__; subclasses only declare the columns."""
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {getattr(self, "id", "")}>'
+
+
+class StoredFile:
+    """Enough of FieldFile for templates: truthiness, .name and .url."""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name or ''
+
+    def __bool__(self):
+        return bool(self.name)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
+
+class ProviderRow(Row):
+    __slots__ = ('id', 'username', 'first_name', 'last_name', 'company_name', 'phone_number',
+                 'profile_picture', 'profile_thumbnails')
+    columns = ('id', 'username', 'first_name', 'last_name', 'company_name', 'phone_number',
+               'profile_picture', 'profile_thumbnails')
+
+
+class ServiceRow(Row):
+    __slots__ = ('id', 'name', 'category', 'price', 'is_available', 'provider_id', 'provider')
+    columns = ('id', 'name', 'category', 'price', 'is_available', 'provider_id')
+
+
+class UserRow(Row):
+    __slots__ = ('id', 'username', 'email', 'first_name', 'last_name', 'company_name',
+                 'is_customer', 'is_provider', 'is_superuser', 'date_joined', 'service_count')
+    columns = ('id', 'username', 'email', 'first_name', 'last_name', 'company_name',
+               'is_customer', 'is_provider', 'is_superuser', 'date_joined')
+
+
+class BookingRow(Row):
+    __slots__ = ('id', 'date', 'time', 'status', 'payment_status', 'payment_method', 'customer', 'service')
+    columns = ('id', 'date', 'time', 'status', 'payment_status', 'payment_method')
+
+
+class CustomerRef(Row):
+    __slots__ = ('id', 'username')
+
+
+class ServiceRef(Row):
+    __slots__ = ('id', 'name', 'category', 'price')
+
+
+def _related(cache, cls, values):
+    """Shared related row keyed by its id (values[0])."""
+    row = cache.get(values[0])
+    if row is None:
+        row = cache[values[0]] = cls(*values)
+    return row
+
+
+def service_rows(qs):
+    """ServiceRow per service in qs, each with a shared .provider ProviderRow."""
+    n = len(ServiceRow.columns)
+    picture = ProviderRow.columns.index('profile_picture')
+    providers = {}
+    rows = []
+    for values in qs.values_list(*ServiceRow.columns, *(f'provider__{c}' for c in ProviderRow.columns)):
+        provider = providers.get(values[n])
+        if provider is None:
+            provider_values = list(values[n:])
+            provider_values[picture] = StoredFile(provider_values[picture])
+            provider = providers[values[n]] = ProviderRow(*provider_values)
+        rows.append(ServiceRow(*values[:n], provider))
+    return rows
+
+
+def user_rows(qs, with_service_count=False):
+    """UserRow per user in qs; with_service_count expects qs annotated with service_count."""
+    extra = ('service_count',) if with_service_count else ()
+    return [UserRow(*values) for values in qs.values_list(*UserRow.columns, *extra)]
+
+
+def booking_rows(qs):
+    """BookingRow per booking in qs with shared .customer and .service refs."""
+    n = len(BookingRow.columns)
+    customers, services = {}, {}
+    rows = []
+    for values in qs.values_list(
+        *BookingRow.columns,
+        'customer_id', 'customer__username',
+        'service_id', 'service__name', 'service__category', 'service__price',
+    ):
+        customer = _related(customers, CustomerRef, values[n:n + 2])
+        service = _related(services, ServiceRef, values[n + 2:])
+        rows.append(BookingRow(*values[:n], customer, service))
+    return rows
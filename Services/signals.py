@@ -0,0 +1,87 @@
+"""Keep content versions (Services.versions) and the autocomplete index in step with writes."""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from Accounts.auth import invalidate_cached_user
+from Accounts.models import User
+from Bookings.models import Booking, ProviderSLA, ReviewRating
+from .autocomplete import autocomplete
+from .models import Service
+from .pricing import service_price_changed
+from .tasks import record_booked_prices
+from .versions import bump, service_scopes
+
+
+@receiver([post_save, post_delete], sender=Service)
+def service_changed(sender, instance, **kwargs):
+    bump(f'service:{instance.id}', *service_scopes(instance.provider_id, instance.category))
+
+
+@receiver(pre_save, sender=Service)
+def service_saving(sender, instance, **kwargs):
+    # The stored price and category, so the price sketches can drop the old value.
+    instance._price_before = (
+        Service.objects.filter(id=instance.id).values_list('category', 'price').first() if instance.id else None
+    )
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.service_saved, instance.id))
+    transaction.on_commit(partial(
+        service_price_changed, getattr(instance, '_price_before', None), (instance.category, instance.price),
+    ))
+
+
+@receiver(post_delete, sender=Service)
+def service_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.service_deleted, instance.id))
+    transaction.on_commit(partial(service_price_changed, (instance.category, instance.price), None))
+
+
+@receiver(post_save, sender=Booking)
+def booking_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(autocomplete.booking_added, instance.service_id))
+        # Off the request: the task reads the price and takes the sketch row lock.
+        transaction.on_commit(partial(record_booked_prices.enqueue, [instance.service_id]))
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.booking_added, instance.service_id, -1))
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    try:
+        service = instance.service
+    except Service.DoesNotExist:
+        return
+    bump(f'category:{service.category}', f'user:{service.provider_id}')
+
+
+@receiver([post_save, post_delete], sender=ReviewRating)
+def review_changed(sender, instance, **kwargs):
+    bump('ratings', f'user:{instance.provider_id}')
+
+
+@receiver([post_save, post_delete], sender=ProviderSLA)
+def sla_changed(sender, instance, **kwargs):
+    bump('sla', f'user:{instance.provider_id}')
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Provider names, companies and avatars appear on every marketplace page.
+    bump(f'user:{instance.id}', *(['catalog'] if instance.is_provider else []))
+    transaction.on_commit(partial(invalidate_cached_user, instance.id))
+
+
+@receiver(post_save, sender=User)
+def provider_saved(sender, instance, **kwargs):
+    if instance.is_provider:
+        transaction.on_commit(partial(autocomplete.provider_saved, instance.id))
@@ -0,0 +1,14 @@
+from taskqueue.queue import task
+
+from .models import Service
+from .pricing import record_prices
+
+
+@task(lane='low')
+def record_booked_prices(service_ids):
+    """Fold the current price of each booked service (one entry per booking) into the 'booked' sketches."""
+    services = dict(
+        (service_id, (category, price)) for service_id, category, price in
+        Service.objects.filter(id__in=set(service_ids)).values_list('id', 'category', 'price')
+    )
+    record_prices('booked', [(*services[i], 1) for i in service_ids if i in services])
@@ -0,0 +1,35 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def duration(seconds):
+    """Compact human duration for a number of seconds: '45 min', '3.5 h', '2 d'."""
+    if seconds is None or seconds == '':
+        return ''
+    seconds = float(seconds)
+    if seconds < 3600:
+        return f'{max(round(seconds / 60), 1)} min'
+    if seconds < 86400:
+        return f'{seconds / 3600:.1f} h'
+    return f'{seconds / 86400:.1f} d'
+
+
+@register.inclusion_tag('partials/price_band_badge.html', takes_context=True)
+def price_band(context, service):
+    """"Below / typical / above market" badge for service from the view's price_bands (Services.pricing)."""
+    band = context.get('price_bands', {}).get(service.category, {}).get('listed')
+    if band is None:
+        return {}
+    return {
+        'position': band.position(service.price),
+        'percentile': round(band.percentile(service.price)),
+        'band': band,
+    }
+
+
+@register.filter
+def price_position(band, price):
+    """band.position(price): 'low', 'typical' or 'high'."""
+    return band.position(price)
@@ -0,0 +1,30 @@
+from django import template
+from django.templatetags.static import static
+
+from HomeService.staticfiles import image_variants
+
+register = template.Library()
+
+
+def _srcset(entries):
+    return ', '.join(f'{url} {width}w' for width, url in entries)
+
+
+@register.inclusion_tag('partials/static_picture.html')
+def static_picture(path, alt='', css_class='', style='', sizes='100vw', loading='lazy'):
+    """
+    <picture> for a static image: WebP and original-format width variants written by
+    collectstatic (HomeService.staticfiles), or a plain <img> when none exist (DEBUG).
+    """
+    variants = image_variants(path)
+    ext = path.rsplit('.', 1)[-1].lower()
+    return {
+        'src': static(path),
+        'srcset': _srcset(variants.get(ext, ())),
+        'webp_srcset': _srcset(variants.get('webp', ())),
+        'sizes': sizes,
+        'alt': alt,
+        'css_class': css_class,
+        'style': style,
+        'loading': loading,
+    }
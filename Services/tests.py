@@ -1,3 +1,715 @@
-from django.test import TestCase
+import datetime
+import gzip
+import hashlib
+import json
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from functools import partial
+from pathlib import Path
+from pprint import pformat
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from Accounts.models import User
+from Bookings.models import Booking, ReviewRating
+from HomeService.compression import CompressionMiddleware, brotli
+from HomeService.databases import database_settings
+from HomeService.routers import PIN_COOKIE, ReplicaPinMiddleware, use_primary
+from HomeService.staticfiles import IMAGE_WIDTHS, REVALIDATE, _hashed_names, serve_static
+from HomeService.storage import BLOB_DIR, IMMUTABLE, blob_name
+from taskqueue.models import Task
+from .algorithm_utils import QuantileSketch, build_category_tree, category_tree_ordering, edit_distance
+from .autocomplete import REBUILD_SECONDS, AutocompleteIndex, AutocompleteService, autocomplete
+from .fuzzy import FuzzyIndex, deletes, max_distance, parts
+from .models import CategoryPriceSketch, Service
+from .pricing import record_prices
+from .recommendations import np, similar_services
+from .rows import BookingRow, ProviderRow, ServiceRow, UserRow, booking_rows, service_rows, user_rows
+from .tasks import record_booked_prices
+from .versions import bump, versioned
+
+
+def shared_cache(test):
+    """Run test with a file cache, which every worker process would share."""
+    location = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, location, ignore_errors=True)
+    override = override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+    }})
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+@mock.patch('HomeService.routers.replica_aliases', return_value=['replica1', 'replica2'])
+class ReplicaRoutingTests(TransactionTestCase):
+    # Nothing is read through the replicas, so routing is checked on QuerySet.db; no atomic wrapper either.
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def serve(self, view, request=None):
+        """Run view behind ReplicaPinMiddleware; returns (aliases view read from, response)."""
+        reads = []
+        middleware = ReplicaPinMiddleware(partial(view, reads))
+        if iscoroutinefunction(view):
+            response = async_to_sync(middleware)(request or self.factory.get('/'))
+        else:
+            response = middleware(request or self.factory.get('/'))
+        return reads, response
+
+    def test_replica_aliases_from_the_environment(self, _):
+        databases = database_settings(Path('/srv'), {'DB_REPLICAS': '/srv/r1.sqlite3, /srv/r2.sqlite3'})
+        self.assertEqual(list(databases), ['default', 'replica1', 'replica2'])
+        self.assertEqual(databases['replica2']['NAME'], '/srv/r2.sqlite3')
+        self.assertEqual(databases['replica1']['TEST'], {'MIRROR': 'default'})
+
+    def test_reads_in_a_request_go_to_a_replica(self, _):
+        def view(reads, request):
+            reads.append(Service.objects.all().db)
+            return HttpResponse()
+
+        reads, response = self.serve(view)
+        self.assertIn(reads[0], ('replica1', 'replica2'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(Service.objects.all().db, 'default')  # jobs and commands
+
+    def test_a_write_pins_the_request_and_the_next_ones(self, _):
+        def view(reads, request):
+            reads.append(Service.objects.all().db)
+            Service.objects.filter(pk=0).update(price=1)
+            reads.append(Service.objects.all().db)
+            return HttpResponse()
+
+        reads, response = self.serve(view)
+        self.assertEqual(reads[1], 'default')
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+
+        def read(reads, request):
+            reads.append(Service.objects.all().db)
+            return HttpResponse()
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        self.assertEqual(self.serve(read, request)[0], ['default'])
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = str(int(time.time()) - 1)
+        self.assertNotEqual(self.serve(read, request)[0], ['default'])
+
+    def test_writes_locks_and_unsafe_methods_use_the_primary(self, _):
+        def view(reads, request):
+            reads.append(Service.objects.select_for_update().db)
+            reads.append(router.db_for_write(Service))
+            with transaction.atomic():
+                reads.append(Service.objects.all().db)
+            return HttpResponse()
+
+        self.assertEqual(self.serve(view)[0], ['default', 'default', 'default'])
+
+        def read(reads, request):
+            reads.append(Service.objects.all().db)
+            return HttpResponse()
+
+        self.assertEqual(self.serve(read, self.factory.post('/'))[0], ['default'])
+
+    def test_use_primary_pins_sync_and_async_views(self, _):
+        @use_primary
+        def sync_view(reads, request):
+            reads.append(Service.objects.all().db)
+            return HttpResponse()
+
+        @use_primary
+        async def async_view(reads, request):
+            reads.append(Service.objects.all().db)
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(async_view))
+        self.assertEqual(self.serve(sync_view)[0], ['default'])
+        self.assertEqual(self.serve(async_view)[0], ['default'])
+
+
+class SqliteSettingsTests(SimpleTestCase):
+    def test_connections_do_not_switch_journal_mode(self):
+        # WAL is set once on the file (sqlite_maintenance --enable-wal), never per connection.
+        options = database_settings(Path('/srv'), {})['default']['OPTIONS']
+        self.assertNotIn('journal_mode', options['init_command'])
+        self.assertIn('PRAGMA synchronous=NORMAL', options['init_command'])
+        self.assertEqual(options['transaction_mode'], 'IMMEDIATE')
+
+    def test_tuning_can_be_turned_off(self):
+        self.assertEqual(database_settings(Path('/srv'), {'DB_SQLITE_TUNING': '0'})['default']['OPTIONS'], {})
+
+
+def media_root(test):
+    """Send uploads to a temporary MEDIA_ROOT for the rest of test."""
+    location = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, location, ignore_errors=True)
+    override = override_settings(MEDIA_ROOT=location)
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+def stored_blobs():
+    root = os.path.join(default_storage.location, BLOB_DIR)
+    return sorted(
+        os.path.relpath(os.path.join(path, name), default_storage.location)
+        for path, _, names in os.walk(root) for name in names
+    )
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        media_root(self)
+
+    def test_identical_uploads_share_one_blob_named_by_its_hash(self):
+        first = default_storage.save('profile_pictures/a.PNG', ContentFile(b'same bytes'))
+        second = default_storage.save('profile_pictures/b.png', ContentFile(b'same bytes'))
+        other = default_storage.save('profile_pictures/a.png', ContentFile(b'other bytes'))
+        self.assertEqual(first, blob_name(hashlib.sha256(b'same bytes').hexdigest(), '.png'))
+        self.assertEqual(second, first)
+        self.assertNotEqual(other, first)
+        self.assertEqual(stored_blobs(), sorted([first, other]))
+        self.assertFalse(os.listdir(os.path.join(default_storage.location, '.uploads')))
+
+    def test_blobs_are_served_immutable_with_the_digest_as_etag(self):
+        name = default_storage.save('x.txt', ContentFile(b'hello'))
+        response = self.client.get(default_storage.url(name))
+        self.assertEqual(b''.join(response.streaming_content), b'hello')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        etag = f'"{hashlib.sha256(b"hello").hexdigest()}"'
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(default_storage.url(name), headers={'if-none-match': etag}).status_code, 304)
+
+
+class GcMediaBlobsTests(TestCase):
+    def setUp(self):
+        media_root(self)
+
+    def gc(self, *args):
+        out = io.StringIO()
+        call_command('gc_media_blobs', *args, stdout=out)
+        return out.getvalue()
+
+    def test_removes_only_blobs_nothing_references(self):
+        picture = default_storage.save('p.png', ContentFile(b'picture'))
+        thumb = default_storage.save('t.webp', ContentFile(b'thumbnail'))
+        orphan = default_storage.save('o.png', ContentFile(b'replaced picture'))
+        User.objects.create_user('alice', password='pw', profile_picture=picture,
+                                 profile_thumbnails={'20': {'webp': thumb}})
+        self.assertIn('Removed 0 blobs', self.gc())  # too young: may belong to an upload in progress
+        self.assertIn('Would remove 1 blobs', self.gc('--grace-hours=0', '--dry-run'))
+        self.assertEqual(len(stored_blobs()), 3)
+        past = time.time() - 60
+        for name in stored_blobs():
+            os.utime(default_storage.path(name), (past, past))
+        self.assertIn('Removed 1 blobs', self.gc('--grace-hours=0'))
+        self.assertEqual(stored_blobs(), sorted([picture, thumb]))
+        self.assertNotIn(orphan, stored_blobs())
+
+
+class CollectStaticTests(SimpleTestCase):
+    def setUp(self):
+        source, root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        for location in (source, root):
+            self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        os.makedirs(os.path.join(source, 'images'))
+        with open(os.path.join(source, 'css', 'site.css'), 'w') as fh:
+            fh.write('body { margin: 0; padding: 0; }\n' * 40)
+        with open(os.path.join(source, 'css', 'tiny.css'), 'w') as fh:
+            fh.write('p{}')
+        Image.new('RGB', (1000, 500), (10, 120, 200)).save(os.path.join(source, 'images', 'hero.jpg'))
+        override = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.root = root
+        _hashed_names.cache_clear()
+        self.addCleanup(_hashed_names.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(root, 'staticfiles.json')) as fh:
+            self.manifest = json.load(fh)['paths']
+
+    def test_manifest_image_variants_and_compressed_siblings(self):
+        css = self.manifest['css/site.css']
+        self.assertRegex(css, r'^css/site\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.root, css + '.gz'), 'rb') as fh:
+            self.assertEqual(gzip.decompress(fh.read()), ('body { margin: 0; padding: 0; }\n' * 40).encode())
+        if brotli is not None:
+            self.assertTrue(os.path.isfile(os.path.join(self.root, css + '.br')))
+        tiny = self.manifest['css/tiny.css']
+        self.assertFalse(os.path.exists(os.path.join(self.root, tiny + '.gz')))  # too small to gain
+
+        widths = [w for w in IMAGE_WIDTHS if w < 1000] + [1000]
+        for width in widths:
+            for ext in ('webp', 'jpg'):
+                stored = self.manifest[f'images/hero.{width}w.{ext}']
+                with Image.open(os.path.join(self.root, stored)) as image:
+                    self.assertEqual(image.width, width)
+        self.assertEqual(self.manifest['images/hero.1000w.jpg'], self.manifest['images/hero.jpg'])
+
+    def serve(self, path, encoding=''):
+        request = RequestFactory().get(f'/static/{path}', headers={'accept-encoding': encoding})
+        return serve_static(request, path)
+
+    def test_serve_static_picks_the_accepted_encoding(self):
+        css = self.manifest['css/site.css']
+        self.assertEqual(self.serve(css, 'gzip, deflate, br')['Content-Encoding'], 'br' if brotli else 'gzip')
+        self.assertEqual(self.serve(css, 'gzip, deflate')['Content-Encoding'], 'gzip')
+        plain = self.serve(css)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(plain['Vary'], 'Accept-Encoding')
+        self.assertEqual(plain['Cache-Control'], IMMUTABLE)
+        self.assertEqual(self.serve('css/site.css', 'gzip')['Cache-Control'], REVALIDATE)
+        self.assertNotIn('Content-Encoding', self.serve(self.manifest['css/tiny.css'], 'gzip, br'))
+
+
+class VersionedTests(SimpleTestCase):
+    def setUp(self):
+        self.calls = 0
+
+        @versioned(lambda request: ['catalog'])
+        def view(request):
+            self.calls += 1
+            return HttpResponse('page')
+
+        self.view = view
+
+    def get(self, **headers):
+        request = RequestFactory().get('/page/', headers=headers)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_revalidation_is_answered_from_versions(self):
+        shared_cache(self)
+        first = self.get()
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        self.assertEqual(self.get(if_none_match=first['ETag']).status_code, 304)
+        self.assertEqual(self.calls, 1)
+        bump('catalog')
+        changed = self.get(if_none_match=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_process_local_cache_always_runs_the_view(self):
+        first = self.get()
+        self.assertFalse(first.has_header('ETag'))
+        self.get(if_none_match='W/"anything"')
+        self.assertEqual(self.calls, 2)
+
+
+class MarketplaceConditionalGetTests(TransactionTestCase):
+    # The page may run its queries on their own connections (gather_queries), so nothing may stay uncommitted.
+    def setUp(self):
+        shared_cache(self)
+        self.user = User.objects.create_user('viewer', password='pw', is_customer=True)
+        self.client.force_login(self.user)
+
+    def test_category_page_revalidates_until_the_category_changes(self):
+        url = reverse('plumbing_providers')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+        provider = User.objects.create_user('provider', password='pw', is_provider=True, company_name='Co')
+        Service.objects.create(name='Pipe repair', category='Plumbing', price=800, provider=provider)
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 200)
+
+
+class MarketplaceFixtures:
+    """Two providers in Plumbing, one of them also in Cleaning, with bookings and a review."""
+
+    def setUp(self):
+        super().setUp()
+        self.provider = User.objects.create_user('ram', password='pw', is_provider=True, company_name='Ram Pipes')
+        other = User.objects.create_user('sita', password='pw', is_provider=True, company_name='Sita Fix')
+        customer = User.objects.create_user('customer', password='pw', is_customer=True)
+        self.service = Service.objects.create(name='Pipe repair', category='Plumbing', price=500,
+                                              provider=self.provider)
+        Service.objects.create(name='Deep clean', category='Cleaning', price=900, provider=self.provider)
+        Service.objects.create(name='Tap fitting', category='Plumbing', price=300, provider=other)
+        for status in ('Completed', 'Completed', 'Pending'):
+            Booking.objects.create(customer=customer, service=self.service, date=datetime.date(2026, 5, 4),
+                                   time=datetime.time(10), status=status)
+        ReviewRating.objects.create(provider=self.provider, customer=customer, rating=4)
+        self.client.force_login(customer)
+
+
+class MarketplaceViewTests(MarketplaceFixtures, TestCase):
+    def test_service_list_groups_bookable_services(self):
+        context = self.client.get(reverse('services')).context
+        plumbing = next(c for c in context['categories_list'] if c['category'] == 'Plumbing')
+        self.assertEqual(plumbing['service_count'], 2)
+        self.assertEqual([company['company_name'] for company in plumbing['companies']], ['Ram Pipes', 'Sita Fix'])
+        self.assertEqual(sorted(context['categories']), ['Cleaning', 'Plumbing'])
+        self.assertEqual(context['price_bands'], {})
+
+    def test_service_detail_statistics(self):
+        context = self.client.get(reverse('service_detail', args=[self.service.id])).context
+        self.assertEqual(context['service'], self.service)
+        self.assertEqual(sorted(s.name for s in context['provider_services']), ['Deep clean', 'Pipe repair'])
+        self.assertEqual((context['total_bookings'], context['completed_bookings']), (3, 2))
+        self.assertEqual((context['review_avg'], context['review_count']), (4, 1))
+        self.assertEqual(len(context['provider_reviews']), 1)
+
+    def test_provider_sections_do_not_query_per_provider(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse('service_providers'))
+            return response, len(captured)
+
+        response, before = queries()
+        plumbing = next(s for s in response.context['category_sections'] if s['category'] == 'Plumbing')
+        ram = plumbing['company_groups'][0]['providers'][0]
+        self.assertEqual((ram['total_bookings'], ram['completed_bookings'], ram['total_earnings']), (3, 2, 1000))
+        for name in ('hari', 'gita', 'shyam'):
+            provider = User.objects.create_user(name, password='pw', is_provider=True, company_name=name.title())
+            Service.objects.create(name='Pipes', category='Plumbing', price=100, provider=provider)
+        self.assertEqual(queries()[1], before)
+
+    def test_provider_search_matches_service_names(self):
+        response = self.client.get(reverse('service_providers'), {'search': 'tap fit'})
+        sections = response.context['category_sections']
+        self.assertEqual([s['category'] for s in sections], ['Plumbing'])
+        self.assertEqual([c['company_name'] for c in sections[0]['company_groups']], ['Sita Fix'])
+
+
+class ConcurrentMarketplaceTests(MarketplaceFixtures, TransactionTestCase):
+    maxDiff = None
+    # Other threads run the queries, so the fixtures must be committed.
+    def context(self, name, *args):
+        return self.client.get(reverse(name, args=args)).context
+
+    def test_fanning_out_gives_the_same_context(self):
+        pages = [('services',), ('service_detail', self.service.id), ('service_providers',)]
+        serial = [self.context(*page) for page in pages]
+        with mock.patch('Services.views._connections_are_reused', return_value=True):
+            concurrent = [self.context(*page) for page in pages]
+        for page, before, after in zip(pages, serial, concurrent):
+            for key in ('categories_list', 'categories', 'total_bookings', 'completed_bookings', 'review_avg',
+                        'provider_services', 'category_sections'):
+                if key in before:  # rows have no __eq__: compare their sorted, id-bearing reprs
+                    self.assertEqual(pformat(before[key]), pformat(after[key]), (page, key))
+
+
+class RowProjectionTests(TestCase):
+    """Each slotted row carries the same values the model instances did."""
+
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            'ram', password='pw', is_provider=True, company_name='Ram Pipes', first_name='Ram',
+            phone_number='98000', profile_picture='blobs/aa/bb/picture.png',
+            profile_thumbnails={'20': {'webp': 'blobs/cc/dd/thumb.webp'}},
+        )
+        self.customer = User.objects.create_user('sita', password='pw', is_customer=True, email='s@example.com')
+        for name, price in (('Pipe repair', 500), ('Tap fitting', 300)):
+            service = Service.objects.create(name=name, category='Plumbing', price=price, provider=self.provider)
+            Booking.objects.create(customer=self.customer, service=service, date=datetime.date(2026, 5, 4),
+                                   time=datetime.time(10), status='Accepted', payment_method='Esewa')
+
+    def assertSameFields(self, row, instance, names):
+        for name in names:
+            value, expected = getattr(row, name), getattr(instance, name)
+            if name == 'profile_picture':
+                self.assertEqual((value.name, value.url, bool(value)), (expected.name, expected.url, bool(expected)))
+            else:
+                self.assertEqual(value, expected, name)
+
+    def test_service_rows(self):
+        qs = Service.objects.order_by('id')
+        rows = service_rows(qs)
+        instances = list(qs.select_related('provider'))
+        self.assertEqual(len(rows), len(instances))
+        for row, service in zip(rows, instances):
+            self.assertSameFields(row, service, ServiceRow.columns)
+            self.assertSameFields(row.provider, service.provider, ProviderRow.columns)
+        self.assertIs(rows[0].provider, rows[1].provider)
+
+    def test_user_rows(self):
+        qs = User.objects.annotate(service_count=Count('service')).order_by('id')
+        for row, user in zip(user_rows(qs, with_service_count=True), qs):
+            self.assertSameFields(row, user, UserRow.__slots__)
+        self.assertFalse(hasattr(user_rows(User.objects.all())[0], 'service_count'))
+
+    def test_booking_rows(self):
+        qs = Booking.objects.order_by('id')
+        rows = booking_rows(qs)
+        for row, booking in zip(rows, qs.select_related('customer', 'service')):
+            self.assertSameFields(row, booking, BookingRow.columns)
+            self.assertSameFields(row.customer, booking.customer, ('id', 'username'))
+            self.assertSameFields(row.service, booking.service, ('id', 'name', 'category', 'price'))
+        self.assertIs(rows[0].customer, rows[1].customer)
+
+
+class CategoryTreeTests(TestCase):
+    def test_groups_runs_of_category_company_and_provider(self):
+        def service(pk, category, provider_id, company):
+            provider = SimpleNamespace(company_name=company)
+            return SimpleNamespace(id=pk, category=category, provider_id=provider_id, provider=provider)
+
+        services = [
+            service(1, 'Cleaning', 1, ' Acme '), service(2, 'Cleaning', 1, ' Acme '),
+            service(3, 'Cleaning', 2, 'Acme'), service(4, 'Cleaning', 3, ''),
+            service(5, 'Plumbing', 1, 'Acme'),
+        ]
+        tree = build_category_tree(services)
+        self.assertEqual(list(tree), ['Cleaning', 'Plumbing'])
+        cleaning = tree['Cleaning']
+        self.assertEqual([company['company_name'] for company in cleaning], ['Acme', '—'])
+        self.assertEqual([[s.id for s in p['services']] for p in cleaning[0]['providers']], [[1, 2], [3]])
+        self.assertEqual([s.id for s in tree['Plumbing'][0]['providers'][0]['services']], [5])
+        self.assertEqual(build_category_tree([]), {})
+
+    def test_ordering_keeps_companies_contiguous(self):
+        for username, company in (('zed', 'beta'), ('amy', 'Alpha'), ('bob', 'alpha'), ('cat', 'Beta')):
+            provider = User.objects.create_user(username, password='pw', is_provider=True, company_name=company)
+            Service.objects.create(name=username, category='Plumbing', price=100, provider=provider)
+        services = Service.objects.select_related('provider').order_by(*category_tree_ordering())
+        companies = build_category_tree(services)['Plumbing']
+        self.assertEqual([company['company_name'] for company in companies], ['Alpha', 'alpha', 'Beta', 'beta'])
+
+
+class CompressionTests(SimpleTestCase):
+    def compress(self, **meta):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip, br', **meta)
+        response = HttpResponse('<p>' + 'booking ' * 200 + '</p>', content_type='text/html')
+        return CompressionMiddleware(lambda request: response).process_response(request, response)
+
+    def test_brotli_when_accepted(self):
+        expected = 'br' if brotli is not None else 'gzip'
+        self.assertEqual(self.compress()['Content-Encoding'], expected)
+
+    def test_pages_with_a_csrf_token_get_padded_gzip(self):
+        self.assertEqual(self.compress(CSRF_COOKIE_NEEDS_UPDATE=True)['Content-Encoding'], 'gzip')
+
+
+class EditDistanceTests(SimpleTestCase):
+    def test_insert_delete_substitute_and_swap(self):
+        self.assertEqual(edit_distance('plumbing', 'plumbing', 2), 0)
+        self.assertEqual(edit_distance('plumbing', 'plumbng', 2), 1)
+        self.assertEqual(edit_distance('plumbing', 'plumbings', 2), 1)
+        self.assertEqual(edit_distance('plumbing', 'plumbinx', 2), 1)
+        self.assertEqual(edit_distance('electrical', 'elcetrical', 2), 1)
+        self.assertEqual(edit_distance('abc', 'ca', 5), 3)  # optimal string alignment, not Damerau
+        self.assertEqual(edit_distance('', 'abc', 5), 3)
+
+    def test_stops_past_the_limit(self):
+        self.assertEqual(edit_distance('plumbing', 'plumbr', 2), 3)
+        self.assertEqual(edit_distance('plumbing', 'painting', 1), 2)
+        self.assertEqual(edit_distance('a', 'abcdef', 2), 3)
+
+
+class FuzzyIndexTests(SimpleTestCase):
+    def test_parts_and_allowed_distance(self):
+        self.assertEqual(parts('sharma_ram42'), ['sharma', 'ram', '42'])
+        self.assertEqual([max_distance(word) for word in ('ram', '4242', 'pipe', 'plumbing')], [0, 0, 1, 2])
+        self.assertEqual(deletes('abcdefghij', 1), {'abcdefg', 'bcdefg', 'acdefg', 'abdefg', 'abcefg', 'abcdfg',
+                                                    'abcdeg', 'abcdef'})
+
+    def test_lookup_closest_then_most_used(self):
+        index = FuzzyIndex()
+        for word, keys in (('plumbing', 'ab'), ('plumber', 'abc'), ('painter', 'a'), ('painted', 'ab'), ('pipe', 'a')):
+            for key in keys:
+                index.add(word, key)
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.lookup('plumbing'), [('plumbing', 0)])
+        self.assertEqual(index.lookup('plumbng'), [('plumbing', 1)])
+        self.assertEqual(index.lookup('plumbng', limit=2), [('plumbing', 1), ('plumber', 2)])
+        self.assertEqual(index.lookup('paintex'), [('painted', 1), ('painter', 1)])
+        self.assertEqual(index.lookup('plumbr'), [('plumber', 1)])
+        self.assertEqual(index.lookup('pipe'), [('pipe', 0)])
+        self.assertEqual(index.lookup('pip'), [])  # three letters must match exactly
+        self.assertEqual(index.lookup('plumbng', limit=0), [])
+
+    def test_discard_removes_the_word_with_its_last_key(self):
+        index = FuzzyIndex()
+        index.add('plumbing', 1)
+        index.add('plumbing', 2)
+        index.discard('plumbing', 1)
+        self.assertEqual(index.lookup('plumbng'), [('plumbing', 1)])
+        index.discard('plumbing', 2)
+        index.discard('plumbing', 3)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(dict(index.deletes), {})
+        self.assertEqual(index.lookup('plumbng'), [])
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    rows = [
+        (1, 'Pipe Repair', 'Plumbing', 10, 'ramsharma', 'Ram', 'Sharma', 'Ram Sharma Plumbing', 5),
+        (2, 'Leak Fixing', 'Plumbing', 10, 'ramsharma', 'Ram', 'Sharma', 'Ram Sharma Plumbing', 9),
+        (3, 'House Wiring', 'Electrical', 11, 'sita', '', '', 'Bright Electric', 2),
+    ]
+
+    def setUp(self):
+        self.index = AutocompleteIndex.from_rows(self.rows)
+
+    def texts(self, query, **kwargs):
+        return [result['text'] for result in self.index.suggest(query, **kwargs)]
+
+    def test_prefix_of_any_word_ranked_by_bookings(self):
+        self.assertEqual(self.texts('sharma'), ['Ram Sharma Plumbing', 'ramsharma'])
+        self.assertEqual(self.texts('pl')[:2], ['Plumbing', 'Ram Sharma Plumbing'])
+
+    def test_category_filter(self):
+        self.assertEqual(self.texts('wir', category='Plumbing'), [])
+        self.assertEqual(self.texts('wir', category='Electrical'), ['House Wiring'])
+
+    def test_typo_falls_back_to_corrected_spelling(self):
+        results = self.index.suggest('plumbng')
+        self.assertEqual(results[0]['text'], 'Plumbing')
+        self.assertEqual(results[0]['distance'], 1)
+        self.assertEqual(self.index.search_terms('plumbng wiring'), [['plumbng', 'plumbing'], ['wiring']])
+
+    def test_in_place_updates(self):
+        self.index.upsert((4, 'Drain Cleaning', 'Cleaning', 12, 'hari', '', '', 'Clean Co'))
+        self.assertEqual(self.texts('drain'), ['Drain Cleaning'])
+        self.index.remove(4)
+        self.assertEqual(self.texts('drain'), [])
+
+
+class AutocompleteRefreshTests(SimpleTestCase):
+    def stale_service(self):
+        service = AutocompleteService()
+        service.index = AutocompleteIndex()
+        service.built_at = time.monotonic() - REBUILD_SECONDS - 1
+        return service
+
+    def test_process_local_cache_rebuilds_after_the_interval(self):
+        service = self.stale_service()
+        with mock.patch('Services.autocomplete._watched_versions', return_value=service.versions), \
+                mock.patch('Services.autocomplete.threading.Thread') as thread:
+            service.get()
+        thread.return_value.start.assert_called_once()
+
+    def test_shared_cache_skips_the_rebuild_while_versions_hold(self):
+        shared_cache(self)
+        service = self.stale_service()
+        with mock.patch('Services.autocomplete._watched_versions', return_value=service.versions), \
+                mock.patch('Services.autocomplete.threading.Thread') as thread:
+            service.get()
+        thread.assert_not_called()
+        self.assertLess(time.monotonic() - service.built_at, 1)
+
+
+class SearchSuggestionsTests(TestCase):
+    def setUp(self):
+        autocomplete.index = None
+        self.addCleanup(setattr, autocomplete, 'index', None)
+        provider = User.objects.create_user('ramsharma', password='pw', is_provider=True, company_name='Ram Plumbing')
+        Service.objects.create(name='Pipe Repair', category='Plumbing', price=500, provider=provider)
+
+    def test_json_suggestions(self):
+        self.client.force_login(User.objects.create_user('customer', password='pw', is_customer=True))
+        response = self.client.get(reverse('search_suggestions'), {'q': 'pipe', 'limit': '3'})
+        self.assertEqual(response.json(), {
+            'query': 'pipe', 'results': [{'text': 'Pipe Repair', 'kind': 'service', 'bookings': 0, 'distance': 0}],
+        })
+        self.assertEqual(response['Cache-Control'], 'private, max-age=30')
+
+    def test_login_required(self):
+        response = self.client.get(reverse('search_suggestions'), {'q': 'pipe'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+
+class QuantileSketchTests(SimpleTestCase):
+    def test_quantiles_within_relative_error(self):
+        sketch = QuantileSketch()
+        sketch.extend(range(1, 1001))
+        for q, exact in ((0.1, 100.9), (0.5, 500.5), (0.9, 900.1)):
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=exact * 0.03)
+
+    def test_discard_undoes_add(self):
+        sketch = QuantileSketch()
+        sketch.extend([100, 200, 300, 0])
+        sketch.discard(200)
+        sketch.discard(0)
+        self.assertEqual(sketch.count, 2)
+        self.assertAlmostEqual(sketch.quantile(1), 300, delta=6)
+        sketch.add(200, 3)
+        sketch.discard(200, 3)
+        self.assertEqual(QuantileSketch.from_dict(sketch.to_dict()).buckets, sketch.buckets)
+
+    def test_discarding_a_value_never_added_leaves_other_buckets(self):
+        sketch = QuantileSketch()
+        sketch.add(100)
+        sketch.discard(5000)
+        self.assertEqual(sketch.count, 1)
+
+
+class PriceSketchTests(TestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user('provider', password='pw', is_provider=True, company_name='Co')
+
+    def row(self, kind='listed'):
+        return CategoryPriceSketch.objects.get(kind=kind, category='Plumbing')
+
+    def test_record_prices_adds_and_removes(self):
+        record_prices('listed', [('Plumbing', price, 1) for price in (100, 200, 300, 400, 500)])
+        self.assertTrue(self.row().has_band)
+        self.assertAlmostEqual(self.row().p50, 300, delta=6)
+        record_prices('listed', [('Plumbing', 500, -1), ('Plumbing', 100, -1)])
+        self.assertEqual(self.row().count, 3)
+        self.assertFalse(self.row().has_band)
+
+    def test_service_edit_moves_its_listed_price(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            service = Service.objects.create(name='Pipes', category='Plumbing', price=100, provider=self.provider)
+        with self.captureOnCommitCallbacks(execute=True):
+            service.price = 900
+            service.save()
+        sketch = QuantileSketch.from_dict(self.row().sketch)
+        self.assertEqual(sketch.count, 1)
+        self.assertAlmostEqual(sketch.quantile(0.5), 900, delta=18)
+
+    def test_booking_enqueues_its_price_instead_of_locking_the_sketch(self):
+        service = Service.objects.create(name='Pipes', category='Plumbing', price=250, provider=self.provider)
+        customer = User.objects.create_user('customer', password='pw', is_customer=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(customer=customer, service=service, date=datetime.date(2026, 5, 4),
+                                   time=datetime.time(10))
+        self.assertFalse(CategoryPriceSketch.objects.filter(kind='booked').exists())
+        task = Task.objects.get(name=record_booked_prices.name)
+        record_booked_prices(*task.args)
+        self.assertEqual(self.row('booked').count, 1)
+        self.assertAlmostEqual(self.row('booked').p50, 250, delta=5)
+
+
+@unittest.skipIf(np is None, 'numpy and scipy are not installed')
+class SimilarServicesTests(SimpleTestCase):
+    def test_cosine_neighbours_ranked_per_service(self):
+        # 10 booked by customers 1-3, 20 by 1-2, 30 by 3 (twice: repeats count once).
+        service, neighbour, score, shared, rank = similar_services(
+            np.array([1, 1, 2, 2, 3, 3, 3]), np.array([10, 20, 10, 20, 10, 30, 30]),
+        )
+        self.assertEqual(service.tolist(), [10, 10, 20, 30])
+        self.assertEqual(neighbour.tolist(), [20, 30, 10, 10])
+        self.assertEqual(shared.tolist(), [2, 1, 2, 1])
+        self.assertEqual(rank.tolist(), [0, 1, 0, 0])
+        np.testing.assert_allclose(score, [2 / 6 ** 0.5, 1 / 3 ** 0.5, 2 / 6 ** 0.5, 1 / 3 ** 0.5])
+
+    def test_top_n_min_customers_and_ties(self):
+        customers, services = np.array([1, 1, 2, 2, 3, 3]), np.array([10, 20, 10, 20, 10, 30])
+        self.assertEqual(similar_services(customers, services, top_n=1)[1].tolist(), [20, 10, 10])
+        self.assertEqual(similar_services(customers, services, min_customers=2)[0].tolist(), [10, 20])
+        service, neighbour, *_ = similar_services(np.array([1, 1, 1]), np.array([30, 10, 20]))
+        self.assertEqual(list(zip(service.tolist(), neighbour.tolist())),
+                         [(10, 20), (10, 30), (20, 10), (20, 30), (30, 10), (30, 20)])
@@ -4,12 +4,13 @@ from .views import (
     plumbing_services, electrical_services, cleaning_services, painting_services,
     appliance_repair_services, handyman_services,
     plumbing_providers, electrical_providers, cleaning_providers, painting_providers,
-    appliance_repair_providers, handyman_providers
+    appliance_repair_providers, handyman_providers, search_suggestions,
 )
 
 urlpatterns = [
     path('', service_list, name='services'),
     path('providers/', service_providers, name='service_providers'),
+    path('autocomplete/', search_suggestions, name='search_suggestions'),
     path(
         'providers/<int:provider_id>/reviews/',
         provider_customer_reviews,
@@ -0,0 +1,179 @@
+"""
+Content versions : change stamps for conditional GET on the marketplace pages.
+
+Every scope a page can depend on keeps a version in the cache: the time.time_ns()
+of its last change. Scopes:
+
+    catalog            any service, or any provider's public profile
+    category:<name>    services and bookings in that category
+    service:<id>       one service row
+    user:<id>          one user's profile, plus, for a provider, their services,
+                       bookings, reviews and SLA figures
+    ratings, sla       any review / any ProviderSLA row
+    scores             any refresh of ProviderCategoryScore (Bookings.ranking)
+    recommendations    any rebuild of ServiceRecommendation (Services.recommendations)
+    prices             a moved percentile of CategoryPriceSketch (Services.pricing)
+
+Model signals (Services.signals) bump the scopes a save or delete touches; code
+that writes with bulk_create/update() calls bump() itself. `versioned` turns the
+scopes of a view into a weak ETag and Last-Modified and answers If-None-Match /
+If-Modified-Since with 304 before the view runs, so revalidating costs one cache
+round trip and no ORM or template work.
+
+Versions live in the default cache, so they are only trusted when that cache is
+shared by every worker (REDIS_URL). With a process-local cache a bump made by
+another process, a command or the task worker would never reach this one, and
+its pages would keep answering 304 while stale, so `versioned` then serves every
+request in full, like the cached request.user falls back to a plain load.
+"""
+import hashlib
+import inspect
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from HomeService.caches import cache_is_shared
+from .models import Service
+
+KEY_PREFIX = 'version:'
+
+
+def version_key(scope):
+    # No spaces in cache keys ('category:Appliance Repair').
+    return f'{KEY_PREFIX}{scope}'.replace(' ', '_')
+
+
+def bump(*scopes):
+    """Mark scopes as changed now."""
+    if scopes:
+        now = time.time_ns()
+        cache.set_many({version_key(scope): now for scope in set(scopes)}, None)
+
+
+def service_scopes(provider_id, category):
+    return ['catalog', f'category:{category}', f'user:{provider_id}']
+
+
+def bump_services(pairs):
+    """Bump the scopes of every (provider_id, category) pair, e.g. after a bulk write."""
+    scopes = []
+    for provider_id, category in set(pairs):
+        scopes += service_scopes(provider_id, category)
+    bump(*scopes)
+
+
+def _fill_missing(versions, keys):
+    # A cold key counts as changed now; add() keeps concurrent requests on one value.
+    now = time.time_ns()
+    for key in keys:
+        if key not in versions:
+            versions[key] = now if cache.add(key, now, None) else cache.get(key, now)
+    return versions
+
+
+async def _afill_missing(versions, keys):
+    now = time.time_ns()
+    for key in keys:
+        if key not in versions:
+            versions[key] = now if await cache.aadd(key, now, None) else await cache.aget(key, now)
+    return versions
+
+
+def _has_pending_messages(request):
+    # Cookie storage first, session fallback (already loaded by the user lookup).
+    session = getattr(request, 'session', None)
+    return bool(request.COOKIES.get('messages')) or bool(session is not None and session.get('_messages'))
+
+
+def _validators(request, user, keys, versions):
+    viewer = user.pk if user.is_authenticated else 'anon'
+    stamp = ','.join(f'{key}={versions[key]}' for key in keys)
+    digest = hashlib.sha1(
+        f'{getattr(settings, "CONTENT_RELEASE", "")}|{request.path}|{viewer}|{stamp}'.encode()
+    ).hexdigest()
+    return f'W/"{digest}"', max(versions.values()) // 1_000_000_000
+
+
+def _finish(request, response, etag, last_modified):
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Browsers must revalidate: the page also depends on the session (user, messages).
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def versioned(scopes):
+    """
+    Conditional GET for a view from content versions. `scopes(request, *args, **kwargs)`
+    returns the scope names the page depends on (an awaitable is fine for async views),
+    or None to serve the view without validators. The viewer's own user scope is added
+    automatically because the layout shows their profile. Without a shared cache the
+    view runs on every request (see the module docstring).
+    """
+    def keys_for(names, user):
+        names = set(names)
+        if user.is_authenticated:
+            names.add(f'user:{user.pk}')
+        return sorted(version_key(name) for name in names)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or not cache_is_shared():
+                    return await view(request, *args, **kwargs)
+                names = scopes(request, *args, **kwargs)
+                if inspect.isawaitable(names):
+                    names = await names
+                user = await request.auser()
+                if names is None or _has_pending_messages(request):
+                    return await view(request, *args, **kwargs)
+                keys = keys_for(names, user)
+                versions = await _afill_missing(await cache.aget_many(keys), keys)
+                etag, last_modified = _validators(request, user, keys, versions)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or not cache_is_shared():
+                    return view(request, *args, **kwargs)
+                names = scopes(request, *args, **kwargs)
+                user = request.user
+                if names is None or _has_pending_messages(request):
+                    return view(request, *args, **kwargs)
+                keys = keys_for(names, user)
+                versions = _fill_missing(cache.get_many(keys), keys)
+                etag, last_modified = _validators(request, user, keys, versions)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _finish(request, response, etag, last_modified)
+        return inner
+
+    return decorator
+
+
+async def service_detail_scopes(request, service_id):
+    """
+    service:<id>, its provider's scope, catalog plus recommendations for the "customers
+    also booked" list, and prices for the band. The owner of a service never changes,
+    so it is cached.
+    """
+    key = f'service-provider:{service_id}'
+    provider_id = await cache.aget(key)
+    if provider_id is None:
+        provider_id = await Service.objects.filter(id=service_id).values_list('provider_id', flat=True).afirst()
+        if provider_id is None:
+            return None
+        await cache.aset(key, provider_id, None)
+    return [f'service:{service_id}', f'user:{provider_id}', 'catalog', 'recommendations', 'prices']
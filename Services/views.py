@@ -1,190 +1,224 @@
-from collections import defaultdict
+import asyncio
+from functools import partial
 
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.db import close_old_connections, connections
 from django.db.models import Count, Avg, Q
+from django.db.models.functions import Lower
 from django.contrib import messages
+from django.http import JsonResponse
 
+from .autocomplete import autocomplete, corrected_query
 from .models import Service
+from .pricing import price_bands
+from .recommendations import recommendations_for_service
+from .rows import service_rows
 from .algorithm_utils import (
     add_ratings_to_category_list,
     add_ratings_to_provider_items,
+    add_sla_to_category_list,
+    add_sla_to_provider_items,
+    build_category_tree,
+    category_tree_ordering,
+    company_ordering,
     filter_providers_by_search,
+    get_earnings_for_providers,
+    get_services_for_providers,
+    group_provider_items_by_company,
     match_exact_username,
     provider_matches_search,
+    search_terms_q,
 )
 from Accounts.models import User
 from Bookings.models import Booking, ReviewRating
+from Bookings.ranking import category_leaders
 from django.contrib.auth.decorators import login_required
+from HomeService.routers import use_primary
+from .versions import service_detail_scopes, versioned
+
+MARKETPLACE_SCOPES = ['catalog', 'ratings', 'sla', 'prices']
+CATEGORY_PAGE_SCOPES = ['catalog', 'scores']
+SERVICE_SEARCH_FIELDS = (
+    'name', 'category', 'provider__username', 'provider__first_name', 'provider__last_name',
+    'provider__company_name',
+)
 
 
-def group_provider_items_by_company(provider_list):
-    """Group [{'provider': User, ...}, ...] by provider.company_name (sorted A–Z)."""
-    by_company = defaultdict(list)
-    for item in provider_list:
-        cn = (item['provider'].company_name or '').strip() or '—'
-        by_company[cn].append(item)
-    return [
-        {
-            'company_name': name,
-            'providers': sorted(items, key=lambda x: x['provider'].username.lower()),
-        }
-        for name, items in sorted(by_company.items(), key=lambda x: x[0].lower())
-    ]
+def _on_own_connection(func):
+    """Run func, then release the thread's DB connection the way request_finished would."""
+    def run():
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return run
+
+
+def _connections_are_reused():
+    """True when database connections outlive a query: persistent (CONN_MAX_AGE) or pooled."""
+    settings_dict = connections['default'].settings_dict
+    return settings_dict.get('CONN_MAX_AGE', 0) != 0 or bool(settings_dict.get('OPTIONS', {}).get('pool'))
+
+
+async def gather_queries(*funcs):
+    """
+    Run independent sync query callables concurrently; results come back in order.
+    The async ORM sends every query through one shared thread, so awaiting several
+    of its calls still runs them one after another. Each callable here gets its own
+    worker thread (and connection), so the wait is the slowest query, not the sum.
+    That only pays off when those connections are reused: with CONN_MAX_AGE=0 and no
+    pool every callable would open (and set up) a new connection, so they run one
+    after another on the request's thread instead.
+    """
+    if not _connections_are_reused():
+        return await sync_to_async(lambda: [func() for func in funcs])()
+    return await asyncio.gather(
+        *(sync_to_async(_on_own_connection(func), thread_sensitive=False)() for func in funcs)
+    )
+
 
 @login_required
-def service_list(request):
+@versioned(lambda request: MARKETPLACE_SCOPES)
+async def service_list(request):
     # Only list services from providers registered under a company (bookable providers)
-    services = Service.objects.select_related('provider').exclude(provider__company_name='')
+    services = Service.objects.exclude(provider__company_name='')
     
     # Get search and filter parameters
     search_query = request.GET.get('search', '')
     category_filter = request.GET.get('category', '')
     
     if search_query:
-        services = services.filter(
+        match = (
             Q(name__icontains=search_query) |
             Q(provider__username__icontains=search_query) |
             Q(provider__first_name__icontains=search_query) |
             Q(provider__last_name__icontains=search_query) |
             Q(provider__company_name__icontains=search_query)
         )
+        # Typos and words spread over several fields ("sharma electrcal"): match word by word.
+        terms = await sync_to_async(autocomplete.search_terms)(search_query)
+        if len(terms) > 1 or any(len(spellings) > 1 for spellings in terms):
+            match |= search_terms_q(terms, SERVICE_SEARCH_FIELDS)
+        services = services.filter(match)
     
     if category_filter:
         services = services.filter(category=category_filter)
+
+    # Services, the filter dropdown's categories and price bands are independent queries.
+    listed, all_categories, bands = await gather_queries(
+        partial(service_rows, services.order_by(*category_tree_ordering())),
+        lambda: list(
+            Service.objects.exclude(provider__company_name='').values_list('category', flat=True).distinct()
+        ),
+        price_bands,
+    )
     
-    # Get all categories from model choices
-    all_category_choices = [choice[0] for choice in Service.CATEGORY_CHOICES]
-    
-    # Group: category → company → provider → services
-    categories_dict = {}
-    for service in services:
-        category = service.category
-        provider = service.provider
-        company = (provider.company_name or '').strip() or '—'
-
-        if category not in categories_dict:
-            categories_dict[category] = {}
-        if company not in categories_dict[category]:
-            categories_dict[category][company] = {}
-        if provider.id not in categories_dict[category][company]:
-            categories_dict[category][company][provider.id] = {
-                'provider': provider,
-                'services': [],
-            }
-        categories_dict[category][company][provider.id]['services'].append(service)
-
-    # Create list for all categories
-    categories_list = []
-    for category in all_category_choices:
-        if category in categories_dict:
-            companies_dict = categories_dict[category]
-            companies_list = []
-            for company_name in sorted(companies_dict.keys(), key=lambda x: x.lower()):
-                prov_map = companies_dict[company_name]
-                providers_list = list(prov_map.values())
-                companies_list.append({
-                    'company_name': company_name,
-                    'providers': providers_list,
-                })
-            service_count = sum(
-                len(p['services'])
-                for co in companies_list
-                for p in co['providers']
-            )
-        else:
-            companies_list = []
-            service_count = 0
-
-        categories_list.append({
+    # Group: category → company → provider → services, in one pass over the DB order
+    categories_dict = build_category_tree(listed)
+    categories_list = [
+        {
             'category': category,
-            'companies': companies_list,
-            'service_count': service_count,
-        })
-
-    # Sort categories
-    categories_list.sort(key=lambda x: x['category'])
+            'companies': categories_dict.get(category, []),
+            'service_count': sum(
+                len(p['services']) for co in categories_dict.get(category, ()) for p in co['providers']
+            ),
+        }
+        for category in sorted(choice[0] for choice in Service.CATEGORY_CHOICES)
+    ]
 
-    add_ratings_to_category_list(categories_list)
-    
-    # Get all unique categories for filter dropdown
-    all_categories = Service.objects.exclude(provider__company_name='').values_list('category', flat=True).distinct()
+    await gather_queries(
+        partial(add_ratings_to_category_list, categories_list),
+        partial(add_sla_to_category_list, categories_list),
+    )
     
     context = {
         'categories_list': categories_list,
         'search_query': search_query,
         'category_filter': category_filter,
         'categories': all_categories,
+        'price_bands': bands,
     }
-    return render(request, 'services.html', context)
+    return await sync_to_async(render)(request, 'services.html', context)
+
+
+def _provider_category_section(idx, category, raw_search, terms=None):
+    """
+    One marketplace section: company groups of providers offering category, or None.
+    terms (autocomplete search_terms) lets misspelt searches match too. A fixed number
+    of queries however many providers the category has.
+    """
+    search_lower = raw_search.lower()
+    providers = User.objects.filter(
+        is_provider=True,
+        service__category=category,
+    ).exclude(company_name='').annotate(
+        total_bookings=Count('service__booking', filter=Q(service__booking__service__category=category)),
+        completed_bookings=Count('service__booking',
+                                 filter=Q(service__booking__service__category=category,
+                                          service__booking__status='Completed')),
+    ).distinct().order_by(*company_ordering(), Lower('username'), 'id')
+    plist = list(providers)
+    used_exact = False
+    if raw_search:
+        plist, used_exact = match_exact_username(plist, search_lower)
+
+    services = get_services_for_providers([provider.id for provider in plist], category)
+    if raw_search and not used_exact:
+        plist = [
+            provider for provider in plist
+            if provider_matches_search(provider, services.get(provider.id, []), category, raw_search, terms)
+        ]
+    earnings = get_earnings_for_providers([provider.id for provider in plist], category)
+
+    provider_list = [
+        {
+            'provider': provider,
+            'services': services.get(provider.id, []),
+            'total_bookings': provider.total_bookings,
+            'completed_bookings': provider.completed_bookings,
+            'total_earnings': earnings.get(provider.id, 0),
+        }
+        for provider in plist
+    ]
+
+    add_ratings_to_provider_items(provider_list)
+    add_sla_to_provider_items(provider_list)
+    company_groups = group_provider_items_by_company(provider_list)
+    if not company_groups:
+        return None
+    return {
+        'category': category,
+        'collapse_prefix': f'sp-cat-{idx}',
+        'company_groups': company_groups,
+    }
+
 
 @login_required
-def service_providers(request):
+@versioned(lambda request: MARKETPLACE_SCOPES + [f'category:{c}' for c, _ in Service.CATEGORY_CHOICES])
+async def service_providers(request):
     """Category → company → providers (customer marketplace view)."""
     raw_search = request.GET.get('search', '').strip()
-    search_lower = raw_search.lower()
-
-    all_categories = [c[0] for c in Service.CATEGORY_CHOICES]
-    category_sections = []
+    terms = await sync_to_async(autocomplete.search_terms)(raw_search) if raw_search else None
 
-    for idx, category in enumerate(all_categories):
-        provider_ids = (
-            Service.objects.filter(provider__is_provider=True)
-            .exclude(provider__company_name='')
-            .filter(category=category)
-            .values_list('provider_id', flat=True)
-            .distinct()
-        )
-        providers = User.objects.filter(id__in=provider_ids).exclude(company_name='').order_by(
-            'username'
-        )
-        plist = list(providers)
-        used_exact = False
-        if raw_search:
-            plist, used_exact = match_exact_username(plist, search_lower)
-
-        provider_list = []
-        for provider in plist:
-            services = Service.objects.filter(provider=provider, category=category)
-
-            if raw_search and not used_exact:
-                if not provider_matches_search(provider, services, category, raw_search):
-                    continue
-
-            completed_qs = Booking.objects.filter(
-                service__provider=provider,
-                service__category=category,
-                status='Completed',
-            )
-            total_bookings = Booking.objects.filter(
-                service__provider=provider,
-                service__category=category,
-            ).count()
-
-            provider_list.append({
-                'provider': provider,
-                'services': services,
-                'total_bookings': total_bookings,
-                'completed_bookings': completed_qs.count(),
-                'total_earnings': sum(b.service.price for b in completed_qs),
-            })
-
-        add_ratings_to_provider_items(provider_list)
-        company_groups = group_provider_items_by_company(provider_list)
-        if company_groups:
-            category_sections.append({
-                'category': category,
-                'collapse_prefix': f'sp-cat-{idx}',
-                'company_groups': company_groups,
-            })
+    # Each category section is independent: build them concurrently.
+    bands, *sections = await gather_queries(price_bands, *(
+        partial(_provider_category_section, idx, category, raw_search, terms)
+        for idx, (category, _) in enumerate(Service.CATEGORY_CHOICES)
+    ))
+    category_sections = [section for section in sections if section]
 
     context = {
         'category_sections': category_sections,
         'search_query': raw_search,
+        'search_correction': corrected_query(terms) if terms and category_sections else '',
+        'price_bands': bands,
     }
-    return render(request, 'service_providers.html', context)
+    return await sync_to_async(render)(request, 'service_providers.html', context)
 
 
 @login_required
+@versioned(lambda request, provider_id: [f'user:{provider_id}'])
 def provider_customer_reviews(request, provider_id):
     """All customer ratings & reviews for a bookable service provider."""
     provider = get_object_or_404(
@@ -210,27 +244,33 @@ def provider_customer_reviews(request, provider_id):
 
 
 @login_required
-def service_detail(request, service_id):
+@versioned(service_detail_scopes)
+async def service_detail(request, service_id):
     """Display service details with provider information"""
-    service = get_object_or_404(
-        Service.objects.select_related('provider').exclude(provider__company_name=''),
+    service = await aget_object_or_404(
+        Service.objects.select_related('provider', 'provider__sla').exclude(provider__company_name=''),
         id=service_id,
     )
     
-    # Get provider statistics
+    # Provider statistics, reviews and rating summary are independent queries.
     provider = service.provider
-    provider_services = Service.objects.filter(provider=provider)
-    total_bookings = Booking.objects.filter(service__provider=provider).count()
-    completed_bookings = Booking.objects.filter(service__provider=provider, status='Completed').count()
-
-    reviews_qs = (
-        ReviewRating.objects.filter(provider=provider, status=True)
-        .select_related('customer')
-        .order_by('-created_at')[:25]
-    )
-    rating_stats = ReviewRating.objects.filter(provider=provider, status=True).aggregate(
-        avg=Avg('rating'),
-        n=Count('id'),
+    reviews = ReviewRating.objects.filter(provider=provider, status=True)
+    (
+        provider_services,
+        total_bookings,
+        completed_bookings,
+        reviews_list,
+        rating_stats,
+        also_booked,
+        bands,
+    ) = await gather_queries(
+        lambda: list(Service.objects.filter(provider=provider)),
+        Booking.objects.filter(service__provider=provider).count,
+        Booking.objects.filter(service__provider=provider, status='Completed').count,
+        lambda: list(reviews.select_related('customer').order_by('-created_at')[:25]),
+        partial(reviews.aggregate, avg=Avg('rating'), n=Count('id')),
+        partial(recommendations_for_service, service),
+        price_bands,
     )
 
     context = {
@@ -239,13 +279,37 @@ def service_detail(request, service_id):
         'provider_services': provider_services,
         'total_bookings': total_bookings,
         'completed_bookings': completed_bookings,
-        'provider_reviews': reviews_qs,
+        'provider_reviews': reviews_list,
         'review_avg': rating_stats['avg'],
         'review_count': rating_stats['n'] or 0,
+        'provider_sla': getattr(provider, 'sla', None),
+        'also_booked': also_booked,
+        'price_band': bands.get(service.category, {}),
     }
-    return render(request, 'service_detail.html', context)
+    return await sync_to_async(render)(request, 'service_detail.html', context)
 
 @login_required
+async def search_suggestions(request):
+    """
+    JSON typeahead for the marketplace search boxes: ?q=<prefix>[&category=<name>][&limit=<k>].
+    Suggestions for a corrected spelling of q carry their edit distance.
+    """
+    query = request.GET.get('q', '')
+    category = request.GET.get('category') or None
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    # Ranking and fuzzy matching are CPU work (and the first call builds the index): keep them off the loop.
+    results = await sync_to_async(autocomplete.suggest)(query, k=limit, category=category)
+    response = JsonResponse({'query': query, 'results': results})
+    # Per user: the names behind a login must not be kept by shared caches.
+    response['Cache-Control'] = 'private, max-age=30'
+    return response
+
+
+@login_required
+@use_primary
 def toggle_service_availability(request, service_id):
     """Allow provider to toggle service availability"""
     if not request.user.is_provider:
@@ -269,67 +333,85 @@ def toggle_service_availability(request, service_id):
     return redirect('provider_bookings')
 
 
+def category_page(request, category, template):
+    """Static category page plus its top providers (precomputed by refresh_provider_scores)."""
+    context = {'category': category, 'leaders': category_leaders(category)}
+    return render(request, template, context)
+
+
+@versioned(lambda request: CATEGORY_PAGE_SCOPES)
 def plumbing_services(request):
     """Display plumbing services page"""
-    return render(request, 'services/plumbing.html')
+    return category_page(request, 'Plumbing', 'services/plumbing.html')
 
 
+@versioned(lambda request: CATEGORY_PAGE_SCOPES)
 def electrical_services(request):
     """Display electrical services page"""
-    return render(request, 'services/electrical.html')
+    return category_page(request, 'Electrical', 'services/electrical.html')
 
 
+@versioned(lambda request: CATEGORY_PAGE_SCOPES)
 def cleaning_services(request):
     """Display cleaning services page"""
-    return render(request, 'services/cleaning.html')
+    return category_page(request, 'Cleaning', 'services/cleaning.html')
 
 
+@versioned(lambda request: CATEGORY_PAGE_SCOPES)
 def painting_services(request):
     """Display painting services page"""
-    return render(request, 'services/painting.html')
+    return category_page(request, 'Painting', 'services/painting.html')
 
 
+@versioned(lambda request: CATEGORY_PAGE_SCOPES)
 def appliance_repair_services(request):
     """Display appliance repair services page"""
-    return render(request, 'services/appliance_repair.html')
+    return category_page(request, 'Appliance Repair', 'services/appliance_repair.html')
 
 
+@versioned(lambda request: CATEGORY_PAGE_SCOPES)
 def handyman_services(request):
     """Display handyman services page"""
-    return render(request, 'services/handyman.html')
+    return category_page(request, 'Handyman', 'services/handyman.html')
 
 
-def plumbing_providers(request):
+@versioned(lambda request: MARKETPLACE_SCOPES + ['category:Plumbing'])
+async def plumbing_providers(request):
     """Display plumbing service providers"""
-    return get_category_providers(request, 'Plumbing', 'services/providers/plumbing_providers.html')
+    return await get_category_providers(request, 'Plumbing', 'services/providers/plumbing_providers.html')
 
 
-def electrical_providers(request):
+@versioned(lambda request: MARKETPLACE_SCOPES + ['category:Electrical'])
+async def electrical_providers(request):
     """Display electrical service providers"""
-    return get_category_providers(request, 'Electrical', 'services/providers/electrical_providers.html')
+    return await get_category_providers(request, 'Electrical', 'services/providers/electrical_providers.html')
 
 
-def cleaning_providers(request):
+@versioned(lambda request: MARKETPLACE_SCOPES + ['category:Cleaning'])
+async def cleaning_providers(request):
     """Display cleaning service providers"""
-    return get_category_providers(request, 'Cleaning', 'services/providers/cleaning_providers.html')
+    return await get_category_providers(request, 'Cleaning', 'services/providers/cleaning_providers.html')
 
 
-def painting_providers(request):
+@versioned(lambda request: MARKETPLACE_SCOPES + ['category:Painting'])
+async def painting_providers(request):
     """Display painting service providers"""
-    return get_category_providers(request, 'Painting', 'services/providers/painting_providers.html')
+    return await get_category_providers(request, 'Painting', 'services/providers/painting_providers.html')
 
 
-def appliance_repair_providers(request):
+@versioned(lambda request: MARKETPLACE_SCOPES + ['category:Appliance Repair'])
+async def appliance_repair_providers(request):
     """Display appliance repair service providers"""
-    return get_category_providers(request, 'Appliance Repair', 'services/providers/appliance_repair_providers.html')
+    return await get_category_providers(request, 'Appliance Repair', 'services/providers/appliance_repair_providers.html')
 
 
-def handyman_providers(request):
+@versioned(lambda request: MARKETPLACE_SCOPES + ['category:Handyman'])
+async def handyman_providers(request):
     """Display handyman service providers"""
-    return get_category_providers(request, 'Handyman', 'services/providers/handyman_providers.html')
+    return await get_category_providers(request, 'Handyman', 'services/providers/handyman_providers.html')
 
 
-def get_category_providers(request, category, template):
+async def get_category_providers(request, category, template):
     """Helper function to get providers for a specific service category"""
     providers = User.objects.filter(
         is_provider=True,
@@ -340,44 +422,48 @@ def get_category_providers(request, category, template):
         completed_bookings=Count('service__booking',
                                 filter=Q(service__booking__service__category=category,
                                         service__booking__status='Completed')),
-    ).distinct()
+    ).distinct().order_by(*company_ordering(), Lower('username'), 'id')
 
     search_query = request.GET.get('search', '').strip()
-    provs_list = list(providers)
+    provs_list = [provider async for provider in providers]
     used_exact = False
     if search_query:
         provs_list, used_exact = match_exact_username(provs_list, search_query.lower())
 
-    provider_list = []
-    for provider in provs_list:
-        completed_bookings = Booking.objects.filter(
-            service__provider=provider,
-            service__category=category,
-            status='Completed'
-        )
-        total_earnings = sum(booking.service.price for booking in completed_bookings)
-
-        provider_list.append({
+    provider_list = [
+        {
             'provider': provider,
-            'services': Service.objects.filter(provider=provider, category=category),
             'total_bookings': provider.total_bookings,
             'completed_bookings': provider.completed_bookings,
-            'total_earnings': total_earnings,
-        })
+        }
+        for provider in provs_list
+    ]
 
+    terms = None
     if search_query and not used_exact:
-        provider_list = filter_providers_by_search(provider_list, search_query)
-
-    add_ratings_to_provider_items(provider_list)
+        terms = await sync_to_async(autocomplete.search_terms)(search_query)
+        provider_list = filter_providers_by_search(provider_list, search_query, terms, category)
+
+    # Services, earnings, ratings and SLA only need the provider ids: fetch them concurrently.
+    provider_ids = [item['provider'].id for item in provider_list]
+    services, earnings, _, _, bands = await gather_queries(
+        partial(get_services_for_providers, provider_ids, category),
+        partial(get_earnings_for_providers, provider_ids, category),
+        partial(add_ratings_to_provider_items, provider_list),
+        partial(add_sla_to_provider_items, provider_list),
+        price_bands,
+    )
+    for item in provider_list:
+        item['services'] = services.get(item['provider'].id, [])
+        item['total_earnings'] = earnings.get(item['provider'].id, 0)
     company_groups = group_provider_items_by_company(provider_list)
 
     context = {
         'provider_list': provider_list,
         'company_groups': company_groups,
         'search_query': search_query,
+        'search_correction': corrected_query(terms) if terms and provider_list else '',
         'category': category,
+        'price_bands': bands,
     }
-    return render(request, template, context)
-
-
-    
\ No newline at end of file
+    return await sync_to_async(render)(request, template, context)
@@ -1,3 +1,50 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from Accounts.models import User
+from Bookings import cohorts
+from Bookings.tasks import build_booking_cohorts
+from taskqueue.models import Task
+
+
+@unittest.skipIf(cohorts.np is None, 'numpy is not installed')
+class BookingCohortsViewTests(TestCase):
+    def setUp(self):
+        cache.delete_many([cohorts.CACHE_KEY, cohorts.BUILDING_KEY])
+        self.addCleanup(cache.delete_many, [cohorts.CACHE_KEY, cohorts.BUILDING_KEY])
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        self.url = reverse('dashboard_booking_cohorts')
+
+    def test_cold_cache_shows_computing_and_builds_off_the_request(self):
+        with mock.patch('Bookings.cohorts.threading.Thread') as thread:
+            response = self.client.get(self.url)
+            self.client.get(self.url)
+        self.assertContains(response, 'Computing cohorts')
+        thread.return_value.start.assert_called_once()
+        self.assertIsNone(cohorts.cached_cohorts())
+
+    def test_shared_cache_enqueues_the_build_task(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url)
+            self.assertRedirects(response, self.url, fetch_redirect_response=False)
+            self.assertEqual(Task.objects.filter(name=build_booking_cohorts.name).count(), 1)
+            build_booking_cohorts()
+            self.assertContains(self.client.get(self.url), 'No bookings yet.')
+
+    def test_cached_result_is_rendered(self):
+        cohorts.build_cohorts()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Built')
+        self.assertNotContains(response, 'Computing cohorts')
@@ -11,6 +11,7 @@ urlpatterns = [
     path('services/<int:service_id>/delete/', views.delete_service, name='dashboard_delete_service'),
     path('bookings/', views.bookings_list, name='dashboard_bookings'),
     path('bookings/pending/', views.pending_bookings, name='dashboard_pending_bookings'),
+    path('bookings/cohorts/', views.booking_cohorts, name='dashboard_booking_cohorts'),
     path('bookings/<int:booking_id>/update-status/', views.update_booking_status, name='dashboard_update_booking_status'),
     path('bookings/<int:booking_id>/delete/', views.delete_booking, name='dashboard_delete_booking'),
 ]
@@ -1,9 +1,20 @@
+from functools import partial
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q, Count
+from Accounts.auth import invalidate_cached_user
 from Accounts.models import User
 from Services.models import Service
+from Services.rows import booking_rows, service_rows, user_rows
 from Bookings.models import Booking
+from Bookings.availability import booking_status_changed
+from Bookings.tasks import notify_booking_status
+from Bookings.events import publish_booking
+from Bookings import cohorts
+from Bookings.cohorts import cached_cohorts
+from Bookings.forecast import demand_summary
 
 from django.contrib.auth.decorators import login_required, user_passes_test
 
@@ -43,6 +54,7 @@ def dashboard_home(request):
         'recent_bookings': recent_bookings,
         'bookings_by_status': bookings_by_status,
         'services_by_category': services_by_category,
+        'demand_forecast': demand_summary(),
     }
     return render(request, 'dashboard/home/index.html', context)
 
@@ -69,7 +81,7 @@ def users_list(request):
     users = users.order_by('-id')
     
     context = {
-        'users': users,
+        'users': user_rows(users),
         'search_query': search_query,
         'role_filter': role_filter,
     }
@@ -81,7 +93,7 @@ def services_list(request):
     search_query = request.GET.get('search', '')
     category_filter = request.GET.get('category', '')
     
-    services = Service.objects.select_related('provider').all()
+    services = Service.objects.all()
     
     if search_query:
         services = services.filter(
@@ -99,7 +111,7 @@ def services_list(request):
     categories = Service.objects.values_list('category', flat=True).distinct()
     
     context = {
-        'services': services,
+        'services': service_rows(services),
         'search_query': search_query,
         'category_filter': category_filter,
         'categories': categories,
@@ -112,7 +124,7 @@ def bookings_list(request):
     search_query = request.GET.get('search', '')
     status_filter = request.GET.get('status', '')
     
-    bookings = Booking.objects.select_related('customer', 'service').all()
+    bookings = Booking.objects.all()
     
     if search_query:
         bookings = bookings.filter(
@@ -126,7 +138,7 @@ def bookings_list(request):
     bookings = bookings.order_by('-id')
     
     context = {
-        'bookings': bookings,
+        'bookings': booking_rows(bookings),
         'search_query': search_query,
         'status_filter': status_filter,
         'status_choices': Booking.STATUS_CHOICES,
@@ -140,8 +152,12 @@ def update_booking_status(request, booking_id):
         booking = get_object_or_404(Booking, id=booking_id)
         new_status = request.POST.get('status')
         if new_status in dict(Booking.STATUS_CHOICES):
-            booking.status = new_status
+            old_status = booking.status
+            booking.set_status(new_status)
             booking.save()
+            booking_status_changed(booking, old_status)
+            transaction.on_commit(partial(notify_booking_status.enqueue, booking.id))
+            publish_booking(booking)
             messages.success(request, f'Booking #{booking.id} status updated to {new_status}.')
         else:
             messages.error(request, 'Invalid status selected.')
@@ -156,7 +172,9 @@ def delete_user(request, user_id):
             messages.error(request, 'Cannot delete superuser account.')
         else:
             username = user.username
+            user_pk = user.id
             user.delete()
+            invalidate_cached_user(user_pk)
             messages.success(request, f'User {username} has been deleted.')
     return redirect('dashboard_users')
 
@@ -195,7 +213,7 @@ def view_customers(request):
     customers = customers.order_by('-id')
     
     context = {
-        'customers': customers,
+        'customers': user_rows(customers),
         'search_query': search_query,
     }
     return render(request, 'dashboard/users/customers.html', context)
@@ -214,10 +232,10 @@ def view_providers(request):
             Q(company_name__icontains=search_query)
         )
     
-    providers = providers.order_by('-id')
+    providers = providers.annotate(service_count=Count('service')).order_by('-id')
     
     context = {
-        'providers': providers,
+        'providers': user_rows(providers, with_service_count=True),
         'search_query': search_query,
     }
     return render(request, 'dashboard/users/providers.html', context)
@@ -227,7 +245,7 @@ def view_providers(request):
 def pending_bookings(request):
     search_query = request.GET.get('search', '')
     
-    bookings = Booking.objects.select_related('customer', 'service').filter(status='Pending')
+    bookings = Booking.objects.filter(status='Pending')
     
     if search_query:
         bookings = bookings.filter(
@@ -238,8 +256,36 @@ def pending_bookings(request):
     bookings = bookings.order_by('-id')
     
     context = {
-        'bookings': bookings,
+        'bookings': booking_rows(bookings),
         'search_query': search_query,
         'status_choices': Booking.STATUS_CHOICES,
     }
     return render(request, 'dashboard/bookings/pending.html', context)
+
+@login_required
+@user_passes_test(superuser_required)
+def booking_cohorts(request):
+    """Monthly retention by first-booking cohort, from the cache filled by `build_cohorts` in the background."""
+    if cohorts.np is None:
+        messages.error(request, 'Cohort analytics need numpy installed on the server.')
+        return redirect('dashboard_home')
+    result = cached_cohorts()
+    if request.method == 'POST' or result is None:
+        started = cohorts.request_build()
+        if request.method == 'POST':
+            if started:
+                messages.success(request, 'Recomputing cohorts; refresh the page in a moment.')
+            else:
+                messages.info(request, 'Cohorts are already being recomputed.')
+            return redirect('dashboard_booking_cohorts')
+
+    segment_name = request.GET.get('category', '')
+    segments = result['segments'] if result else []
+    segment = next((s for s in segments if s['name'] == segment_name), segments[0] if segments else None)
+    context = {
+        'result': result,
+        'segments': segments,
+        'segment': segment,
+        'building': cohorts.is_building(),
+    }
+    return render(request, 'dashboard/bookings/cohorts.html', context)
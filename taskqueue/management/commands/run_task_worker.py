@@ -0,0 +1,69 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from taskqueue.models import Task
+from taskqueue.queue import autodiscover, claim, run
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the task table with a pool of worker threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--lanes',
+            default='high,default,low',
+            help='Comma-separated lanes this worker serves, highest priority first.',
+        )
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when no task is due.')
+        parser.add_argument('--batch', type=int, default=1, help='Tasks leased per claim.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is drained.')
+
+    def handle(self, *args, **options):
+        lanes = [lane.strip() for lane in options['lanes'].split(',') if lane.strip()]
+        unknown = set(lanes) - set(Task.LANES)
+        if unknown:
+            raise CommandError(f'Unknown lane(s): {", ".join(sorted(unknown))}')
+        priorities = [Task.LANES[lane] for lane in lanes]
+
+        autodiscover()
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        base_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        def work(n):
+            worker_id = f'{base_id}:{n}'
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    claimed = claim(worker_id, priorities=priorities, limit=options['batch'])
+                    for task_row in claimed:
+                        run(task_row)
+                    if not claimed:
+                        if options['burst']:
+                            return
+                        stop.wait(options['poll'])
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work, args=(n,), name=f'task-worker-{n}', daemon=True)
+            for n in range(options['threads'])
+        ]
+        self.stdout.write(f"Starting {len(threads)} worker thread(s) on lanes: {', '.join(lanes)}")
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for t in threads:
+                t.join()
+        self.stdout.write('Worker stopped.')
@@ -0,0 +1,174 @@
+"""
+Background task queue : a database table, no external broker.
+
+Functions decorated with @task are registered by dotted name; `.enqueue(...)`
+(or `enqueue(name, ...)`) inserts a Task row and returns immediately. Workers
+claim rows with SELECT ... FOR UPDATE SKIP LOCKED where the backend supports it
+(Postgres), and with a lease written by a conditional UPDATE elsewhere
+(SQLite). Either way a claim is a lease: if a worker dies, the row becomes
+claimable again once `locked_until` passes, unless it already used all its
+attempts: then it is marked failed instead of being run again.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, lane, max_attempts):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.lane = lane
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, run_at=None, **kwargs):
+        return enqueue(self.name, *args, lane=self.lane, max_attempts=self.max_attempts, run_at=run_at, **kwargs)
+
+
+def task(lane='default', max_attempts=5):
+    """Register a function as a background task. Arguments must be JSON-serialisable."""
+    if lane not in Task.LANES:
+        raise ValueError(f'Unknown task lane {lane!r}; expected one of {sorted(Task.LANES)}.')
+
+    def decorator(func):
+        wrapped = TaskFunction(func, lane, max_attempts)
+        _registry[wrapped.name] = wrapped
+        return wrapped
+
+    return decorator
+
+
+def autodiscover():
+    """Import every installed app's tasks.py so their @task functions register."""
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, *args, lane='default', max_attempts=5, run_at=None, **kwargs):
+    return Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        priority=Task.LANES[lane],
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def _claimable(now, priorities):
+    # Queued work that is due, or running work whose lease expired (crashed worker) with attempts left.
+    qs = Task.objects.filter(
+        Q(status='queued', run_at__lte=now)
+        | Q(status='running', locked_until__lt=now, attempts__lt=F('max_attempts'))
+    )
+    if priorities is not None:
+        qs = qs.filter(priority__in=priorities)
+    return qs.order_by('priority', 'run_at', 'id')
+
+
+def fail_exhausted(now=None):
+    """Mark failed the running tasks whose lease expired on their last attempt. Returns rows updated."""
+    now = now or timezone.now()
+    return Task.objects.filter(
+        status='running', locked_until__lt=now, attempts__gte=F('max_attempts'),
+    ).update(
+        status='failed',
+        locked_until=None,
+        last_error='Lease expired on the last attempt (worker stopped or task ran too long).',
+        updated_at=now,
+    )
+
+
+def claim(worker_id, priorities=None, limit=1):
+    """Lease up to `limit` tasks for worker_id. Returns the claimed Task rows."""
+    now = timezone.now()
+    fail_exhausted(now)
+    lease = {
+        'status': 'running',
+        'locked_by': worker_id,
+        'locked_until': now + LEASE,
+        'attempts': F('attempts') + 1,
+        'updated_at': now,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                _claimable(now, priorities).select_for_update(skip_locked=True).values_list('id', flat=True)[:limit]
+            )
+            Task.objects.filter(id__in=ids).update(**lease)
+    else:
+        # Lease fallback: each candidate is taken by a conditional UPDATE; losing a race updates 0 rows.
+        ids = []
+        for candidate in _claimable(now, priorities).values('id', 'status', 'locked_until')[:limit * 4]:
+            won = Task.objects.filter(
+                id=candidate['id'],
+                status=candidate['status'],
+                locked_until=candidate['locked_until'],
+            ).update(**lease)
+            if won:
+                ids.append(candidate['id'])
+                if len(ids) == limit:
+                    break
+
+    return list(Task.objects.filter(id__in=ids).order_by('priority', 'run_at', 'id'))
+
+
+def backoff(attempts):
+    """Exponential backoff with jitter for the given attempt number (1-based)."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def run(task_row):
+    """Execute one claimed task and record the outcome. Returns True on success."""
+    func = _registry.get(task_row.name)
+    try:
+        if func is None:
+            raise LookupError(f'No task registered as {task_row.name!r}.')
+        func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Task %s #%s failed (attempt %s)', task_row.name, task_row.pk, task_row.attempts)
+        if task_row.attempts < task_row.max_attempts and func is not None:
+            Task.objects.filter(id=task_row.id, locked_by=task_row.locked_by).update(
+                status='queued',
+                run_at=timezone.now() + backoff(task_row.attempts),
+                locked_by='',
+                locked_until=None,
+                last_error=error,
+                updated_at=timezone.now(),
+            )
+        else:
+            Task.objects.filter(id=task_row.id, locked_by=task_row.locked_by).update(
+                status='failed',
+                locked_until=None,
+                last_error=error,
+                updated_at=timezone.now(),
+            )
+        return False
+
+    Task.objects.filter(id=task_row.id, locked_by=task_row.locked_by).update(
+        status='done',
+        locked_until=None,
+        updated_at=timezone.now(),
+    )
+    return True
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Task
+from .queue import claim, enqueue, run, task
+
+calls = []
+
+
+@task()
+def record_call(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def always_fails():
+    raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_leases_by_priority_then_run_at(self):
+        low = enqueue('x.low', lane='low')
+        first = enqueue('x.first')
+        later = enqueue('x.later', run_at=timezone.now() + timedelta(hours=1))
+        claimed = claim('w1', limit=5)
+        self.assertEqual([t.id for t in claimed], [first.id, low.id])
+        self.assertTrue(all(t.status == 'running' and t.locked_by == 'w1' and t.attempts == 1 for t in claimed))
+        self.assertEqual(claim('w2', limit=5), [])
+        later.refresh_from_db()
+        self.assertEqual(later.status, 'queued')
+
+    def test_claim_respects_priorities(self):
+        enqueue('x.default')
+        high = enqueue('x.high', lane='high')
+        self.assertEqual([t.id for t in claim('w1', priorities=[Task.LANES['high']], limit=5)], [high.id])
+
+    def test_run_records_success(self):
+        record_call.enqueue(7)
+        self.assertTrue(run(claim('w1')[0]))
+        self.assertEqual(calls, [7])
+        self.assertEqual(Task.objects.get().status, 'done')
+
+    def test_failure_retries_then_fails(self):
+        row = always_fails.enqueue()
+        with self.assertLogs('taskqueue.queue', 'WARNING'):
+            self.assertFalse(run(claim('w1')[0]))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('queued', 1))
+        Task.objects.filter(id=row.id).update(run_at=timezone.now())
+        with self.assertLogs('taskqueue.queue', 'WARNING'):
+            self.assertFalse(run(claim('w1')[0]))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('failed', 2))
+        self.assertIn('boom', row.last_error)
+
+    def test_expired_lease_is_reclaimed_while_attempts_remain(self):
+        row = record_call.enqueue(1)
+        claim('dead-worker')
+        Task.objects.filter(id=row.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([t.locked_by for t in claim('w2')], ['w2'])
+        row.refresh_from_db()
+        self.assertEqual(row.attempts, 2)
+
+    def test_expired_lease_on_last_attempt_fails(self):
+        row = record_call.enqueue(1)
+        Task.objects.filter(id=row.id).update(
+            status='running', attempts=row.max_attempts, locked_by='dead-worker',
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(claim('w2'), [])
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'failed')
+        self.assertIn('Lease expired', row.last_error)